@@ -1,5 +1,6 @@
 """FastAPI backend service for drowning detection system"""
 import sys
+import json
 import asyncio
 from pathlib import Path
 
@@ -18,6 +19,7 @@ from backend.services.websocket_manager import ws_manager
 from backend.services.detection_service import detection_service
 from backend.services.camera_service import camera_service
 from backend.core.logger import setup_logger
+from backend.core.model_registry import model_registry
 from backend.core.settings import load_settings
 
 # Setup logging
@@ -48,6 +50,20 @@ app.include_router(config.router)
 app.include_router(camera.router)
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Bind the WebSocket publisher to the server loop; preload and warm up the models"""
+    ws_manager.bind_loop()
+    if settings.detection.preload_models:
+        logger.info("Preloading detection models...")
+        asyncio.get_running_loop().run_in_executor(
+            None, detection_service.preload_models, settings.detection.warmup_models
+        )
+    else:
+        # 不预加载: 模型在首个检测会话时加载, 服务启动即就绪
+        model_registry.expect([])
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on server shutdown"""
@@ -55,11 +71,11 @@ async def shutdown_event():
 
     # Stop any active detection sessions
     try:
-        if detection_service.current_session and detection_service.current_session.status == "running":
-            logger.info("Stopping active detection session...")
-            await detection_service.stop_detection()
+        logger.info("Stopping active detection sessions...")
+        await detection_service.stop_all()
+        detection_service.stop_inference()
     except Exception as e:
-        logger.warning(f"Error stopping detection session during shutdown: {e}")
+        logger.warning(f"Error stopping detection sessions during shutdown: {e}")
 
     # Clean up camera previews
     try:
@@ -67,6 +83,8 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"Error cleaning up camera service: {e}")
 
+    await ws_manager.close()
+
     logger.info("Cleanup complete")
 
 
@@ -89,6 +107,20 @@ async def health_check():
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness check: 200 once the preloaded models are loaded and warmed up
+
+    Without preloading the models load with the first session, so the server is
+    ready right after startup.
+    """
+    status = model_registry.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "ready" if status["ready"] else "loading", **status},
+    )
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
@@ -99,7 +131,18 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             # Handle ping/pong or other control messages if needed
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                await ws_manager.send_to(websocket, {"type": "pong"})
+                continue
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            # {"type": "hello", "binary_frames": true} switches frames to binary packets
+            if not isinstance(message, dict):
+                continue
+            reply = ws_manager.handle_client_message(websocket, message)
+            if reply is not None:
+                await ws_manager.send_to(websocket, reply)
     except WebSocketDisconnect:
         await ws_manager.disconnect(websocket)
     except Exception as e:
@@ -130,6 +173,7 @@ def main():
     logger.info(f"Server URL       : http://127.0.0.1:8001")
     logger.info(f"API Documentation: http://127.0.0.1:8001/docs")
     logger.info(f"Health Check     : http://127.0.0.1:8001/health")
+    logger.info(f"Readiness Check  : http://127.0.0.1:8001/health/ready")
     logger.info("")
     logger.success("Server is starting...")
     logger.info("Press Ctrl+C to stop the server")
@@ -1,11 +1,14 @@
 """Camera API endpoints"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional
 from loguru import logger
 
+from backend.core.settings import load_settings
 from backend.services.camera_service import camera_service
+from backend.services.frame_encoder import STREAM_TIERS
+from backend.services.mjpeg_stream import mjpeg_response
 
 
 router = APIRouter(prefix="/api/camera", tags=["camera"])
@@ -68,9 +71,10 @@ async def stop_preview(camera_index: int):
     """Stop camera preview"""
     try:
         success = camera_service.stop_preview(camera_index)
+        state = "stopped" if success else "was not running"
         return PreviewResponse(
             success=success,
-            message=f"Preview {'stopped' if success else 'was not running'} for camera {camera_index}"
+            message=f"Preview {state} for camera {camera_index}"
         )
     except Exception as e:
         logger.error(f"Failed to stop camera preview: {e}")
@@ -95,3 +99,20 @@ async def get_preview_frame(camera_index: int):
     except Exception as e:
         logger.error(f"Failed to get preview frame: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/preview/stream/{camera_index}")
+async def stream_preview(
+    camera_index: int,
+    tier: str = Query("standard", description="Quality tier: thumbnail, standard or full"),
+):
+    """Camera preview as an MJPEG stream (multipart/x-mixed-replace); start the preview first"""
+    if tier not in STREAM_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier: {tier}")
+    slot = camera_service.get_preview_slot(camera_index)
+    if slot is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No preview available for camera {camera_index}. Start preview first."
+        )
+    return mjpeg_response(slot, STREAM_TIERS[tier], load_settings().detection.mjpeg_fps)
@@ -1,14 +1,20 @@
 """Detection API endpoints"""
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from loguru import logger
 
 from backend.models import (
     DetectionStartRequest,
     DetectionStartResponse,
     DetectionStopResponse,
-    DetectionStatusResponse
+    DetectionStatusResponse,
+    DetectionSessionListResponse
 )
+from backend.core.settings import load_settings
 from backend.services.detection_service import detection_service
+from backend.services.frame_encoder import STREAM_TIERS
+from backend.services.mjpeg_stream import mjpeg_response
 
 router = APIRouter(prefix="/api/detection", tags=["detection"])
 
@@ -19,7 +25,13 @@ async def start_detection(request: DetectionStartRequest):
     try:
         session_id = await detection_service.start_detection(
             video_source=request.video_source,
-            is_webcam=request.is_webcam
+            is_webcam=request.is_webcam,
+            record_output=request.record_output,
+            render_mode=request.render_mode,
+            camera_id=request.camera_id,
+            detection_overrides=request.model_dump(
+                include={"inference_width", "river_imgsz", "person_imgsz"}, exclude_none=True
+            ),
         )
         return DetectionStartResponse(
             session_id=session_id,
@@ -38,11 +50,17 @@ async def start_detection(request: DetectionStartRequest):
 
 
 @router.post("/stop", response_model=DetectionStopResponse)
-async def stop_detection():
-    """Stop current detection session"""
+async def stop_detection(
+    session_id: Optional[str] = Query(
+        None, description="Session to stop (defaults to the only running one)"
+    ),
+):
+    """Stop a detection session"""
     try:
-        result = await detection_service.stop_detection()
+        result = await detection_service.stop_detection(session_id)
         return DetectionStopResponse(**result)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except RuntimeError as e:
         logger.error(f"No active detection session: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -52,11 +70,52 @@ async def stop_detection():
 
 
 @router.get("/status", response_model=DetectionStatusResponse)
-async def get_detection_status():
-    """Get current detection status"""
+async def get_detection_status(
+    session_id: Optional[str] = Query(None, description="Session id (defaults to the most recent)"),
+):
+    """Get detection status"""
     try:
-        status = detection_service.get_status()
+        status = detection_service.get_status(session_id)
         return DetectionStatusResponse(**status)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get detection status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
+
+
+@router.get("/sessions", response_model=DetectionSessionListResponse)
+async def list_detection_sessions():
+    """List all detection sessions with aggregate statistics"""
+    try:
+        return DetectionSessionListResponse(**detection_service.list_sessions())
+    except Exception as e:
+        logger.error(f"Failed to list detection sessions: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to list sessions: {str(e)}")
+
+
+@router.get("/sessions/{session_id}", response_model=DetectionStatusResponse)
+async def get_detection_session(session_id: str):
+    """Get the status of one detection session"""
+    return await get_detection_status(session_id)
+
+
+@router.post("/sessions/{session_id}/stop", response_model=DetectionStopResponse)
+async def stop_detection_session(session_id: str):
+    """Stop one detection session"""
+    return await stop_detection(session_id)
+
+
+@router.get("/sessions/{session_id}/stream")
+async def stream_detection_session(
+    session_id: str,
+    tier: str = Query("standard", description="Quality tier: thumbnail, standard or full"),
+):
+    """Annotated output of one session as an MJPEG stream (multipart/x-mixed-replace)"""
+    if tier not in STREAM_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier: {tier}")
+    try:
+        slot = detection_service.get_stream_slot(session_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return mjpeg_response(slot, STREAM_TIERS[tier], load_settings().detection.mjpeg_fps)
@@ -0,0 +1,385 @@
+"""Headless batch processing of video files.
+
+Usage:
+    python -m backend.cli run videos/ extra.mp4 --workers 4 --summary summary.json
+    python -m backend.cli run archive.mp4 --chunked --workers 16
+
+Files are scheduled across a process pool (each worker loads the models once);
+``--chunked`` instead splits each file into keyframe-aligned chunks processed in
+parallel. Progress goes to stderr, the JSON summary to stdout or ``--summary``;
+anything else written to stdout (by this process or a worker) is sent to stderr.
+Neither the web server, the WebSocket layer nor the audio stack is started.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from backend.core.chunked_processor import ChunkedVideoProcessor
+from backend.core.email_notifier import EmailNotifier
+from backend.core.incident_manager import IncidentManager, IncidentRecord
+from backend.core.model_loader import init_process_loader, process_loader
+from backend.core.settings import AppSettings, DetectionSettings, load_settings
+from backend.core.video_processor import RENDER_MODES, FramePacket, VideoProcessor
+from backend.services.incident_service import IncidentService
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".ts", ".flv", ".wmv")
+PROGRESS_INTERVAL = 2.0  # 每个文件至少间隔多少秒汇报一次进度
+
+
+def collect_videos(paths: List[str], recursive: bool = True) -> List[Path]:
+    """Video files named on the command line or found in the given directories, deduplicated."""
+    videos: List[Path] = []
+    seen = set()
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            found = sorted(path.rglob("*") if recursive else path.iterdir())
+            candidates = [p for p in found if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS]
+        elif path.is_file():
+            candidates = [path]
+        else:
+            logger.warning(f"跳过不存在的路径: {raw}")
+            continue
+        for candidate in candidates:
+            key = candidate.resolve()
+            if key not in seen:
+                seen.add(key)
+                videos.append(candidate)
+    return videos
+
+
+def _build_incident_manager(settings: AppSettings) -> IncidentManager:
+    email_notifier = EmailNotifier(settings.email) if settings.email.enabled else None
+    return IncidentManager(output_dir=settings.incident_output_dir, email_notifier=email_notifier)
+
+
+class _BatchVideoProcessor(VideoProcessor):
+    """``VideoProcessor`` reporting progress to the parent and remembering its incidents."""
+
+    def __init__(self, *args, progress=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.progress = progress
+        self.incident_ids: List[str] = []
+        self._file_total = self.total_frames
+        self.total_frames = None  # 进度由父进程统一输出, 不使用 tqdm
+        self._last_report = 0.0
+        self._started_at = time.perf_counter()
+
+    def _ensure_incident(self, *args, **kwargs) -> Optional[str]:
+        incident_id = super()._ensure_incident(*args, **kwargs)
+        if incident_id and incident_id not in self.incident_ids:
+            self.incident_ids.append(incident_id)
+        return incident_id
+
+    def _frame_done(self, packet: FramePacket):
+        now = time.perf_counter()
+        if self.progress is not None and now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self.progress.put(
+                {
+                    "file": str(self.video_source),
+                    "frames": self._frames_done,
+                    "total": self._file_total,
+                    "fps": self._frames_done / (now - self._started_at),
+                }
+            )
+
+
+# 工作进程内的进度队列 (由父进程的 Manager 创建)
+_progress_queue = None
+
+
+def _init_worker(
+    detection_settings: DetectionSettings, threads: int, log_level: str, progress_queue
+) -> None:
+    global _progress_queue
+    logger.remove()
+    logger.add(sys.stderr, level=log_level)
+    _progress_queue = progress_queue
+    # 模型加载失败时不抛出 (否则只得到 BrokenProcessPool), 由 process_loader() 在任务中报告原因
+    init_process_loader(
+        detection_settings.river_backend, detection_settings.person_backend, threads
+    )
+
+
+def _output_names(videos: List[Path]) -> Dict[Path, str]:
+    """Output name stem per video; same-named files from different directories get a suffix."""
+    names: Dict[Path, str] = {}
+    used: Dict[str, int] = {}
+    for video in videos:
+        count = used.get(video.stem, 0)
+        used[video.stem] = count + 1
+        names[video] = video.stem if count == 0 else f"{video.stem}_{count}"
+    return names
+
+
+def _output_path(name: str, output_dir: Optional[Path]) -> Optional[str]:
+    if output_dir is None:
+        return None
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return str(output_dir / f"{name}_detected.mp4")
+
+
+def _incident_summary(manager: IncidentManager, incident_ids: List[str]) -> List[Dict[str, Any]]:
+    records = [manager.get_record(i) for i in incident_ids]
+    return [asdict(r) for r in records if r is not None]
+
+
+def process_file(
+    video: str, output_path: Optional[str], render_mode: str, settings: AppSettings
+) -> Dict[str, Any]:
+    """Process one file in a pool worker; returns its summary entry."""
+    model_loader = process_loader()
+    started_at = time.perf_counter()
+    incident_manager = _build_incident_manager(settings)
+    processor = _BatchVideoProcessor(
+        video,
+        output_path,
+        record_output=output_path is not None,
+        render_mode=render_mode,
+        detection_settings=settings.detection,
+        model_loader=model_loader,
+        incident_manager=incident_manager,
+        camera_id=Path(video).stem,
+        progress=_progress_queue,
+    )
+    processor.process_video()
+    elapsed = time.perf_counter() - started_at
+    return {
+        "path": video,
+        "status": "ok",
+        "output": processor.output_path if processor.record_output else None,
+        "frames": processor._frames_done,
+        "elapsed": elapsed,
+        "fps": processor._frames_done / elapsed if elapsed else 0.0,
+        "incidents": _incident_summary(incident_manager, processor.incident_ids),
+        "metrics": processor.get_metrics(),
+    }
+
+
+def _print_progress(queue, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            update = queue.get(timeout=0.5)
+        except Exception:
+            continue
+        total = update["total"]
+        frames = update["frames"]
+        done = f"{frames}/{total} ({frames / total:.0%})" if total else str(frames)
+        name = Path(update["file"]).name
+        print(f"  {name}: {done} 帧, {update['fps']:.1f} FPS", file=sys.stderr, flush=True)
+
+
+def run_batch(videos: List[Path], args, settings: AppSettings) -> List[Dict[str, Any]]:
+    output_dir = Path(args.output_dir) if args.record else None
+    workers = max(1, min(args.workers, len(videos)))
+    threads = settings.detection.inference_threads_per_model or max(
+        1, (os.cpu_count() or 1) // workers
+    )
+    print(f"处理 {len(videos)} 个文件, {workers} 个进程, 每进程 {threads} 线程", file=sys.stderr, flush=True)
+
+    # spawn: 每个进程独立加载模型, 不继承父进程的 torch/CUDA 状态
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    progress = manager.Queue()
+    stop = threading.Event()
+    printer = threading.Thread(target=_print_progress, args=(progress, stop), daemon=True)
+    printer.start()
+    results: List[Dict[str, Any]] = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(settings.detection, threads, args.log_level, progress),
+        ) as pool:
+            names = _output_names(videos)
+            futures = {
+                pool.submit(
+                    process_file,
+                    str(video),
+                    _output_path(names[video], output_dir),
+                    args.render_mode,
+                    settings,
+                ): video
+                for video in videos
+            }
+            for future in as_completed(futures):
+                video = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.exception(f"处理失败: {video}")
+                    result = {"path": str(video), "status": "error", "error": str(e)}
+                results.append(result)
+                _report_done(result, len(results), len(videos))
+    finally:
+        stop.set()
+        printer.join(timeout=1.0)
+        manager.shutdown()
+    order = {str(v): i for i, v in enumerate(videos)}
+    return sorted(results, key=lambda r: order[r["path"]])
+
+
+def run_chunked(videos: List[Path], args, settings: AppSettings) -> List[Dict[str, Any]]:
+    """One file at a time, each split into chunks processed across ``--workers`` processes."""
+    output_dir = Path(args.output_dir) if args.record else None
+    names = _output_names(videos)
+    results = []
+    for n, video in enumerate(videos, 1):
+        incident_manager = _build_incident_manager(settings)
+        output_path = _output_path(names[video], output_dir)
+        try:
+            result = ChunkedVideoProcessor(
+                str(video),
+                output_path,
+                detection_settings=settings.detection,
+                workers=args.workers,
+                incident_manager=incident_manager,
+                camera_id=video.stem,
+            ).process()
+            if args.detections:
+                Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+                result.save_detections(Path(args.output_dir) / f"{names[video]}_detections.jsonl")
+            entry = {
+                "path": str(video),
+                "status": "ok",
+                "output": result.output_path,
+                "frames": len(result.frames),
+                "elapsed": result.elapsed,
+                "fps": len(result.frames) / result.elapsed if result.elapsed else 0.0,
+                "chunks": len(result.chunks),
+                "incidents": _incident_summary(incident_manager, result.incident_ids),
+            }
+        except Exception as e:
+            logger.exception(f"处理失败: {video}")
+            entry = {"path": str(video), "status": "error", "error": str(e)}
+        results.append(entry)
+        _report_done(entry, n, len(videos))
+    return results
+
+
+def _report_done(result: Dict[str, Any], done: int, total: int) -> None:
+    name = Path(result["path"]).name
+    if result["status"] == "ok":
+        line = (
+            f"[{done}/{total}] 完成 {name}: {result['frames']} 帧, {result['fps']:.1f} FPS, "
+            f"{len(result['incidents'])} 个事件"
+        )
+    else:
+        line = f"[{done}/{total}] 失败 {name}: {result['error']}"
+    print(line, file=sys.stderr, flush=True)
+
+
+def _persist_incidents(results: List[Dict[str, Any]], settings: AppSettings) -> None:
+    """Add the new incidents to the metadata the web UI lists."""
+    service = IncidentService(settings.incident_output_dir)
+    for result in results:
+        for incident in result.get("incidents", []):
+            service.add_incident(IncidentRecord(**incident))
+
+
+def build_summary(
+    results: List[Dict[str, Any]], elapsed: float, workers: int, mode: str
+) -> Dict[str, Any]:
+    succeeded = [r for r in results if r["status"] == "ok"]
+    frames = sum(r["frames"] for r in succeeded)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "elapsed": elapsed,
+        "files": results,
+        "totals": {
+            "files": len(results),
+            "failed": len(results) - len(succeeded),
+            "frames": frames,
+            "incidents": sum(len(r["incidents"]) for r in succeeded),
+            "fps": frames / elapsed if elapsed else 0.0,
+        },
+    }
+
+
+def cmd_run(args) -> int:
+    settings = load_settings()
+    overrides = {k: v for k, v in (("inference_width", args.inference_width),) if v is not None}
+    if overrides:
+        detection = DetectionSettings.model_validate(
+            {**settings.detection.model_dump(), **overrides}
+        )
+        settings = settings.model_copy(update={"detection": detection})
+    videos = collect_videos(args.paths, recursive=not args.no_recursive)
+    if not videos:
+        print("没有找到视频文件", file=sys.stderr)
+        return 2
+
+    started_at = time.perf_counter()
+    if args.chunked:
+        results = run_chunked(videos, args, settings)
+    else:
+        results = run_batch(videos, args, settings)
+    _persist_incidents(results, settings)
+    mode = "chunked" if args.chunked else "files"
+    summary = build_summary(results, time.perf_counter() - started_at, args.workers, mode)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2, default=str)
+    if args.summary:
+        Path(args.summary).write_text(text, encoding="utf-8")
+        print(f"汇总已写入 {args.summary}", file=sys.stderr)
+    else:
+        print(text, file=getattr(args, "summary_stream", None) or sys.stdout, flush=True)
+    return 1 if summary["totals"]["failed"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.cli", description="溺水检测批处理命令行")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="批量处理视频文件或目录")
+    run.add_argument("paths", nargs="+", help="视频文件或目录 (目录默认递归查找)")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数 (默认 CPU 核数)")
+    run.add_argument("--output-dir", default="output/batch", help="标注视频输出目录")
+    run.add_argument("--no-record", dest="record", action="store_false", help="不输出标注视频")
+    run.add_argument("--render-mode", choices=RENDER_MODES, default="auto", help="渲染模式")
+    run.add_argument("--chunked", action="store_true", help="逐个文件处理, 每个文件按关键帧切分后并行检测 (适合长视频)")
+    run.add_argument("--detections", action="store_true", help="分段模式下额外输出逐帧检测结果 (JSON Lines)")
+    run.add_argument("--inference-width", type=int, default=None, help="覆盖配置中的 inference_width")
+    run.add_argument("--no-recursive", action="store_true", help="目录只查找第一层")
+    run.add_argument("--summary", help="JSON 汇总输出文件 (默认输出到 stdout)")
+    run.add_argument("--log-level", default="WARNING", help="工作进程日志级别")
+    run.set_defaults(func=cmd_run)
+    return parser
+
+
+def _detach_stdout():
+    """Keep the real stdout for the JSON summary and point file descriptor 1 at stderr.
+
+    Libraries write to stdout on their own (ultralytics' logger, pygame's
+    banner); worker and Manager processes inherit the redirected descriptor.
+    """
+    sys.stdout.flush()
+    summary_stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return summary_stream
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.summary_stream = _detach_stdout()
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,39 @@
 # 这个文件可以为空,或者包含一些包级别的导入
 
 # 例如,你可以在这里导入常用的模块,使它们更容易从包的其他地方访问
-from .video_processor import VideoProcessor
-from .audio_manager import AudioManager
-from .detection_utils import draw_river_mask, draw_person_boxes, draw_warning, draw_info
-from .model_loader import ModelLoader
+# 导出按需加载: 导入 backend.core.xxx 子模块时不会连带加载 pygame 等重量级依赖
+# (pygame 在导入时向 stdout 打印欢迎信息, 会破坏命令行的 JSON 输出)
+import importlib
+
+_EXPORTS = {
+    'VideoProcessor': '.video_processor',
+    'AudioManager': '.audio_manager',
+    'draw_river_mask': '.detection_utils',
+    'draw_person_boxes': '.detection_utils',
+    'draw_person_boxes_with_overlap': '.detection_utils',
+    'draw_warning': '.detection_utils',
+    'draw_info': '.detection_utils',
+    'render_analysis': '.detection_utils',
+    'RiverOverlapIndex': '.detection_utils',
+    'FrameAnalysis': '.frame_analysis',
+    'analyze_results': '.frame_analysis',
+    'ModelLoader': '.model_loader',
+    'OverlayCompositor': '.overlay_renderer',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 # 你也可以定义 __all__ 变量来控制 from src import * 时导入的内容
-__all__ = ['VideoProcessor', 'AudioManager', 'draw_river_mask', 'draw_person_boxes', 'draw_warning', 'draw_info', 'ModelLoader']
\ No newline at end of file
+__all__ = list(_EXPORTS)
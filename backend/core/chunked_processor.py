@@ -0,0 +1,751 @@
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from backend.core.frame_analysis import DROWNING_OVERLAP_THRESHOLD, PERSON_CLASS_ID, FrameAnalysis
+from backend.core.incident_manager import IncidentManager
+from backend.core.model_loader import init_process_loader, process_loader
+from backend.core.settings import DetectionSettings
+from backend.core.video_processor import FramePacket, VideoProcessor
+from backend.core.vlm_worker import VLMTask, VLMWorker
+
+
+@dataclass
+class VideoChunk:
+    """Frames ``[start, end)`` of a file; analysis starts earlier, at ``preroll_start``.
+
+    ``start`` is a keyframe when the container exposes them, so workers seek
+    without decoding from the previous keyframe. The preroll frames warm up the
+    chunk's tracker and are analyzed by the previous chunk as well, which is
+    what track ids are reconciled on.
+    """
+
+    index: int
+    start: int
+    end: int
+    preroll_start: int
+
+
+@dataclass
+class FrameDetections:
+    """Detections of one frame in frame coordinates (the picklable part of a ``FrameAnalysis``)."""
+
+    index: int
+    boxes: np.ndarray
+    track_ids: np.ndarray
+    classes: np.ndarray
+    overlap_ratios: np.ndarray
+    # shared between consecutive frames until the river is re-segmented
+    river_polygons: List[np.ndarray] = field(default_factory=list)
+
+    @property
+    def alert(self) -> bool:
+        persons = self.classes == PERSON_CLASS_ID
+        return bool(np.any(self.overlap_ratios[persons] > DROWNING_OVERLAP_THRESHOLD))
+
+    def to_analysis(self, height: int, width: int) -> FrameAnalysis:
+        return FrameAnalysis(
+            height=height,
+            width=width,
+            # overlaps are already known; the mask is not needed to alert or draw
+            river_mask=np.zeros((0, 0), dtype=np.uint8),
+            river_polygons=self.river_polygons,
+            boxes=self.boxes,
+            track_ids=self.track_ids,
+            classes=self.classes,
+            overlap_ratios=self.overlap_ratios,
+        )
+
+    def to_dict(self, fps: float) -> Dict:
+        return {
+            "frame": self.index,
+            "time": round(self.index / fps, 3) if fps else None,
+            "detections": [
+                {
+                    "track_id": int(track_id),
+                    "class": int(cls),
+                    "bbox": [int(v) for v in box],
+                    "overlap": round(float(overlap), 4),
+                }
+                for box, track_id, cls, overlap in zip(
+                    self.boxes, self.track_ids, self.classes, self.overlap_ratios
+                )
+            ],
+        }
+
+
+@dataclass
+class ChunkAnalysis:
+    chunk: VideoChunk
+    frames: List[FrameDetections]
+    elapsed: float
+    metrics: Dict
+
+
+@dataclass
+class PendingIncident:
+    """An incident found by a render worker; the parent process files it in order."""
+
+    frame_id: int
+    timestamp: float
+    overlap_ratio: float
+    bbox: Tuple[int, int, int, int]
+    screenshot: np.ndarray
+    crop: Optional[np.ndarray] = None
+    crop_bbox: Optional[Tuple[int, int, int, int]] = None
+
+
+@dataclass
+class ChunkRender:
+    chunk: VideoChunk
+    segment_path: Optional[str]
+    incidents: List[PendingIncident]
+    elapsed: float
+
+
+@dataclass
+class ChunkedResult:
+    video_path: str
+    output_path: Optional[str]
+    fps: float
+    chunks: List[VideoChunk]
+    frames: List[FrameDetections]
+    incident_ids: List[str]
+    elapsed: float
+    analyze_seconds: List[float]
+
+    def save_detections(self, path) -> None:
+        """Write one JSON object per frame (reconciled track ids, frame coordinates)."""
+        with open(path, "w", encoding="utf-8") as f:
+            for frame in self.frames:
+                f.write(json.dumps(frame.to_dict(self.fps), ensure_ascii=False) + "\n")
+
+
+def keyframe_indices(video_path) -> Tuple[List[int], int]:
+    """Keyframe indices and the exact frame count, from a packet scan without decoding.
+
+    Uses OpenCV's raw stream mode; returns ``([], 0)`` when the backend does not
+    support it (the caller then falls back to evenly spaced boundaries).
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return [], 0
+        keyframes = []
+        count = 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(count)
+            count += 1
+        return keyframes, count
+    finally:
+        cap.release()
+
+
+def plan_chunks(
+    total_frames: int, keyframes: List[int], chunks: int, overlap_frames: int
+) -> List[VideoChunk]:
+    """Split ``total_frames`` into up to ``chunks`` ranges whose starts sit on keyframes."""
+    boundaries = [0]
+    for i in range(1, max(1, chunks)):
+        target = round(i * total_frames / chunks)
+        if keyframes:
+            pos = bisect_right(keyframes, target)
+            candidates = keyframes[max(0, pos - 1):pos + 1]
+            target = min(candidates, key=lambda k: abs(k - target))
+        if boundaries[-1] < target < total_frames:
+            boundaries.append(target)
+    boundaries.append(total_frames)
+
+    planned = []
+    for i, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+        preroll_start = max(0, start - overlap_frames)
+        if keyframes and start > 0:
+            # seek to the keyframe at or before the preroll
+            preroll_start = keyframes[max(0, bisect_right(keyframes, preroll_start) - 1)]
+        planned.append(VideoChunk(index=i, start=start, end=end, preroll_start=preroll_start))
+    return planned
+
+
+def _match_tracks(frame: FrameDetections, reference: FrameDetections, iou_threshold: float):
+    """Greedy IoU pairs ``(track_id, reference_track_id)`` of same-class tracked boxes."""
+    mine = np.flatnonzero(frame.track_ids >= 0)
+    theirs = np.flatnonzero(reference.track_ids >= 0)
+    if len(mine) == 0 or len(theirs) == 0:
+        return []
+    a = frame.boxes[mine].astype(np.float64)
+    b = reference.boxes[theirs].astype(np.float64)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+    iou[frame.classes[mine][:, None] != reference.classes[theirs][None, :]] = 0
+    pairs = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < iou_threshold:
+            return pairs
+        pairs.append((int(frame.track_ids[mine[i]]), int(reference.track_ids[theirs[j]])))
+        iou[i, :] = 0
+        iou[:, j] = 0
+
+
+def reconcile_track_ids(
+    analyses: List[ChunkAnalysis], iou_threshold: float = 0.3
+) -> List[FrameDetections]:
+    """Merge chunk detections in frame order with one track id space.
+
+    A chunk's track takes the id of the previous chunk's track it overlaps most
+    often on the preroll frames both chunks analyzed; every other track gets a
+    fresh id. Preroll frames are then dropped in favour of the previous chunk's.
+    """
+    merged: List[FrameDetections] = []
+    next_id = 1
+    tail: Dict[int, FrameDetections] = {}
+    for n, result in enumerate(analyses):
+        start = result.chunk.start
+        votes: Counter = Counter()
+        for frame in result.frames:
+            if frame.index >= start:
+                break
+            reference = tail.get(frame.index)
+            if reference is not None:
+                votes.update(_match_tracks(frame, reference, iou_threshold))
+        mapping: Dict[int, int] = {}
+        taken = set()
+        for (local_id, global_id), _ in votes.most_common():
+            if local_id not in mapping and global_id not in taken:
+                mapping[local_id] = global_id
+                taken.add(global_id)
+
+        next_preroll = analyses[n + 1].chunk.preroll_start if n + 1 < len(analyses) else None
+        tail = {}
+        for frame in result.frames:
+            for track_id in frame.track_ids:
+                if track_id >= 0 and int(track_id) not in mapping:
+                    mapping[int(track_id)] = next_id
+                    next_id += 1
+            if frame.index < start:
+                continue
+            remapped = FrameDetections(
+                index=frame.index,
+                boxes=frame.boxes,
+                track_ids=np.array(
+                    [mapping.get(int(t), -1) for t in frame.track_ids], dtype=np.int64
+                ),
+                classes=frame.classes,
+                overlap_ratios=frame.overlap_ratios,
+                river_polygons=frame.river_polygons,
+            )
+            merged.append(remapped)
+            if next_preroll is not None and frame.index >= next_preroll:
+                tail[frame.index] = remapped
+    return merged
+
+
+def replay_range(
+    alerts: List[int], start: int, fps: float, detection_window: float
+) -> Tuple[int, int]:
+    """Frames ``[first, stop)`` to replay so the warning/incident state at ``start`` is exact.
+
+    The state only depends on the last burst of alerts (alerts less than
+    ``detection_window`` apart) before ``start``: replay from its first alert
+    until its warning has been cleared, after which nothing changes until the
+    next alert. ``alerts`` are the sorted alert frame indices.
+    """
+    pos = bisect_left(alerts, start)
+    if pos == 0:
+        return start, start
+    first = pos - 1
+    while first > 0 and (alerts[first] - 1 - alerts[first - 1]) / fps <= detection_window:
+        first -= 1
+    # the first frame more than detection_window after the last alert clears the warning
+    cleared = int(alerts[pos - 1] + detection_window * fps) + 1
+    return alerts[first], min(start, cleared + 1)
+
+
+class _ChunkAnalyzer(VideoProcessor):
+    """Runs the models over one chunk (preroll included) and keeps the detections."""
+
+    def __init__(
+        self,
+        video_path: str,
+        chunk: VideoChunk,
+        fps: float,
+        detection_settings: DetectionSettings,
+        model_loader,
+    ):
+        self.chunk_fps = fps  # the parent's float fps, used for timestamps and the warning window
+        super().__init__(
+            video_path,
+            None,
+            record_output=False,
+            render_mode="headless",
+            detection_settings=detection_settings,
+            model_loader=model_loader,
+            camera_id=f"{video_path}#{chunk.index}",
+        )
+        self.chunk = chunk
+        self.total_frames = None  # 各分段不单独显示进度条
+        self.frames: List[FrameDetections] = []
+        self._river_source = None
+        self._river_polygons: List[np.ndarray] = []
+
+    def _source_fps(self):
+        return self.chunk_fps
+
+    def _log_start(self):
+        logger.info(
+            f"分段 {self.chunk.index}: 检测帧 {self.chunk.preroll_start}-{self.chunk.end} "
+            f"(预热 {self.chunk.start - self.chunk.preroll_start} 帧)"
+        )
+
+    def _read_frame(self) -> Optional[FramePacket]:
+        if self._frames_read == 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.chunk.preroll_start)
+        index = self.chunk.preroll_start + self._frames_read
+        if index >= self.chunk.end or self._stop_requested():
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._frames_read += 1
+        # 视频时间戳: 各分段并行处理, 墙钟时间没有意义
+        return FramePacket(index=index, frame=frame, timestamp=index / self.fps)
+
+    def _analyze_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        analysis = self._analyze_packet(packet)
+        if analysis.river_polygons is not self._river_source:
+            self._river_source = analysis.river_polygons
+            self._river_polygons = [np.asarray(p) for p in analysis.river_polygons]
+        self.frames.append(
+            FrameDetections(
+                index=packet.index,
+                boxes=analysis.frame_boxes(),
+                track_ids=analysis.track_ids,
+                classes=analysis.classes,
+                overlap_ratios=analysis.overlap_ratios,
+                river_polygons=self._river_polygons,
+            )
+        )
+        return packet
+
+
+class _ChunkRenderer(VideoProcessor):
+    """Replays merged detections over one chunk.
+
+    Covers the warnings, the incident screenshots and the output segment.
+
+    The ``replay`` frames before the chunk start are run through the warning
+    logic without decoding, so the state entering the chunk matches a
+    sequential run.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        segment_path: Optional[str],
+        chunk: VideoChunk,
+        fps: float,
+        replay: Tuple[int, int],
+        frames: List[FrameDetections],
+        detection_settings: DetectionSettings,
+        model_loader,
+    ):
+        # needed by _create_writer during VideoProcessor.__init__
+        self.chunk = chunk
+        self.chunk_fps = fps
+        super().__init__(
+            video_path,
+            segment_path,
+            record_output=segment_path is not None,
+            render_mode="auto" if segment_path is not None else "headless",
+            detection_settings=detection_settings,
+            model_loader=model_loader,
+            camera_id=f"{video_path}#{chunk.index}",
+        )
+        self.replay = replay
+        self.total_frames = None
+        self.analyses = {f.index: f.to_analysis(self.height, self.width) for f in frames}
+        self._no_detections = FrameDetections(
+            index=-1,
+            boxes=np.zeros((0, 4), dtype=np.int64),
+            track_ids=np.zeros(0, dtype=np.int64),
+            classes=np.zeros(0, dtype=np.int64),
+            overlap_ratios=np.zeros(0, dtype=np.float64),
+        ).to_analysis(self.height, self.width)
+        self.incidents: List[PendingIncident] = []
+        self._replaying = False
+
+    def _create_writer(self, start_index: int = 0):
+        # JPEG sequences are written straight into the final directory, numbered by frame
+        return super()._create_writer(start_index=self.chunk.start)
+
+    def process_video(self):
+        self._replaying = True
+        for index in range(*self.replay):
+            self._analyze_stage(FramePacket(index=index, frame=None, timestamp=index / self.fps))
+        self._replaying = False
+        super().process_video()
+
+    def _source_fps(self):
+        return self.chunk_fps
+
+    def _log_start(self):
+        logger.info(f"分段 {self.chunk.index}: 渲染帧 {self.chunk.start}-{self.chunk.end}")
+
+    def _read_frame(self) -> Optional[FramePacket]:
+        if self._frames_read == 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.chunk.start)
+        index = self.chunk.start + self._frames_read
+        if index >= self.chunk.end or self._stop_requested():
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._frames_read += 1
+        return FramePacket(index=index, frame=frame, timestamp=index / self.fps)
+
+    def _analyze_packet(self, packet: FramePacket) -> FrameAnalysis:
+        # frames the analysis pass could not decode carry no detections
+        return self.analyses.get(packet.index, self._no_detections)
+
+    def _ensure_incident(
+        self, frame, analysis, bbox, overlap_ratio, timestamp, frame_id
+    ) -> Optional[str]:
+        if bbox is None:
+            return None
+        if self.current_incident_id:
+            return self.current_incident_id
+        self.current_incident_id = f"chunk{self.chunk.index}:{frame_id}"
+        # replayed frames belong to the previous chunk, which files their incident
+        if frame is not None:
+            cropped = self._crop_bbox(frame, bbox)
+            self.incidents.append(
+                PendingIncident(
+                    frame_id=frame_id,
+                    timestamp=timestamp,
+                    overlap_ratio=overlap_ratio,
+                    bbox=bbox,
+                    screenshot=self.render_overlays(frame, analysis),
+                    crop=cropped[0] if cropped else None,
+                    crop_bbox=cropped[1] if cropped else None,
+                )
+            )
+        return self.current_incident_id
+
+    def _maybe_dispatch_vlm_task(self, *args, **kwargs):
+        """The parent process dispatches VLM tasks for the merged incidents."""
+
+    def _log_alert(self, frame_id: int, overlap_ratio: float, bbox, incident_id: Optional[str]):
+        if not self._replaying:
+            super()._log_alert(frame_id, overlap_ratio, bbox, incident_id)
+
+    def print_warning(self, message):
+        if not self._replaying:
+            super().print_warning(message)
+
+    def print_warning_cleared(self, message):
+        if not self._replaying:
+            super().print_warning_cleared(message)
+
+
+def _analyze_chunk(
+    video_path: str, chunk: VideoChunk, fps: float, detection_settings: DetectionSettings
+) -> ChunkAnalysis:
+    started_at = time.perf_counter()
+    processor = _ChunkAnalyzer(video_path, chunk, fps, detection_settings, process_loader())
+    processor.process_video()
+    return ChunkAnalysis(
+        chunk=chunk,
+        frames=processor.frames,
+        elapsed=time.perf_counter() - started_at,
+        metrics=processor.get_metrics(),
+    )
+
+
+def _render_chunk(
+    video_path: str,
+    segment_path: Optional[str],
+    chunk: VideoChunk,
+    fps: float,
+    replay: Tuple[int, int],
+    frames: List[FrameDetections],
+    detection_settings: DetectionSettings,
+) -> ChunkRender:
+    started_at = time.perf_counter()
+    processor = _ChunkRenderer(
+        video_path, segment_path, chunk, fps, replay, frames, detection_settings, process_loader()
+    )
+    processor.process_video()
+    return ChunkRender(
+        chunk=chunk,
+        segment_path=segment_path,
+        incidents=processor.incidents,
+        elapsed=time.perf_counter() - started_at,
+    )
+
+
+def concat_segments(
+    segment_paths: List[str], output_path: str, fps: float, size: Tuple[int, int]
+) -> None:
+    """Join the chunk segments in order.
+
+    Stream copy with ffmpeg if it is installed, else re-encode with OpenCV.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = Path(output_path).with_suffix(".segments.txt")
+        list_path.write_text(
+            "".join(f"file '{Path(p).resolve()}'\n" for p in segment_paths), encoding="utf-8"
+        )
+        try:
+            subprocess.run(
+                [
+                    ffmpeg,
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    str(list_path),
+                    "-c",
+                    "copy",
+                    output_path,
+                ],
+                check=True,
+            )
+            return
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"ffmpeg 拼接失败, 改用 OpenCV 重新编码: {e}")
+        finally:
+            list_path.unlink(missing_ok=True)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    try:
+        for path in segment_paths:
+            cap = cv2.VideoCapture(path)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+            cap.release()
+    finally:
+        writer.release()
+
+
+class ChunkedVideoProcessor:
+    """Offline processing of a long video file in parallel, keyframe-aligned chunks.
+
+    1. Each chunk (plus a short preroll) is analyzed in a worker process with
+       its own tracker.
+    2. Detections are merged in frame order and track ids are reconciled on
+       the preroll frames shared by neighbouring chunks.
+    3. Workers replay the merged detections per chunk to render their part of
+       the output and collect incidents; warning state is carried across
+       boundaries by replaying the alert burst that spans them.
+    4. Segments are concatenated and incidents are filed in order.
+
+    Timestamps are video time (seconds from the start of the file).
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        output_path: Optional[str] = None,
+        detection_settings: Optional[DetectionSettings] = None,
+        workers: Optional[int] = None,
+        incident_manager: Optional[IncidentManager] = None,
+        vlm_worker: Optional[VLMWorker] = None,
+        camera_id: Optional[str] = None,
+    ) -> None:
+        settings = detection_settings or DetectionSettings()
+        # 离线处理需要逐帧检测: 自适应跳帧按墙钟延迟决策, 在此关闭
+        self.detection_settings = settings.model_copy(update={"adaptive_stride": False})
+        self.video_path = str(video_path)
+        # jpeg: 各分段直接按帧号写入同一目录, 无需拼接
+        self._jpeg_output = settings.video_writer == "jpeg"
+        if settings.video_writer == "disabled" or not output_path:
+            self.output_path = None
+        else:
+            self.output_path = (
+                str(Path(output_path).with_suffix("")) if self._jpeg_output else output_path
+            )
+        self.workers = workers or settings.chunk_workers or os.cpu_count() or 1
+        self.incident_manager = incident_manager
+        self.vlm_worker = vlm_worker
+        self.camera_id = camera_id or self.video_path
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video file: {self.video_path}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    def plan(self) -> List[VideoChunk]:
+        keyframes, counted = keyframe_indices(self.video_path)
+        total = counted or self.total_frames
+        min_frames = max(1, int(self.detection_settings.chunk_min_seconds * self.fps))
+        chunks = max(1, min(self.workers, total // min_frames))
+        overlap = int(self.detection_settings.chunk_overlap_seconds * self.fps)
+        if not keyframes:
+            logger.warning("无法读取关键帧位置, 按帧数均分 (分段起点需要从前一个关键帧解码)")
+        return plan_chunks(total, keyframes, chunks, overlap)
+
+    def process(self) -> ChunkedResult:
+        started_at = time.perf_counter()
+        chunks = self.plan()
+        workers = min(self.workers, len(chunks))
+        threads = self.detection_settings.inference_threads_per_model or max(
+            1, (os.cpu_count() or 1) // workers
+        )
+        logger.info(
+            f"离线分段处理: {self.video_path}, {len(chunks)} 段, "
+            f"{workers} 个进程, 每进程 {threads} 线程"
+        )
+
+        segment_dir = None
+        if self.output_path and not self._jpeg_output:
+            segment_dir = tempfile.mkdtemp(
+                prefix="chunks-", dir=str(Path(self.output_path).resolve().parent)
+            )
+        try:
+            # spawn: 每个进程独立加载模型, 不继承父进程的 torch/CUDA 状态
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_process_loader,
+                initargs=(
+                    self.detection_settings.river_backend,
+                    self.detection_settings.person_backend,
+                    threads,
+                ),
+            ) as pool:
+                analyses = list(
+                    pool.map(
+                        _analyze_chunk,
+                        [self.video_path] * len(chunks),
+                        chunks,
+                        [self.fps] * len(chunks),
+                        [self.detection_settings] * len(chunks),
+                    )
+                )
+                frames = reconcile_track_ids(analyses)
+                renders = self._render(pool, chunks, frames, segment_dir)
+            if segment_dir is not None:
+                concat_segments(
+                    [r.segment_path for r in renders],
+                    self.output_path,
+                    self.fps,
+                    (self.width, self.height),
+                )
+        finally:
+            if segment_dir is not None:
+                shutil.rmtree(segment_dir, ignore_errors=True)
+
+        incident_ids = self._file_incidents([i for r in renders for i in r.incidents])
+        result = ChunkedResult(
+            video_path=self.video_path,
+            output_path=self.output_path,
+            fps=self.fps,
+            chunks=chunks,
+            frames=frames,
+            incident_ids=incident_ids,
+            elapsed=time.perf_counter() - started_at,
+            analyze_seconds=[a.elapsed for a in analyses],
+        )
+        logger.info(
+            f"离线分段处理完成: {len(frames)} 帧, {len(incident_ids)} 个事件, 耗时 {result.elapsed:.1f}s "
+            f"({len(frames) / result.elapsed:.1f} FPS)"
+        )
+        return result
+
+    def _render(
+        self, pool, chunks: List[VideoChunk], frames: List[FrameDetections], segment_dir
+    ) -> List[ChunkRender]:
+        alerts = [f.index for f in frames if f.alert]
+        indices = [f.index for f in frames]
+
+        def between(first: int, stop: int) -> List[FrameDetections]:
+            return frames[bisect_left(indices, first):bisect_left(indices, stop)]
+
+        jobs = []
+        for chunk in chunks:
+            replay = replay_range(alerts, chunk.start, self.fps, VideoProcessor.DETECTION_WINDOW)
+            if segment_dir is not None:
+                segment_path = str(Path(segment_dir) / f"part{chunk.index:04d}.mp4")
+            else:
+                segment_path = self.output_path
+            detections = between(*replay) + between(chunk.start, chunk.end)
+            jobs.append((segment_path, chunk, replay, detections))
+        return list(
+            pool.map(
+                _render_chunk,
+                [self.video_path] * len(jobs),
+                [j[0] for j in jobs],
+                [j[1] for j in jobs],
+                [self.fps] * len(jobs),
+                [j[2] for j in jobs],
+                [j[3] for j in jobs],
+                [self.detection_settings] * len(jobs),
+            )
+        )
+
+    def _file_incidents(self, pending: List[PendingIncident]) -> List[str]:
+        if not self.incident_manager:
+            return []
+        incident_ids = []
+        for incident in pending:
+            record = self.incident_manager.create_incident(
+                camera_id=self.camera_id,
+                frame_id=incident.frame_id,
+                timestamp=incident.timestamp,
+                overlap_ratio=incident.overlap_ratio,
+                bbox=incident.bbox,
+                annotated_frame=incident.screenshot,
+                extra_metadata={"video_source": self.video_path, "time_base": "video"},
+            )
+            incident_ids.append(record.incident_id)
+            if self.vlm_worker and incident.crop is not None:
+                self.vlm_worker.submit(
+                    VLMTask(
+                        frame_id=incident.frame_id,
+                        timestamp=incident.timestamp,
+                        camera_id=self.camera_id,
+                        overlap_ratio=incident.overlap_ratio,
+                        bbox=incident.crop_bbox,
+                        image_crop=incident.crop,
+                        extra_metadata={"is_webcam": False, "warning_active": True},
+                        incident_id=record.incident_id,
+                    ),
+                    block=True,
+                )
+            else:
+                self.incident_manager.finalize_without_vlm(
+                    record.incident_id, "VLM 未启用，使用 YOLO 元数据发送告警。"
+                )
+        return incident_ids
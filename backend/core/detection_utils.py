@@ -1,6 +1,38 @@
 import cv2
 import numpy as np
 
+def draw_river_overlay(frame, polygons):
+    for seg in polygons:
+        alpha = 0.4
+        overlay = frame.copy()
+        cv2.fillPoly(overlay, [seg], (0, 0, 255))
+        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+        
+        cv2.polylines(frame, [seg], True, (255, 255, 255), 2)
+        
+        label = "River"
+        x, y, w, h = cv2.boundingRect(seg)
+        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
+        text_x = x
+        text_y = y + text_size[1] + 10
+        cv2.rectangle(frame, (text_x, text_y - text_size[1] - 10), (text_x + text_size[0], text_y), (255, 255, 255), -1)
+        cv2.putText(frame, label, (text_x, text_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+
+def draw_person_overlay(frame, bboxes, labels):
+    for b, label in zip(bboxes, labels):
+        cv2.rectangle(frame, (b[0], b[1]), (b[2], b[3]), (0, 255, 0), 2)
+        
+        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
+        cv2.rectangle(frame, (b[0], b[1] - text_size[1] - 10), (b[0] + text_size[0], b[1]), (0, 255, 0), -1)
+        cv2.putText(frame, label, (b[0], b[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+
+def render_analysis(frame, analysis):
+    """Draw the river and person overlays of a ``FrameAnalysis`` onto ``frame`` in place."""
+    draw_river_overlay(frame, analysis.river_polygons)
+    persons = analysis.person_indices
+    bboxes = [tuple(int(v) for v in b) for b in analysis.frame_boxes()[persons]]
+    draw_person_overlay(frame, bboxes, analysis.person_labels())
+
 def draw_river_mask(frame, masks):
     height, width = frame.shape[:2]
     river_mask = np.zeros((height, width), dtype=np.uint8)
@@ -8,61 +40,52 @@ def draw_river_mask(frame, masks):
     if masks is None:
         return river_mask
     
-    for mask in masks:
-        seg = mask.xy[0].astype(np.int32)
-        if len(seg) > 0:
-            cv2.fillPoly(river_mask, [seg], 255)
-            
-            alpha = 0.4
-            overlay = frame.copy()
-            cv2.fillPoly(overlay, [seg], (0, 0, 255))
-            cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-            
-            cv2.polylines(frame, [seg], True, (255, 255, 255), 2)
-            
-            label = "River"
-            x, y, w, h = cv2.boundingRect(seg)
-            text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
-            text_x = x
-            text_y = y + text_size[1] + 10
-            cv2.rectangle(frame, (text_x, text_y - text_size[1] - 10), (text_x + text_size[0], text_y), (255, 255, 255), -1)
-            cv2.putText(frame, label, (text_x, text_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+    polygons = [seg.astype(np.int32) for seg in masks.xy if len(seg) > 0]
+    for seg in polygons:
+        cv2.fillPoly(river_mask, [seg], 255)
+    draw_river_overlay(frame, polygons)
     
     return river_mask
 
 def draw_person_boxes(frame, boxes, river_mask):
+    """Draw person boxes; returns ``(person_detected, person_masks, person_bboxes)``.
+
+    Kept for existing callers that use the per-person masks; use
+    ``draw_person_boxes_with_overlap`` to get the overlap ratios instead.
+    """
     height, width = frame.shape[:2]
-    person_detected = False
+    person_detected, _, person_bboxes = draw_person_boxes_with_overlap(frame, boxes, river_mask)
     person_masks = []
+    for b in person_bboxes:
+        person_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.rectangle(person_mask, (b[0], b[1]), (b[2], b[3]), 255, -1)
+        person_masks.append(person_mask)
+    return person_detected, person_masks, person_bboxes
+
+def draw_person_boxes_with_overlap(frame, boxes, river_mask):
+    """Draw person boxes; returns ``(person_detected, overlap_ratios, person_bboxes)``."""
+    person_detected = False
+    overlap_ratios = np.zeros(0, dtype=np.float64)
     person_bboxes = []
     
     if boxes is None or river_mask is None:
-        return person_detected, person_masks, person_bboxes
+        return person_detected, overlap_ratios, person_bboxes
     
+    labels = []
     for box in boxes:
         if int(box.cls) == 0:  # 假设 0 是 'person'
             b = box.xyxy[0].cpu().numpy().astype(int)
             track_id = box.id.int().cpu().item() if box.id is not None else None
-            label = f"Person {track_id}" if track_id is not None else "Person"
-            
-            person_mask = np.zeros((height, width), dtype=np.uint8)
-            cv2.rectangle(person_mask, (b[0], b[1]), (b[2], b[3]), 255, -1)
-            person_masks.append(person_mask)
+            labels.append(f"Person {track_id}" if track_id is not None else "Person")
             person_bboxes.append((b[0], b[1], b[2], b[3]))
-            
-            overlap = cv2.bitwise_and(river_mask, person_mask)
-            overlap_ratio = np.sum(overlap) / np.sum(person_mask) if np.sum(person_mask) > 0 else 0
-
-            if overlap_ratio > 0.90:
-                person_detected = True
-            
-            cv2.rectangle(frame, (b[0], b[1]), (b[2], b[3]), (0, 255, 0), 2)
-            
-            text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
-            cv2.rectangle(frame, (b[0], b[1] - text_size[1] - 10), (b[0] + text_size[0], b[1]), (0, 255, 0), -1)
-            cv2.putText(frame, label, (b[0], b[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+
+    if person_bboxes:
+        overlap_ratios = RiverOverlapIndex(river_mask).overlap_ratios(person_bboxes)
+        person_detected = bool(np.any(overlap_ratios > 0.90))
+
+    draw_person_overlay(frame, person_bboxes, labels)
     
-    return person_detected, person_masks, person_bboxes
+    return person_detected, overlap_ratios, person_bboxes
 
 def draw_warning(frame):
     height, width = frame.shape[:2]
@@ -94,4 +117,42 @@ def draw_info(frame, info_message):
 def calculate_overlap_ratio(person_mask, river_mask):
     overlap = cv2.bitwise_and(river_mask, person_mask)
     overlap_ratio = np.sum(overlap) / np.sum(person_mask) if np.sum(person_mask) > 0 else 0
-    return overlap_ratio
\ No newline at end of file
+    return overlap_ratio
+
+
+class RiverOverlapIndex:
+    """Summed-area table over the river mask answering box/water overlap in O(1) per box.
+
+    Built once per frame; ``overlap_ratios`` gives the same values as running
+    ``calculate_overlap_ratio`` on a filled ``cv2.rectangle`` mask for each box.
+    """
+
+    def __init__(self, river_mask, scale=(1.0, 1.0)):
+        self.height, self.width = river_mask.shape[:2]
+        # mask pixels per box pixel (x, y) when the mask is coarser than the box coordinates
+        self.scale = tuple(scale)
+        # float64 keeps the sums exact (< 2**53) for any realistic frame size
+        self.integral = cv2.integral(river_mask, sdepth=cv2.CV_64F)
+
+    def overlap_ratios(self, bboxes) -> np.ndarray:
+        boxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        if boxes.shape[0] == 0:
+            return np.zeros(0, dtype=np.float64)
+        if self.scale != (1.0, 1.0):
+            sx, sy = self.scale
+            boxes = np.floor(boxes * np.array([sx, sy, sx, sy])).astype(np.int64)
+
+        # cv2.rectangle fills both corners inclusively and clips to the image
+        x1 = np.clip(np.minimum(boxes[:, 0], boxes[:, 2]), 0, self.width)
+        x2 = np.clip(np.maximum(boxes[:, 0], boxes[:, 2]) + 1, 0, self.width)
+        y1 = np.clip(np.minimum(boxes[:, 1], boxes[:, 3]), 0, self.height)
+        y2 = np.clip(np.maximum(boxes[:, 1], boxes[:, 3]) + 1, 0, self.height)
+
+        table = self.integral
+        water = table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+        area = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0) * 255.0
+
+        ratios = np.zeros(boxes.shape[0], dtype=np.float64)
+        np.divide(water, area, out=ratios, where=area > 0)
+        return ratios
+
@@ -0,0 +1,284 @@
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .detection_utils import RiverOverlapIndex
+
+PERSON_CLASS_ID = 0
+DROWNING_OVERLAP_THRESHOLD = 0.90
+
+
+@dataclass
+class FrameAnalysis:
+    """Inference output of one frame, reduced to plain arrays (no drawing, no torch tensors).
+
+    ``height``/``width`` and ``boxes`` are in analysis resolution, which may be
+    lower than the frame's; ``scale`` maps them to frame pixels. ``river_mask``
+    may be coarser still (``mask_scale``). ``river_polygons`` are already in
+    frame coordinates (they are only drawn).
+    """
+
+    height: int
+    width: int
+    river_mask: np.ndarray
+    river_polygons: List[np.ndarray] = field(default_factory=list)
+    boxes: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype=np.int64))
+    track_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    classes: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    overlap_ratios: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float64))
+    scale: float = 1.0
+    # river_mask pixels per analysis pixel (x, y); below 1 for native model-resolution masks
+    mask_scale: Tuple[float, float] = (1.0, 1.0)
+
+    def frame_boxes(self) -> np.ndarray:
+        """``boxes`` in frame coordinates (for drawing and cropping)."""
+        if self.scale == 1.0:
+            return self.boxes
+        return np.rint(self.boxes * self.scale).astype(np.int64)
+
+    @property
+    def person_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.classes == PERSON_CLASS_ID)
+
+    @property
+    def person_detected(self) -> bool:
+        return bool(np.any(self.overlap_ratios[self.person_indices] > DROWNING_OVERLAP_THRESHOLD))
+
+    def person_labels(self) -> List[str]:
+        return [
+            f"Person {self.track_ids[i]}" if self.track_ids[i] >= 0 else "Person"
+            for i in self.person_indices
+        ]
+
+    def max_overlap(self) -> Tuple[float, Optional[Tuple[int, int, int, int]]]:
+        """Highest overlap among persons and its box in frame coordinates.
+
+        ``(0, None)`` unless someone crosses the threshold.
+        """
+        if not self.person_detected:
+            return 0, None
+        persons = self.person_indices
+        best = persons[int(np.argmax(self.overlap_ratios[persons]))]
+        bbox = tuple(int(round(v * self.scale)) for v in self.boxes[best])
+        return float(self.overlap_ratios[best]), bbox
+
+
+def rasterize_river(height: int, width: int, polygons: List[np.ndarray]) -> np.ndarray:
+    river_mask = np.zeros((height, width), dtype=np.uint8)
+    for seg in polygons:
+        cv2.fillPoly(river_mask, [seg], 255)
+    return river_mask
+
+
+def extract_river_polygons(masks) -> List[np.ndarray]:
+    if masks is None:
+        return []
+    return [seg.astype(np.int32) for seg in masks.xy if len(seg) > 0]
+
+
+def extract_boxes(boxes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pull xyxy / track id / class out of ultralytics ``Boxes`` with one device transfer."""
+    if boxes is None or len(boxes) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros((0, 4), dtype=np.int64), empty, empty.copy()
+    # data columns: x1, y1, x2, y2, [track_id,] conf, cls
+    data = boxes.data.cpu().numpy()
+    xyxy = data[:, :4].astype(np.int64)
+    classes = data[:, -1].astype(np.int64)
+    if boxes.is_track:
+        track_ids = data[:, 4].astype(np.int64)
+    else:
+        track_ids = np.full(len(data), -1, dtype=np.int64)
+    return xyxy, track_ids, classes
+
+
+def water_roi(
+    river_mask: Optional[np.ndarray],
+    padding: int = 32,
+    max_fraction: float = 0.8,
+    align: int = 32,
+    mask_scale: Tuple[float, float] = (1.0, 1.0),
+) -> Optional[Tuple[int, int, int, int]]:
+    """Padded bounding box ``(x1, y1, x2, y2)`` of the water, or ``None`` to use the full frame.
+
+    Edges are aligned to ``align`` pixels so small mask changes keep the same
+    crop; ``None`` when there is no water or the crop would cover more than
+    ``max_fraction`` of the frame (no gain from cropping).
+    """
+    if river_mask is None:
+        return None
+    points = cv2.findNonZero(river_mask)
+    if points is None:
+        return None
+    sx, sy = mask_scale
+    height, width = round(river_mask.shape[0] / sy), round(river_mask.shape[1] / sx)
+    x, y, w, h = cv2.boundingRect(points)
+    # mask pixels -> analysis pixels, rounded outward so the crop never loses water
+    left, top = int(x / sx), int(y / sy)
+    right, bottom = math.ceil((x + w) / sx), math.ceil((y + h) / sy)
+    x1 = max(0, (left - padding) // align * align)
+    y1 = max(0, (top - padding) // align * align)
+    x2 = min(width, -(-(right + padding) // align) * align)
+    y2 = min(height, -(-(bottom + padding) // align) * align)
+    if (x2 - x1) * (y2 - y1) > max_fraction * width * height:
+        return None
+    return x1, y1, x2, y2
+
+
+class LazyRiverPolygons(Sequence):
+    """River outlines in frame coordinates, traced from a low-resolution mask on first use.
+
+    Analysis only needs the mask; the contours are extracted and scaled to the
+    frame the first time an overlay is drawn.
+    """
+
+    def __init__(self, river_mask: np.ndarray, scale_x: float, scale_y: float) -> None:
+        self._mask = river_mask
+        self._scale = np.array([scale_x, scale_y])
+        self._polygons: Optional[List[np.ndarray]] = None
+
+    def _load(self) -> List[np.ndarray]:
+        if self._polygons is None:
+            contours, _ = cv2.findContours(self._mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            self._polygons = [np.rint(c.reshape(-1, 2) * self._scale).astype(np.int32) for c in contours]
+        return self._polygons
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+def native_river_mask(river_result) -> Tuple[Optional[np.ndarray], Tuple[float, float]]:
+    """Union of ``masks.data`` at model resolution, letterbox padding removed.
+
+    Returns the uint8 mask and its scale (x, y) in mask pixels per pixel of the
+    image the model ran on, or ``(None, (1, 1))`` when nothing was segmented.
+    """
+    masks = river_result.masks if river_result is not None else None
+    if masks is None or len(masks) == 0:
+        return None, (1.0, 1.0)
+    mask = (masks.data.amax(dim=0) > 0.5).cpu().numpy().astype(np.uint8) * 255
+    im1_h, im1_w = mask.shape[:2]
+    im0_h, im0_w = river_result.orig_shape[:2]
+    # same content window as ultralytics.utils.ops.scale_masks
+    gain = min(im1_h / im0_h, im1_w / im0_w)
+    pad_w, pad_h = (im1_w - round(im0_w * gain)) / 2, (im1_h - round(im0_h * gain)) / 2
+    top, left = round(pad_h - 0.1), round(pad_w - 0.1)
+    bottom, right = top + round(im0_h * gain), left + round(im0_w * gain)
+    mask = np.ascontiguousarray(mask[top:bottom, left:right])
+    return mask, (mask.shape[1] / im0_w, mask.shape[0] / im0_h)
+
+
+def river_from_masks(frame_shape, river_result, scale: float = 1.0):
+    """Native-resolution river mask, its ``mask_scale`` and lazily traced frame-space polygons.
+
+    Skips the contour → polygon → ``fillPoly`` round trip of ``river_from_result``.
+    """
+    river_mask, mask_scale = native_river_mask(river_result)
+    if river_mask is None:
+        height, width = frame_shape[:2]
+        return [], np.zeros((height, width), dtype=np.uint8), (1.0, 1.0)
+    polygons = LazyRiverPolygons(river_mask, scale / mask_scale[0], scale / mask_scale[1])
+    return polygons, river_mask, mask_scale
+
+
+def river_from_result(frame_shape, river_result, scale: float = 1.0) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Polygons and rasterized mask of the river segmentation ``Results``.
+
+    ``frame_shape`` is the shape of the image the model ran on; the mask keeps
+    that resolution while the polygons are scaled by ``scale`` for drawing.
+    """
+    height, width = frame_shape[:2]
+    polygons = extract_river_polygons(river_result.masks if river_result is not None else None)
+    river_mask = rasterize_river(height, width, polygons)
+    if scale != 1.0:
+        polygons = [np.rint(seg * scale).astype(np.int32) for seg in polygons]
+    return polygons, river_mask
+
+
+def analyze_with_river(
+    river_polygons,
+    river_mask,
+    person_result,
+    overlap_index: Optional[RiverOverlapIndex] = None,
+    offset: Tuple[int, int] = (0, 0),
+    scale: float = 1.0,
+    mask_scale: Tuple[float, float] = (1.0, 1.0),
+) -> FrameAnalysis:
+    """Build a ``FrameAnalysis`` from an already rasterized river and the person ``Results``.
+
+    ``offset`` is the top-left corner of the crop the person model ran on; boxes
+    are shifted back into full-frame coordinates.
+    """
+    height = round(river_mask.shape[0] / mask_scale[1])
+    width = round(river_mask.shape[1] / mask_scale[0])
+    boxes, track_ids, classes = extract_boxes(person_result.boxes if person_result is not None else None)
+    if offset != (0, 0) and len(boxes):
+        boxes += np.array([offset[0], offset[1], offset[0], offset[1]], dtype=np.int64)
+    if overlap_index is None:
+        overlap_index = RiverOverlapIndex(river_mask, mask_scale)
+    overlap_ratios = overlap_index.overlap_ratios(boxes)
+    return FrameAnalysis(
+        height=height,
+        width=width,
+        river_mask=river_mask,
+        river_polygons=river_polygons,
+        boxes=boxes,
+        track_ids=track_ids,
+        classes=classes,
+        overlap_ratios=overlap_ratios,
+        scale=scale,
+        mask_scale=tuple(mask_scale),
+    )
+
+
+def analyze_results(frame_shape, river_result, person_result) -> FrameAnalysis:
+    """Convert the river/person ``Results`` of one frame into a ``FrameAnalysis``."""
+    polygons, river_mask = river_from_result(frame_shape, river_result)
+    return analyze_with_river(polygons, river_mask, person_result)
+
+
+def extrapolate_analysis(
+    previous: Optional[FrameAnalysis],
+    latest: FrameAnalysis,
+    gap: int,
+    steps: int,
+    overlap_index: Optional[RiverOverlapIndex] = None,
+) -> FrameAnalysis:
+    """Predict the analysis ``steps`` frames after ``latest`` without running the models.
+
+    Tracked boxes move with the per-frame velocity measured between ``previous``
+    and ``latest`` (``gap`` frames apart); untracked or new boxes stay where they
+    were. Overlap ratios are recomputed so warnings keep firing on skipped frames.
+    """
+    boxes = latest.boxes.astype(np.float64)
+    if previous is not None and gap > 0 and steps > 0 and len(boxes):
+        previous_boxes = {int(t): b for t, b in zip(previous.track_ids, previous.boxes) if t >= 0}
+        for i, track_id in enumerate(latest.track_ids):
+            before = previous_boxes.get(int(track_id))
+            if track_id >= 0 and before is not None:
+                boxes[i] += (latest.boxes[i] - before) / gap * steps
+    boxes = np.rint(boxes).astype(np.int64)
+    if len(boxes):
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, latest.width - 1)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, latest.height - 1)
+    if overlap_index is None:
+        overlap_index = RiverOverlapIndex(latest.river_mask, latest.mask_scale)
+    return FrameAnalysis(
+        height=latest.height,
+        width=latest.width,
+        river_mask=latest.river_mask,
+        river_polygons=latest.river_polygons,
+        boxes=boxes,
+        track_ids=latest.track_ids,
+        classes=latest.classes,
+        overlap_ratios=overlap_index.overlap_ratios(boxes),
+        scale=latest.scale,
+        mask_scale=latest.mask_scale,
+    )
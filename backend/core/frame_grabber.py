@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+class LatestFrameGrabber:
+    """Drains a live ``cv2.VideoCapture`` on its own thread and keeps only the newest frame.
+
+    ``read`` hands out the most recent frame not yet delivered, together with
+    its capture timestamp; frames overwritten before anyone read them count
+    as dropped. Driver-side buffering (``CAP_PROP_BUFFERSIZE`` is only a hint)
+    therefore never makes the detection loop analyze stale images.
+    ``on_frame(frame, timestamp)`` is called on the grabber thread for every frame.
+    The grabber ends on ``stop`` or when a read fails on a closed capture; once
+    the last frame has been handed out, ``read`` returns ``None`` immediately.
+    """
+
+    def __init__(
+        self,
+        cap,
+        name: str = "camera",
+        retry_interval: float = 0.01,
+        on_frame: Optional[Callable[[np.ndarray, float], None]] = None,
+    ) -> None:
+        self.cap = cap
+        self.name = name
+        self.retry_interval = retry_interval
+        self.on_frame = on_frame
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._delivered_seq = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.read_failures = 0
+
+    def start(self) -> "LatestFrameGrabber":
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while self._running:
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            if not ret:
+                self.read_failures += 1
+                if not self.cap.isOpened():
+                    logger.warning(f"Frame grabber '{self.name}': capture closed")
+                    break
+                time.sleep(self.retry_interval)
+                continue
+            with self._cond:
+                if self._seq > self._delivered_seq:
+                    self.dropped += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.grabbed += 1
+                self._cond.notify_all()
+            if self.on_frame is not None:
+                self.on_frame(frame, timestamp)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        logger.debug(f"Frame grabber '{self.name}' stopped")
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _can_return(self) -> bool:
+        return self._seq > self._delivered_seq or not self._running
+
+    def read(self, timeout: float = 0.5) -> Optional[Tuple[np.ndarray, float, int]]:
+        """Newest undelivered ``(frame, capture_timestamp, frame_number)``.
+
+        Returns ``None`` after ``timeout``, or at once when the grabber has ended.
+        ``frame_number`` counts every grabbed frame (from 0), dropped ones included.
+        """
+        with self._cond:
+            if not self._cond.wait_for(self._can_return, timeout):
+                return None
+            if self._seq == self._delivered_seq:
+                return None
+            self._delivered_seq = self._seq
+            self.delivered += 1
+            return self._frame, self._timestamp, self._seq - 1
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "grabbed": self.grabbed,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "read_failures": self.read_failures,
+        }
@@ -0,0 +1,72 @@
+import math
+import threading
+from typing import Any, Dict, Optional
+
+
+class AdaptiveStride:
+    """Picks how many source frames pass between two inferences.
+
+    The stride never drops below what the measured inference cost allows at the
+    source frame rate (``ceil(cost * fps)``); on top of that it grows by one
+    while the end-to-end lag exceeds ``target_latency`` and shrinks again once
+    the lag falls under half of it. Frames in between are not inferred.
+    """
+
+    def __init__(
+        self,
+        source_fps: float,
+        target_latency: float = 0.2,
+        max_stride: int = 6,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        self.target_latency = target_latency
+        self.max_stride = max(1, int(max_stride))
+        self.smoothing = smoothing
+        self.stride = 1
+        self.avg_cost: Optional[float] = None
+        self.lag = 0.0
+        self.inferred = 0
+        self.skipped = 0
+        self._last_index: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def should_infer(self, index: int) -> bool:
+        """Whether source frame ``index`` is due for inference; counts a skip otherwise."""
+        if self._last_index is None or index - self._last_index >= self.stride:
+            return True
+        self.skipped += 1
+        return False
+
+    def observe(self, index: int, cost: float, lag: float) -> None:
+        """Record an inferred frame: its inference ``cost`` and capture-to-result ``lag`` (seconds)."""
+        with self._lock:
+            self._last_index = index
+            self.inferred += 1
+            self.lag = lag
+            if self.avg_cost is None:
+                self.avg_cost = cost
+            else:
+                self.avg_cost += self.smoothing * (cost - self.avg_cost)
+
+            needed = max(1, math.ceil(self.avg_cost * self.source_fps))
+            if lag > self.target_latency:
+                proposal = self.stride + 1
+            elif lag < self.target_latency / 2:
+                proposal = self.stride - 1
+            else:
+                proposal = self.stride
+            self.stride = min(self.max_stride, max(needed, proposal, 1))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.inferred + self.skipped
+            return {
+                "stride": self.stride,
+                "lag_ms": self.lag * 1000,
+                "target_latency_ms": self.target_latency * 1000,
+                "avg_cost_ms": (self.avg_cost or 0.0) * 1000,
+                "inferred": self.inferred,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / total if total else 0.0,
+            }
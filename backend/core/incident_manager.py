@@ -63,6 +63,10 @@ class IncidentManager:
         log_incident_created(incident_id, screenshot_path)
         return record
 
+    def get_record(self, incident_id: str) -> Optional[IncidentRecord]:
+        with self._lock:
+            return self._records.get(incident_id)
+
     def handle_vlm_result(self, result: VLMTaskResult) -> None:
         incident_id = result.task.incident_id
         if not incident_id:
@@ -0,0 +1,283 @@
+import copy
+import threading
+import time
+from dataclasses import dataclass, field
+from queue import Empty, Queue
+from typing import Any, Dict, Hashable, List, Optional
+
+import torch
+from loguru import logger
+
+from .model_loader import InferenceStats, ModelLoader
+
+
+def _load_tracker_config(tracker: str):
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+
+    try:
+        from ultralytics.utils import YAML
+
+        data = YAML.load(check_yaml(tracker))
+    except ImportError:  # older ultralytics releases
+        from ultralytics.utils import yaml_load
+
+        data = yaml_load(check_yaml(tracker))
+    return IterableSimpleNamespace(**data)
+
+
+def _untracked_model(model):
+    """``model`` without the tracking state ``YOLO.track`` leaves on it.
+
+    ``track`` registers tracker callbacks on the model (and ReID hooks on its
+    predictor) which would otherwise run on every batched ``predict``. The copy
+    gets default callbacks and its own predictor but shares the weights.
+    """
+    from ultralytics.utils import callbacks
+
+    untracked = copy.copy(model)
+    untracked.callbacks = callbacks.get_default_callbacks()
+    untracked.predictor = None
+    return untracked
+
+
+@dataclass
+class _Request:
+    frame: Any
+    key: Hashable
+    imgsz: Optional[int] = None
+    submitted_at: float = field(default_factory=time.perf_counter)
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class _ModelBatcher:
+    """Collects frames for one model into batches; keeps one tracker per key.
+
+    A batch only waits for keys whose next frame is due before its deadline,
+    judged from each key's average submit interval on this model (river
+    frames arrive only on cache refreshes, person keys change with the ROI).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model,
+        tracker: str,
+        max_batch_size: int,
+        max_wait: float,
+        lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.name = name
+        self.model = model
+        # the registry's per-model lock: warm-up may still be running on this model
+        self.lock = lock or threading.Lock()
+        self.tracker_config = _load_tracker_config(tracker)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.stats = InferenceStats()
+        self._queue: "Queue[Optional[_Request]]" = Queue()
+        self._trackers: Dict[Hashable, Any] = {}
+        self._trackers_lock = threading.Lock()
+        # key -> [last submit time, average interval between submits or None]
+        self._arrivals: Dict[Hashable, List[Optional[float]]] = {}
+        self._arrivals_lock = threading.Lock()
+        # guards _stopped so no request is queued behind the stop sentinel
+        self._state_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=f"inference-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        request = _Request(frame=frame, key=key, imgsz=imgsz)
+        with self._state_lock:
+            if self._stopped:
+                raise RuntimeError(f"Inference batcher '{self.name}' stopped")
+            self._note_arrival(key, request.submitted_at)
+            self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def release(self, key: Hashable) -> None:
+        with self._trackers_lock:
+            self._trackers.pop(key, None)
+        with self._arrivals_lock:
+            self._arrivals.pop(key, None)
+
+    @property
+    def active_keys(self) -> List[Hashable]:
+        with self._arrivals_lock:
+            return list(self._arrivals)
+
+    def _note_arrival(self, key: Hashable, submitted_at: float) -> None:
+        with self._arrivals_lock:
+            arrival = self._arrivals.get(key)
+            if arrival is None:
+                self._arrivals[key] = [submitted_at, None]
+                return
+            last, interval = arrival
+            elapsed = submitted_at - last
+            arrival[0] = submitted_at
+            arrival[1] = elapsed if interval is None else 0.8 * interval + 0.2 * elapsed
+
+    def _due_keys(self, deadline: float) -> set:
+        """Keys expected to submit before ``deadline`` (not counting lapsed ones)."""
+        now = time.perf_counter()
+        with self._arrivals_lock:
+            return {
+                key
+                for key, (last, interval) in self._arrivals.items()
+                if interval is not None
+                and last + interval <= deadline
+                and now - last <= 2 * interval + self.max_wait
+            }
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._state_lock:
+            if not self._stopped:
+                self._stopped = True
+                self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = first.submitted_at + self.max_wait
+        waiting_for = self._due_keys(deadline) - {first.key}
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # frames already queued always join; wait only for keys still due
+                if remaining <= 0 or not waiting_for:
+                    request = self._queue.get_nowait()
+                else:
+                    request = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            waiting_for.discard(request.key)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+            started_at = time.perf_counter()
+            # sessions may ask for different input sizes: one predict call per size
+            groups: Dict[Optional[int], List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.imgsz, []).append(request)
+            for imgsz, group in groups.items():
+                self._predict(group, imgsz)
+            finished_at = time.perf_counter()
+            self.stats.record(
+                len(batch),
+                sum(started_at - r.submitted_at for r in batch),
+                finished_at - started_at,
+            )
+            for request in batch:
+                request.done.set()
+        # anything still queued would leave its submit() waiting forever
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                break
+            if request is not None:
+                request.error = RuntimeError(f"Inference batcher '{self.name}' stopped")
+                request.done.set()
+        logger.info(f"Inference batcher '{self.name}' stopped.")
+
+    def _predict(self, group: List[_Request], imgsz: Optional[int]) -> None:
+        options = {"imgsz": imgsz} if imgsz else {}
+        try:
+            # conf=0.1 matches YOLO.track: the tracker does its own thresholding
+            frames = [r.frame for r in group]
+            with self.lock:
+                results = self.model.predict(source=frames, conf=0.1, verbose=False, **options)
+            for request, result in zip(group, results):
+                request.result = [self._track(request.key, result)]
+        except Exception as e:
+            logger.error(f"Batched {self.name} inference failed: {e}")
+            for request in group:
+                request.error = e
+
+    def _track(self, key: Hashable, result):
+        """Same post-processing as ultralytics' tracking callback, with the tracker of ``key``."""
+        with self._trackers_lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                from ultralytics.trackers.track import TRACKER_MAP
+
+                tracker = TRACKER_MAP[self.tracker_config.tracker_type](args=self.tracker_config)
+                self._trackers[key] = tracker
+        det = result.boxes.cpu().numpy()
+        if len(det) == 0:
+            return result
+        tracks = tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return result
+
+
+class BatchInferenceScheduler:
+    """Batches the river/person inference of all sessions sharing a ``ModelLoader``.
+
+    Each call blocks until its frame has been processed as part of a batch. A
+    batch closes when no other camera is due to submit a frame for that model
+    within the wait, when it holds ``max_batch_size`` frames, or ``max_wait``
+    seconds after its first frame.
+    Exposes the same ``track_river``/``track_person``/``release_trackers``
+    interface as ``ModelLoader``.
+    """
+
+    def __init__(
+        self,
+        model_loader: ModelLoader,
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        tracker: str = "bytetrack.yaml",
+    ) -> None:
+        self.model_loader = model_loader
+        self._river = _ModelBatcher(
+            "river", _untracked_model(model_loader.get_river_model()), tracker,
+            max_batch_size, max_wait,
+            lock=model_loader.river_tracker.lock,
+        )
+        self._person = _ModelBatcher(
+            "person", _untracked_model(model_loader.get_person_model()), tracker,
+            max_batch_size, max_wait,
+            lock=model_loader.person_tracker.lock,
+        )
+
+    def track_river(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        return self._river.submit(frame, key, imgsz)
+
+    def track_person(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        return self._person.submit(frame, key, imgsz)
+
+    def release_trackers(self, key: Hashable) -> None:
+        self._river.release(key)
+        self._person.release(key)
+
+    def stop(self) -> None:
+        self._river.stop()
+        self._person.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "batched",
+            "active_cameras": len(self._river.active_keys),
+            "river": self._river.stats.snapshot(),
+            "person": self._person.stats.snapshot(),
+        }
@@ -0,0 +1,79 @@
+import hashlib
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict
+
+from loguru import logger
+
+from backend.core.settings import TORCHSCRIPT_IMGSZ
+
+# 推理后端 -> ultralytics 导出格式; pytorch 直接使用 .pt 权重
+BACKEND_FORMATS: Dict[str, str] = {
+    "pytorch": "",
+    "onnx": "onnx",
+    "openvino": "openvino",
+    "torchscript": "torchscript",
+}
+# 导出产物缓存在权重文件旁的该目录下, 按权重哈希区分
+EXPORT_DIR_NAME = "exports"
+# onnx/openvino 使用动态输入, 以支持跨摄像头合批和非正方形的 letterbox 输入
+DYNAMIC_FORMATS = ("onnx", "openvino")
+
+_export_lock = threading.Lock()
+
+
+def weight_hash(weights: Path, length: int = 12) -> str:
+    digest = hashlib.sha256()
+    with Path(weights).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def export_path(weights: Path, backend: str) -> Path:
+    """Cached artifact location, e.g. ``model/exports/best_seg-1a2b3c4d5e6f/best_seg.onnx``."""
+    weights = Path(weights)
+    cache_dir = weights.parent / EXPORT_DIR_NAME / f"{weights.stem}-{weight_hash(weights)}"
+    if backend == "openvino":
+        return cache_dir / f"{weights.stem}_openvino_model"
+    return cache_dir / f"{weights.stem}.{BACKEND_FORMATS[backend]}"
+
+
+def _export(weights: Path, backend: str, target: Path) -> None:
+    from ultralytics import YOLO
+
+    fmt = BACKEND_FORMATS[backend]
+    logger.info(f"导出 {weights} -> {fmt} (首次使用该后端, 之后复用缓存)")
+    # torchscript 为静态输入, 固定在配置校验允许的尺寸
+    options = {"imgsz": TORCHSCRIPT_IMGSZ} if fmt == "torchscript" else {}
+    exported = Path(
+        YOLO(str(weights)).export(format=fmt, dynamic=fmt in DYNAMIC_FORMATS, **options)
+    )
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        shutil.rmtree(target) if target.is_dir() else target.unlink()
+    shutil.move(str(exported), str(target))
+
+
+def resolve_model_path(weights: Path, backend: str = "pytorch") -> Path:
+    """Path to load for ``weights`` on ``backend``, exporting it on first use.
+
+    Falls back to the PyTorch weights (with a warning) when the export fails,
+    e.g. because the backend's runtime package is not installed.
+    """
+    weights = Path(weights)
+    if backend not in BACKEND_FORMATS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if backend == "pytorch":
+        return weights
+
+    with _export_lock:
+        try:
+            target = export_path(weights, backend)
+            if not target.exists():
+                _export(weights, backend, target)
+            return target
+        except Exception as e:
+            logger.warning(f"{backend} 后端不可用 ({weights}): {e}; 回退到 PyTorch")
+            return weights
@@ -1,32 +1,247 @@
+import threading
+import time
 from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
 
 from loguru import logger
 from ultralytics import YOLO
 
+from .model_backends import resolve_model_path
+from .model_registry import ModelRegistry, model_registry
+
+
+class InferenceStats:
+    """Thread-safe counters for batch size, queue wait and per-batch latency."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.total_queue_wait = 0.0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+
+    def record(self, batch_size: int, queue_wait: float, latency: float) -> None:
+        """``queue_wait`` is the summed wait of all frames in the batch (seconds)."""
+        with self._lock:
+            self.batches += 1
+            self.frames += batch_size
+            self.last_batch_size = batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.total_queue_wait += queue_wait
+            self.total_latency += latency
+            self.last_latency = latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            batches = self.batches or 1
+            frames = self.frames or 1
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "avg_batch_size": self.frames / batches,
+                "last_batch_size": self.last_batch_size,
+                "max_batch_size": self.max_batch_size,
+                "avg_queue_wait_ms": self.total_queue_wait / frames * 1000,
+                "avg_batch_latency_ms": self.total_latency / batches * 1000,
+                "last_batch_latency_ms": self.last_latency * 1000,
+            }
+
+
+class LatencyStats:
+    """Thread-safe count / average / last latency per named step."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._steps: Dict[str, list] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            step = self._steps.setdefault(name, [0, 0.0, 0.0])
+            step[0] += 1
+            step[1] += seconds
+            step[2] = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {"count": count, "avg_ms": total / count * 1000, "last_ms": last * 1000}
+                for name, (count, total, last) in self._steps.items()
+            }
+
+
+class SharedTracker:
+    """Runs ``YOLO.track`` on one model for several cameras.
+
+    Ultralytics keeps tracker state on ``model.predictor.trackers``; the state of
+    each key (camera) is swapped in before and saved after every call, so cameras
+    sharing the model never mix track ids. Calls on the same model are serialized
+    by ``lock`` (the registry's per-model lock, shared with warm-up and batching).
+    """
+
+    def __init__(
+        self, model: YOLO, tracker: str = "bytetrack.yaml", lock: Optional[threading.Lock] = None
+    ) -> None:
+        self.model = model
+        self.tracker = tracker
+        self.lock = lock or threading.Lock()
+        self._states: Dict[Hashable, Any] = {}
+        self.stats = InferenceStats()
+
+    def track(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        requested_at = time.perf_counter()
+        options = {"imgsz": imgsz} if imgsz else {}
+        with self.lock:
+            started_at = time.perf_counter()
+            predictor = self.model.predictor
+            if predictor is not None and getattr(predictor, "trackers", None) is not None:
+                state = self._states.get(key)
+                if state is not None:
+                    predictor.trackers = state
+                else:
+                    from ultralytics.trackers.track import on_predict_start
+
+                    on_predict_start(predictor, persist=False)
+            results = self.model.track(
+                source=frame, show=False, tracker=self.tracker, persist=True, verbose=False, **options
+            )
+            self._states[key] = self.model.predictor.trackers
+            self.stats.record(1, started_at - requested_at, time.perf_counter() - started_at)
+            return results
+
+    def release(self, key: Hashable) -> None:
+        with self.lock:
+            self._states.pop(key, None)
+
+
+RIVER_MODEL_PATH = Path("model/best_seg.pt")
+PERSON_MODEL_PATH = Path("model/best_detect.pt")
+
 
 class ModelLoader:
-    def __init__(self):
-        river_model_path = Path("model/best_seg.pt")
-        person_model_path = Path("model/best_detect.pt")
-        
+    """River/person models taken from the process-wide ``ModelRegistry``.
+
+    Each model runs on its own backend (``pytorch``, ``onnx``, ``openvino`` or
+    ``torchscript``); exported backends go through ultralytics' ``AutoBackend``,
+    so NMS and mask decoding yield the same ``Results`` as the ``.pt`` weights.
+    Constructing a loader is cheap once the registry holds the weights; call
+    ``close`` to release the references when the loader is no longer used.
+    Users sharing one loader (detection sessions) each ``retain`` it and
+    ``release`` it when done, so the registry refcounts count them.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[ModelRegistry] = None,
+        river_backend: str = "pytorch",
+        person_backend: str = "pytorch",
+    ):
+        self.registry = registry or model_registry
+        self._acquired = []
+        self.river_model_path = resolve_model_path(RIVER_MODEL_PATH, river_backend)
+        self.person_model_path = resolve_model_path(PERSON_MODEL_PATH, person_backend)
+
         try:
-            logger.info(f"加载河流分割模型: {river_model_path}")
-            self.model_river = YOLO(str(river_model_path))
-            logger.info("河流分割模型加载成功")
+            self.model_river = self._acquire(self.river_model_path)
         except Exception as e:
             logger.error(f"加载河流分割模型失败: {e}")
             raise
-        
+
         try:
-            logger.info(f"加载人员检测模型: {person_model_path}")
-            self.model_person = YOLO(str(person_model_path))
-            logger.info("人员检测模型加载成功")
+            self.model_person = self._acquire(self.person_model_path)
         except Exception as e:
             logger.error(f"加载人员检测模型失败: {e}")
+            self.close()
             raise
 
+        self.river_tracker = SharedTracker(
+            self.model_river, lock=self.registry.inference_lock(self.river_model_path)
+        )
+        self.person_tracker = SharedTracker(
+            self.model_person, lock=self.registry.inference_lock(self.person_model_path)
+        )
+
+    def _acquire(self, path: Path):
+        model = self.registry.acquire(path)
+        self._acquired.append(path)
+        return model
+
+    def retain(self) -> None:
+        """Count one more user of this loader's models in the registry."""
+        for path in (self.river_model_path, self.person_model_path):
+            self.registry.acquire(path)
+
+    def release(self) -> None:
+        """Undo one ``retain``."""
+        for path in (self.river_model_path, self.person_model_path):
+            self.registry.release(path)
+
+    def close(self) -> None:
+        """Release the registry references held by this loader."""
+        while self._acquired:
+            self.registry.release(self._acquired.pop())
+
     def get_river_model(self):
         return self.model_river
 
     def get_person_model(self):
-        return self.model_person
\ No newline at end of file
+        return self.model_person
+
+    def track_river(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        return self.river_tracker.track(frame, key, imgsz)
+
+    def track_person(self, frame, key: Hashable, imgsz: Optional[int] = None):
+        return self.person_tracker.track(frame, key, imgsz)
+
+    def release_trackers(self, key: Hashable) -> None:
+        """Drop the tracker state of ``key`` (call when its session ends)."""
+        self.river_tracker.release(key)
+        self.person_tracker.release(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model inference counters; each call is a batch of one, lock wait counts as queue wait."""
+        return {
+            "mode": "per_thread",
+            "river_model": str(self.river_model_path),
+            "person_model": str(self.person_model_path),
+            "river": self.river_tracker.stats.snapshot(),
+            "person": self.person_tracker.stats.snapshot(),
+        }
+
+
+# 进程池工作进程的模型 (进程初始化时加载一次, 该进程内的所有任务共用)
+_process_loader: Optional[ModelLoader] = None
+_process_loader_error: Optional[str] = None
+
+
+def init_process_loader(
+    river_backend: str = "pytorch", person_backend: str = "pytorch", threads: int = 0
+) -> None:
+    """Process-pool initializer: limit intra-op threads and load the models once per worker.
+
+    A failure is recorded instead of raised: an initializer exception only
+    surfaces as ``BrokenProcessPool``, while ``process_loader`` reports the cause
+    to each task.
+    """
+    global _process_loader, _process_loader_error
+    if threads > 0:
+        import cv2
+        import torch
+
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+    try:
+        _process_loader = ModelLoader(river_backend=river_backend, person_backend=person_backend)
+    except Exception as e:
+        _process_loader_error = f"{type(e).__name__}: {e}"
+
+
+def process_loader() -> ModelLoader:
+    """The loader created by ``init_process_loader`` in this worker process."""
+    if _process_loader is None:
+        if _process_loader_error is not None:
+            raise RuntimeError(f"模型加载失败: {_process_loader_error}")
+        raise RuntimeError("init_process_loader() has not run in this process")
+    return _process_loader
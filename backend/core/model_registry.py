@@ -0,0 +1,174 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+from loguru import logger
+
+# 预热使用的空白帧尺寸 (高, 宽), 与常见摄像头分辨率一致
+WARMUP_FRAME_SHAPE = (480, 640, 3)
+
+
+def _load_yolo(path: str):
+    from ultralytics import YOLO
+
+    return YOLO(path)
+
+
+@dataclass
+class _Entry:
+    model: Any
+    load_time: float
+    refcount: int = 0
+    warmed_up: bool = False
+    warmup_time: float = 0.0
+    # 同一模型实例上的推理 (track/predict/预热) 互斥: predictor 与 trackers 挂在模型上
+    inference_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, keyed by resolved weight path.
+
+    Each weight file is loaded once; ``acquire``/``release`` count the users of a
+    model so ``status`` can show what is in use. Models stay loaded after their
+    last release (they are shared across sessions); ``unload_unused`` drops them
+    explicitly. ``expect`` declares the models the server needs: ``ready`` is true
+    once each of them is loaded (and warmed up, if requested), and right away
+    when the list is empty (no preloading). ``preload`` declares, loads and warms
+    the models at server startup. Every call into a model goes through its
+    ``inference_lock``, warm-up included.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = _load_yolo) -> None:
+        self._loader = loader
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # key -> warm-up required; None until expect() declares the server's models
+        self._expected: Optional[Dict[str, bool]] = None
+        self.preload_error: Optional[str] = None
+
+    @staticmethod
+    def _key(path) -> str:
+        return str(Path(path).resolve())
+
+    def expect(self, paths: Iterable, warmup: bool = True) -> None:
+        """Declare the models ``ready`` waits for (an empty list: ready at once)."""
+        with self._lock:
+            self._expected = {self._key(path): warmup for path in paths}
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._is_ready()
+
+    def _is_ready(self) -> bool:
+        if self._expected is None:
+            return False
+        for key, warmup in self._expected.items():
+            entry = self._entries.get(key)
+            if entry is None or (warmup and not entry.warmed_up):
+                return False
+        return True
+
+    def _get_or_load(self, path) -> _Entry:
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # Per-file lock: concurrent first users wait for one load instead of loading twice
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            logger.info(f"加载模型: {path}")
+            started_at = time.perf_counter()
+            model = self._loader(str(path))
+            entry = _Entry(model=model, load_time=time.perf_counter() - started_at)
+            logger.info(f"模型加载成功: {path} ({entry.load_time:.2f}s)")
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def acquire(self, path):
+        """Return the shared model for ``path``, loading it on first use."""
+        entry = self._get_or_load(path)
+        with self._lock:
+            entry.refcount += 1
+        return entry.model
+
+    def inference_lock(self, path) -> threading.Lock:
+        """Lock serializing inference on the shared model for ``path``."""
+        return self._get_or_load(path).inference_lock
+
+    def release(self, path) -> None:
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+
+    def warmup(self, path, frame_shape=WARMUP_FRAME_SHAPE) -> None:
+        """Run one dummy inference so the first real frame skips predictor setup."""
+        entry = self._get_or_load(path)
+        # a session may already be tracking on this model: never predict concurrently
+        with entry.inference_lock:
+            if entry.warmed_up:
+                return
+            started_at = time.perf_counter()
+            # predict (not track) so no tracker callbacks are registered on the model
+            entry.model.predict(source=np.zeros(frame_shape, dtype=np.uint8), verbose=False)
+            entry.warmup_time = time.perf_counter() - started_at
+            entry.warmed_up = True
+        logger.info(f"模型预热完成: {path} ({entry.warmup_time:.2f}s)")
+
+    def preload(self, paths: Iterable, warmup: bool = True) -> bool:
+        """Load (and warm up) ``paths``; the registry is ready once they are."""
+        paths = list(paths)
+        self.expect(paths, warmup)
+        try:
+            for path in paths:
+                self._get_or_load(path)
+                if warmup:
+                    self.warmup(path)
+        except Exception as e:
+            self.preload_error = str(e)
+            logger.error(f"模型预加载失败: {e}")
+            return False
+        self.preload_error = None
+        return True
+
+    def unload_unused(self) -> int:
+        """Drop models nobody holds, except the expected ones; returns how many were unloaded."""
+        with self._lock:
+            expected = self._expected or {}
+            unused = [
+                key
+                for key, entry in self._entries.items()
+                if entry.refcount == 0 and key not in expected
+            ]
+            for key in unused:
+                del self._entries[key]
+        return len(unused)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            ready = self._is_ready()
+            models = {
+                key: {
+                    "refcount": entry.refcount,
+                    "warmed_up": entry.warmed_up,
+                    "load_time_ms": entry.load_time * 1000,
+                    "warmup_time_ms": entry.warmup_time * 1000,
+                }
+                for key, entry in self._entries.items()
+            }
+        return {"ready": ready, "error": self.preload_error, "models": models}
+
+
+# Global registry instance
+model_registry = ModelRegistry()
@@ -0,0 +1,93 @@
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides whether person detection must run, from motion inside the water region.
+
+    Frames are downscaled to ``width`` pixels wide, converted to gray and blurred,
+    then compared against the thumbnail taken at the last person inference, so
+    slow drift accumulates instead of hiding between consecutive frames. Pixels
+    differing by more than ``pixel_threshold`` inside the (downscaled) water mask
+    count as motion; inference runs when they exceed ``min_motion_ratio`` of the
+    region, when the last inference is ``max_staleness`` frames old, or when
+    there is no water region to restrict to.
+    """
+
+    def __init__(
+        self,
+        width: int = 160,
+        pixel_threshold: int = 25,
+        min_motion_ratio: float = 0.002,
+        max_staleness: int = 15,
+    ) -> None:
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_motion_ratio = min_motion_ratio
+        self.max_staleness = max(1, int(max_staleness))
+        self._reference: Optional[np.ndarray] = None
+        self._pending: Optional[np.ndarray] = None
+        self._mask_source: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._mask_area = 0
+        self._frames_since_inference = 0
+        self.checked = 0
+        self.skipped = 0
+        self.last_motion_ratio = 0.0
+
+    def _thumbnail(self, frame) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _water_mask(self, river_mask: np.ndarray, size) -> np.ndarray:
+        # the river mask only changes on re-segmentation; rescale it once per mask
+        if river_mask is not self._mask_source or self._mask.shape[::-1] != size:
+            self._mask_source = river_mask
+            self._mask = cv2.resize(river_mask, size, interpolation=cv2.INTER_NEAREST)
+            self._mask_area = int(cv2.countNonZero(self._mask))
+        return self._mask
+
+    def should_infer(self, frame, river_mask: Optional[np.ndarray], force: bool = False) -> bool:
+        """Whether to run person detection on ``frame``; call ``mark_inferred`` after running it."""
+        self.checked += 1
+        thumbnail = self._thumbnail(frame)
+        self._pending = thumbnail
+        if (
+            force
+            or self._reference is None
+            or self._reference.shape != thumbnail.shape
+            or river_mask is None
+            or self._frames_since_inference + 1 >= self.max_staleness
+        ):
+            return True
+
+        mask = self._water_mask(river_mask, thumbnail.shape[::-1])
+        if self._mask_area == 0:
+            return True
+        moving = cv2.threshold(cv2.absdiff(thumbnail, self._reference), self.pixel_threshold, 255, cv2.THRESH_BINARY)[1]
+        self.last_motion_ratio = cv2.countNonZero(cv2.bitwise_and(moving, mask)) / self._mask_area
+        if self.last_motion_ratio > self.min_motion_ratio:
+            return True
+
+        self._frames_since_inference += 1
+        self.skipped += 1
+        return False
+
+    def mark_inferred(self) -> None:
+        """The frame last passed to ``should_infer`` was inferred; it becomes the new reference."""
+        self._reference = self._pending
+        self._frames_since_inference = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+            "last_motion_ratio": self.last_motion_ratio,
+        }
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+TINT_COLOR = (0, 0, 255)
+RIVER_ALPHA = 0.4
+WARNING_ALPHA = 0.4
+WARNING_TEXT = "Warning: Drowning danger detected!"
+
+
+@dataclass
+class _Layer:
+    """A cropped BGR bitmap plus the uint8 mask of the pixels it covers."""
+
+    x: int
+    y: int
+    image: Optional[np.ndarray]
+    mask: np.ndarray
+
+    def paste(self, out: np.ndarray) -> None:
+        h, w = self.mask.shape[:2]
+        # cv2.copyTo writes into the ROI view in place
+        cv2.copyTo(self.image, self.mask, out[self.y:self.y + h, self.x:self.x + w])
+
+
+def _crop_layer(image: Optional[np.ndarray], mask: np.ndarray) -> Optional[_Layer]:
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    cropped = image[y:y + h, x:x + w].copy() if image is not None else None
+    return _Layer(x, y, cropped, mask[y:y + h, x:x + w].copy())
+
+
+class OverlayCompositor:
+    """Renders annotated frames with cached static layers.
+
+    The river tint region and its outline/label layer are rebuilt only when the
+    river polygons change; the river pixels are blended once, straight from the
+    source frame into a reusable output buffer, and the warning tint is applied
+    on top of the finished overlay (so it dims the boxes, as ``draw_warning``
+    does). Overlapping river polygons are tinted once rather than once per
+    polygon. Text extents are cached. The buffer
+    returned by ``compose`` is overwritten by the next call.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: Optional[np.ndarray] = None
+        self._tint: Optional[np.ndarray] = None
+        self._river_key: Optional[List[np.ndarray]] = None
+        self._river_shape: Optional[Tuple[int, int]] = None
+        self._river_region: Optional[_Layer] = None
+        self._river_static: Optional[_Layer] = None
+        self._text_sizes: Dict[Tuple[str, float, int], Tuple[int, int]] = {}
+
+    def text_size(self, text: str, scale: float, thickness: int) -> Tuple[int, int]:
+        key = (text, scale, thickness)
+        size = self._text_sizes.get(key)
+        if size is None:
+            if len(self._text_sizes) > 1024:
+                self._text_sizes.clear()
+            size = cv2.getTextSize(text, FONT, scale, thickness)[0]
+            self._text_sizes[key] = size
+        return size
+
+    def _tint_layer(self, shape) -> np.ndarray:
+        if self._tint is None or self._tint.shape != shape:
+            self._tint = np.empty(shape, dtype=np.uint8)
+            self._tint[:] = TINT_COLOR
+        return self._tint
+
+    def _update_river(self, polygons: List[np.ndarray], shape) -> None:
+        if polygons is self._river_key and self._river_shape == shape[:2]:
+            return
+        self._river_key = polygons
+        self._river_shape = shape[:2]
+        region_mask = np.zeros(shape[:2], dtype=np.uint8)
+        static_image = np.zeros(shape, dtype=np.uint8)
+        static_mask = np.zeros(shape[:2], dtype=np.uint8)
+        for seg in polygons:
+            cv2.fillPoly(region_mask, [seg], 255)
+        for seg in polygons:
+            cv2.polylines(static_image, [seg], True, (255, 255, 255), 2)
+            cv2.polylines(static_mask, [seg], True, 255, 2)
+            x, y, _, _ = cv2.boundingRect(seg)
+            label = "River"
+            text_size = self.text_size(label, 0.9, 2)
+            text_y = y + text_size[1] + 10
+            top_left = (x, text_y - text_size[1] - 10)
+            bottom_right = (x + text_size[0], text_y)
+            cv2.rectangle(static_image, top_left, bottom_right, (255, 255, 255), -1)
+            cv2.rectangle(static_mask, top_left, bottom_right, 255, -1)
+            cv2.putText(static_image, label, (x, text_y - 5), FONT, 0.9, (0, 0, 255), 2)
+        self._river_region = _crop_layer(None, region_mask)
+        self._river_static = _crop_layer(static_image, static_mask)
+
+    def _draw_banner(self, out: np.ndarray) -> None:
+        # drawn in place each time: putText may anti-alias against the pixels underneath
+        height, width = out.shape[:2]
+        font_scale = 2.0
+        thickness = 4
+        text_size = self.text_size(WARNING_TEXT, font_scale, thickness)
+        text_x = (width - text_size[0]) // 2
+        text_y = (height + text_size[1]) // 2
+        shadow_org = (text_x + 2, text_y + 2)
+        cv2.putText(out, WARNING_TEXT, shadow_org, FONT, font_scale, (0, 0, 0), thickness * 2)
+        white = (255, 255, 255)
+        cv2.putText(out, WARNING_TEXT, (text_x, text_y), FONT, font_scale, white, thickness)
+
+    def _blend_river(self, frame: np.ndarray, out: np.ndarray) -> None:
+        region = self._river_region
+        if region is None:
+            return
+        h, w = region.mask.shape[:2]
+        ys, xs = slice(region.y, region.y + h), slice(region.x, region.x + w)
+        tint = self._tint_layer(frame.shape)[ys, xs]
+        blended = cv2.addWeighted(tint, RIVER_ALPHA, frame[ys, xs], 1 - RIVER_ALPHA, 0)
+        cv2.copyTo(blended, region.mask, out[ys, xs])
+
+    def _draw_persons(self, out: np.ndarray, bboxes, labels) -> None:
+        for b, label in zip(bboxes, labels):
+            cv2.rectangle(out, (b[0], b[1]), (b[2], b[3]), (0, 255, 0), 2)
+            text_size = self.text_size(label, 0.9, 2)
+            label_top_left = (b[0], b[1] - text_size[1] - 10)
+            cv2.rectangle(out, label_top_left, (b[0] + text_size[0], b[1]), (0, 255, 0), -1)
+            cv2.putText(out, label, (b[0], b[1] - 10), FONT, 0.9, (255, 255, 255), 2)
+
+    def _draw_info(self, out: np.ndarray, info_message: str) -> None:
+        height = out.shape[0]
+        text_size = self.text_size(info_message, 1.0, 2)
+        text_x = 10
+        text_y = height - 20
+        top_left = (text_x, text_y - text_size[1] - 10)
+        cv2.rectangle(out, top_left, (text_x + text_size[0], text_y + 10), (0, 0, 0), -1)
+        cv2.putText(out, info_message, (text_x, text_y), FONT, 1.0, (255, 255, 255), 2)
+
+    def compose(
+        self,
+        frame: np.ndarray,
+        analysis,
+        show_warning: bool = False,
+        info_message: Optional[str] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Render ``analysis`` over ``frame`` into ``out`` (the shared buffer by default)."""
+        if out is None:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty_like(frame)
+            out = self._buffer
+
+        np.copyto(out, frame)
+        self._update_river(analysis.river_polygons, frame.shape)
+        self._blend_river(frame, out)
+        if self._river_static is not None:
+            self._river_static.paste(out)
+
+        persons = analysis.person_indices
+        bboxes = [tuple(int(v) for v in b) for b in analysis.frame_boxes()[persons]]
+        self._draw_persons(out, bboxes, analysis.person_labels())
+
+        if show_warning:
+            # 与 draw_warning 一致: 整帧红色叠加在框和标签之上
+            tint = self._tint_layer(frame.shape)
+            cv2.addWeighted(tint, WARNING_ALPHA, out, 1 - WARNING_ALPHA, 0, dst=out)
+            self._draw_banner(out)
+
+        if info_message is not None:
+            self._draw_info(out, info_message)
+        return out
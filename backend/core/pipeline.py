@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+QUEUE_POLICIES = ("block", "drop_oldest")
+
+# 队列结束标记: 上游结束后, 下游取完剩余元素会收到它
+END = object()
+
+
+class BoundedQueue:
+    """FIFO linking two pipeline stages.
+
+    ``block`` makes the producer wait while the queue is full; ``drop_oldest``
+    discards the oldest queued item instead (for live sources, where only the
+    newest frames matter). Either way the surviving items keep their order.
+    """
+
+    def __init__(self, maxsize: int, policy: str = "block") -> None:
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._aborted = False
+        self.dropped = 0
+        self.peak_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item) -> bool:
+        """Queue ``item``; returns False when the pipeline was aborted."""
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._aborted:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait()
+            if self._aborted:
+                return False
+            self._items.append(item)
+            self.peak_depth = max(self.peak_depth, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self):
+        """Next item, or ``END`` once the queue is closed and drained (or aborted)."""
+        with self._cond:
+            while not self._items and not self._closed and not self._aborted:
+                self._cond.wait()
+            if self._aborted or not self._items:
+                return END
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        """End of stream: the consumer gets ``END`` after the remaining items."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        """Drop everything and release blocked producers and consumers."""
+        with self._cond:
+            self._aborted = True
+            self._items.clear()
+            self._cond.notify_all()
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable[[Any], Any], inbox: BoundedQueue) -> None:
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox: Optional[BoundedQueue] = None
+        self.processed = 0
+        self.busy_time = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self.inbox),
+            "queue_size": self.inbox.maxsize,
+            "queue_policy": self.inbox.policy,
+            "queue_peak": self.inbox.peak_depth,
+            "dropped": self.inbox.dropped,
+            "processed": self.processed,
+            "avg_busy_ms": self.busy_time / self.processed * 1000 if self.processed else 0.0,
+        }
+
+
+class FramePipeline:
+    """Runs a source and a chain of stages, each on its own thread.
+
+    Stage ``i`` takes items from its input queue, and whatever its function
+    returns (unless ``None``) goes to stage ``i + 1``. Every stage is a single
+    thread reading a FIFO, so items reach the last stage in source order. If a
+    stage raises, the whole pipeline is aborted and ``run`` re-raises the error.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.stages: List[_Stage] = []
+        self.source_reads = 0
+        self._error: Optional[BaseException] = None
+
+    def add_stage(self, name: str, fn: Callable[[Any], Any], queue_size: int = 4, policy: str = "block") -> None:
+        stage = _Stage(name, fn, BoundedQueue(queue_size, policy))
+        if self.stages:
+            self.stages[-1].outbox = stage.inbox
+        self.stages.append(stage)
+
+    def _abort(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self.cancel()
+
+    def cancel(self) -> None:
+        """Stop now, discarding queued items (``run`` returns without error)."""
+        for stage in self.stages:
+            stage.inbox.abort()
+
+    def _run_source(self, source: Callable[[], Any]) -> None:
+        inbox = self.stages[0].inbox
+        try:
+            while True:
+                item = source()
+                if item is None:
+                    break
+                self.source_reads += 1
+                if not inbox.put(item):
+                    break
+        except Exception as e:
+            logger.exception(f"Pipeline '{self.name}' source failed: {e}")
+            self._abort(e)
+        finally:
+            inbox.close()
+
+    def _run_stage(self, stage: _Stage) -> None:
+        try:
+            while True:
+                item = stage.inbox.get()
+                if item is END:
+                    break
+                started_at = time.perf_counter()
+                result = stage.fn(item)
+                stage.busy_time += time.perf_counter() - started_at
+                stage.processed += 1
+                if stage.outbox is not None and result is not None:
+                    if not stage.outbox.put(result):
+                        break
+        except Exception as e:
+            logger.exception(f"Pipeline '{self.name}' stage '{stage.name}' failed: {e}")
+            self._abort(e)
+        finally:
+            if stage.outbox is not None:
+                stage.outbox.close()
+
+    def run(self, source: Callable[[], Any]) -> None:
+        """Feed ``source()`` results (``None`` ends the stream) through the stages; blocks until done."""
+        threads = [threading.Thread(target=self._run_source, args=(source,), name=f"{self.name}-source", daemon=True)]
+        threads += [
+            threading.Thread(target=self._run_stage, args=(stage,), name=f"{self.name}-{stage.name}", daemon=True)
+            for stage in self.stages
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source_reads": self.source_reads, "stages": {stage.name: stage.stats() for stage in self.stages}}
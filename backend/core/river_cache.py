@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .detection_utils import RiverOverlapIndex
+
+
+class RiverMaskCache:
+    """Reuses the last river segmentation for fixed cameras.
+
+    Segmentation is re-run every ``refresh_interval`` frames, or earlier when a
+    downscaled grayscale thumbnail drifts from the one taken at the last
+    segmentation by more than ``scene_change_threshold`` (mean absolute
+    difference, 0-255).
+    """
+
+    def __init__(
+        self,
+        refresh_interval: int = 15,
+        scene_change_threshold: float = 12.0,
+        thumbnail_size=(64, 36),
+    ) -> None:
+        self.refresh_interval = max(1, int(refresh_interval))
+        self.scene_change_threshold = scene_change_threshold
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.polygons: List[np.ndarray] = []
+        self.river_mask: Optional[np.ndarray] = None
+        self.overlap_index: Optional[RiverOverlapIndex] = None
+        self.mask_scale = (1.0, 1.0)
+        self.frame_shape = None
+        self._pending_shape = None
+        self._reference: Optional[np.ndarray] = None
+        self._thumbnail: Optional[np.ndarray] = None
+        self._frames_since_refresh = 0
+        self.hits = 0
+        self.resegmentations = 0
+        self.scene_changes = 0
+
+    def _make_thumbnail(self, frame) -> np.ndarray:
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def needs_refresh(self, frame) -> bool:
+        """Decide whether ``frame`` must be segmented again; counts a hit otherwise."""
+        self._thumbnail = self._make_thumbnail(frame)
+        self._pending_shape = frame.shape[:2]
+        if (
+            self.river_mask is None
+            or self.frame_shape != frame.shape[:2]
+            or self._frames_since_refresh + 1 >= self.refresh_interval
+        ):
+            return True
+        difference = float(cv2.absdiff(self._thumbnail, self._reference).mean())
+        if difference > self.scene_change_threshold:
+            self.scene_changes += 1
+            return True
+        self._frames_since_refresh += 1
+        self.hits += 1
+        return False
+
+    def store(self, polygons: List[np.ndarray], river_mask: np.ndarray, mask_scale=(1.0, 1.0)) -> None:
+        """Record a fresh segmentation for the frame last passed to ``needs_refresh``.
+
+        ``mask_scale`` is mask pixels per frame pixel (x, y) for masks kept at model resolution.
+        """
+        self.polygons = polygons
+        self.river_mask = river_mask
+        self.mask_scale = tuple(mask_scale)
+        self.frame_shape = self._pending_shape
+        self.overlap_index = RiverOverlapIndex(river_mask, self.mask_scale)
+        self._reference = self._thumbnail
+        self._frames_since_refresh = 0
+        self.resegmentations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.resegmentations
+        return {
+            "hits": self.hits,
+            "resegmentations": self.resegmentations,
+            "scene_changes": self.scene_changes,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -3,10 +3,13 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+# torchscript 导出为静态输入: batch=1, imgsz 固定为导出时的尺寸
+TORCHSCRIPT_IMGSZ = 640
 
 
 class EmailSettings(BaseModel):
@@ -57,11 +60,98 @@ class LogSettings(BaseModel):
     format: str = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 
 
+class DetectionSettings(BaseModel):
+    # 摄像头采集分辨率 (输出/录像分辨率与之相同)
+    webcam_width: int = 1280
+    webcam_height: int = 720
+    # 推理分辨率: 帧先缩放到该宽度 (0 = 采集分辨率) 供两个模型共用, 重叠在该分辨率计算
+    inference_width: int = 0
+    # 各模型的输入尺寸 (ultralytics imgsz)
+    river_imgsz: int = 640
+    person_imgsz: int = 640
+    # 单进程内允许同时运行的检测会话数 (共享已加载的模型)
+    max_sessions: int = Field(default=16, gt=0)
+    # 服务启动时预加载并预热模型, 就绪状态见 /health/ready
+    preload_models: bool = True
+    warmup_models: bool = True
+    # 推理后端: pytorch / onnx / openvino / torchscript (导出文件缓存在 model/exports/)
+    river_backend: Literal["pytorch", "onnx", "openvino", "torchscript"] = "pytorch"
+    person_backend: Literal["pytorch", "onnx", "openvino", "torchscript"] = "pytorch"
+    # 推理调度: per_thread 每个会话线程独立调用模型; batched 跨摄像头合批推理
+    inference_mode: Literal["per_thread", "batched"] = "per_thread"
+    batch_max_size: int = Field(default=16, gt=0)
+    batch_max_wait_ms: float = Field(default=10.0, ge=0)
+    # 同一帧的河流分割与人员检测并行执行 (建议 8 核以上开启)
+    parallel_models: bool = False
+    # torch 线程数 (torch.set_num_threads 为进程级设置, 只限制整个进程的线程池);
+    # 0 = 并行时两个模型平分本进程的线程数, 否则使用 torch 默认值
+    inference_threads_per_model: int = 0
+    # 摄像头使用独立的取帧线程, 只保留最新一帧 (避免驱动缓冲导致分析旧画面)
+    latest_frame_grabber: bool = True
+    # 自适应推理步长: null 表示仅对摄像头启用; 跳过的帧沿用外推的跟踪框
+    adaptive_stride: Optional[bool] = None
+    target_latency_ms: float = Field(default=200.0, gt=0)
+    max_stride: int = Field(default=6, gt=0)
+    # 流水线: 采集 -> 推理 -> 渲染 -> 输出, 各阶段之间的队列长度
+    pipeline_queue_size: int = Field(default=4, gt=0)
+    # 采集队列满时的策略: auto (摄像头丢弃最旧帧, 视频文件阻塞等待) / block / drop_oldest
+    pipeline_capture_policy: Literal["auto", "block", "drop_oldest"] = "auto"
+    # 运动门控: 水域内无运动时跳过人员检测, 沿用上次结果 (最多 motion_max_staleness 帧)
+    motion_gate: bool = False
+    motion_pixel_threshold: int = 25
+    motion_min_ratio: float = 0.002
+    motion_max_staleness: int = Field(default=15, gt=0)
+    # 人员检测只在水域外接框 (加边距) 内进行
+    person_roi: bool = False
+    person_roi_padding: int = 32
+    person_roi_max_fraction: float = 0.8
+    # 河流分割缓存: 每 N 帧或场景变化时重新分割
+    river_refresh_interval: int = Field(default=15, gt=0)
+    river_scene_change_threshold: float = 12.0
+    # 河流掩码来源: polygons = 多边形按推理分辨率重新栅格化, native = 直接使用模型输出的低分辨率掩码
+    river_mask_source: Literal["polygons", "native"] = "polygons"
+    # 输出视频编码: opencv (mp4v) / ffmpeg (H.264 子进程) / jpeg (逐帧图片目录) / disabled
+    video_writer: Literal["opencv", "ffmpeg", "jpeg", "disabled"] = "opencv"
+    # 编码线程队列长度; 摄像头满时丢弃最旧的帧, 视频文件等待编码
+    writer_queue_size: int = Field(default=16, gt=0)
+    ffmpeg_preset: str = "veryfast"
+    ffmpeg_crf: int = 23
+    jpeg_quality: int = 90
+    # MJPEG 流 (摄像头预览 / 检测画面) 的最大推送帧率
+    mjpeg_fps: float = Field(default=10.0, gt=0)
+    # 离线分段处理: 长视频按关键帧切分, 各段在独立进程中检测后按顺序合并
+    chunk_workers: int = 0  # 0 = CPU 核数
+    chunk_min_seconds: float = 60.0
+    chunk_overlap_seconds: float = 2.0
+
+    @model_validator(mode="after")
+    def _check_torchscript(self) -> "DetectionSettings":
+        models = (
+            ("river", self.river_backend, self.river_imgsz),
+            ("person", self.person_backend, self.person_imgsz),
+        )
+        for name, backend, imgsz in models:
+            if backend != "torchscript":
+                continue
+            if self.inference_mode == "batched":
+                raise ValueError(
+                    f"{name}_backend 'torchscript' is exported with batch size 1 and cannot be "
+                    f"used with inference_mode 'batched' (use onnx or openvino)"
+                )
+            if imgsz != TORCHSCRIPT_IMGSZ:
+                raise ValueError(
+                    f"{name}_backend 'torchscript' is exported at a fixed imgsz of "
+                    f"{TORCHSCRIPT_IMGSZ}; {name}_imgsz={imgsz} is not supported"
+                )
+        return self
+
+
 class AppSettings(BaseModel):
     incident_output_dir: str = "output/incidents"
     email: EmailSettings = EmailSettings()
     vlm: VLMSettings = VLMSettings()
     logging: LogSettings = LogSettings()
+    detection: DetectionSettings = DetectionSettings()
 
 
 def _load_yaml(path: Path) -> dict:
@@ -1,21 +1,87 @@
 import cv2
+import numpy as np
+import threading
+import sys
 import time
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
 from loguru import logger
 from tqdm import tqdm
 
-from backend.core.detection_utils import (
-    calculate_overlap_ratio,
-    draw_info,
-    draw_person_boxes,
-    draw_river_mask,
-    draw_warning,
+from backend.core.frame_analysis import (
+    FrameAnalysis,
+    analyze_with_river,
+    extrapolate_analysis,
+    river_from_masks,
+    river_from_result,
+    water_roi,
 )
+from backend.core.frame_grabber import LatestFrameGrabber
+from backend.core.frame_scheduler import AdaptiveStride
 from backend.core.incident_manager import IncidentManager
-from backend.core.model_loader import ModelLoader
+from backend.core.model_loader import LatencyStats, ModelLoader
+from backend.core.motion_gate import MotionGate
+from backend.core.overlay_renderer import OverlayCompositor
+from backend.core.pipeline import FramePipeline
+from backend.core.river_cache import RiverMaskCache
+from backend.core.settings import DetectionSettings
+from backend.core.video_writers import AsyncVideoWriter, create_frame_writer
 from backend.core.vlm_worker import VLMTask, VLMWorker
 
+# full: 每帧都渲染; auto: 仅在需要输出(录像/观看者)时渲染; headless: 只在生成事件截图时渲染
+RENDER_MODES = ("full", "auto", "headless")
+
+# torch 的线程数是进程级设置; 记录首次调整前的值, 作为本进程可分配的线程总数
+_torch_threads_lock = threading.Lock()
+_torch_thread_budget: Optional[int] = None
+
+
+def _size_torch_threads(threads_per_model: int, concurrent_models: int) -> int:
+    """Size torch's intra-op pool for this process; returns the thread count in effect.
+
+    ``torch.set_num_threads`` is process-wide, not per calling thread: it only
+    bounds the pool every concurrent model call draws from. A positive
+    ``threads_per_model`` is applied as is; otherwise, with several models
+    running at once, the process budget (torch's count before the first call,
+    e.g. as set by a process-pool initializer) is split between them.
+    """
+    global _torch_thread_budget
+    import torch
+
+    with _torch_threads_lock:
+        if _torch_thread_budget is None:
+            _torch_thread_budget = torch.get_num_threads()
+        threads = threads_per_model
+        if threads <= 0 and concurrent_models > 1:
+            threads = max(1, _torch_thread_budget // concurrent_models)
+        if threads > 0 and threads != torch.get_num_threads():
+            torch.set_num_threads(threads)
+        return torch.get_num_threads()
+
+
+@dataclass
+class FramePacket:
+    """One frame travelling through the processing pipeline."""
+
+    index: int
+    frame: np.ndarray
+    timestamp: float
+    analysis: Optional[FrameAnalysis] = None
+    show_warning: bool = False
+    warning_active: bool = False
+    info_message: str = ""
+    render: bool = False
+    push: bool = False
+    stream: bool = False
+    annotated: Optional[np.ndarray] = None
+
+
 class VideoProcessor:
+    # 警告横幅最长显示时间 / 无新检测后解除警告的时间 (秒)
+    WARNING_DURATION = 15
+    DETECTION_WINDOW = 30
+
     def __init__(
         self,
         video_source,
@@ -24,13 +90,26 @@ class VideoProcessor:
         vlm_worker: Optional[VLMWorker] = None,
         camera_id: Optional[str] = None,
         incident_manager: Optional[IncidentManager] = None,
+        record_output: bool = True,
+        render_mode: str = "auto",
+        detection_settings: Optional[DetectionSettings] = None,
+        model_loader: Optional[ModelLoader] = None,
+        inference=None,
+        stop_event: Optional[threading.Event] = None,
     ):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {render_mode}")
         self.video_source = video_source
         self.output_path = output_path
         self.is_webcam = is_webcam
+        self.detection_settings = detection_settings or DetectionSettings()
+        self.render_mode = render_mode
+        # headless never renders frames, so there is nothing to record
+        self.record_output = record_output and render_mode != "headless"
         self.vlm_worker = vlm_worker
         self.camera_id = camera_id or (f"webcam_{video_source}" if is_webcam else str(video_source))
         self.incident_manager = incident_manager
+        self.stop_event = stop_event
 
         # Open video capture (support both webcam and video file)
         if self.is_webcam:
@@ -44,8 +123,8 @@ class VideoProcessor:
                 # Set buffer size to 1 to get latest frame
                 self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
                 # Try to set higher resolution if supported
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.detection_settings.webcam_width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.detection_settings.webcam_height)
         else:
             logger.info(f"Opening video file: {video_source}")
             self.cap = cv2.VideoCapture(video_source)
@@ -56,20 +135,75 @@ class VideoProcessor:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
         
-        self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+        self.fps = self._source_fps()
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.out = cv2.VideoWriter(output_path, fourcc, self.fps, (self.width, self.height))
+        # Encoding runs on the writer's own thread; "disabled" turns recording off
+        self.out: Optional[AsyncVideoWriter] = None
+        self._writer_stats: Optional[Dict[str, Any]] = None
+        if self.record_output:
+            self.out = self._create_writer()
+            self.record_output = self.out is not None
+            if self.out is not None:
+                self.output_path = self.out.path
         
-        self.model_loader = ModelLoader()
+        # Sessions may share one loader; tracker state is kept per processor
+        self._owns_model_loader = model_loader is None
+        self.model_loader = model_loader or ModelLoader()
+        # ModelLoader (per-thread) or BatchInferenceScheduler; both offer track_river/track_person
+        self.inference = inference or self.model_loader
+        self.tracker_key = f"{self.camera_id}:{id(self):x}"
+        self.compositor = OverlayCompositor()
+        # incident screenshots are rendered in the analyze stage, concurrently with the render stage
+        self.snapshot_compositor = OverlayCompositor()
+        self.pipeline: Optional[FramePipeline] = None
+        self.grabber: Optional[LatestFrameGrabber] = None
+        # Adaptive inference stride (webcams by default): skipped frames reuse extrapolated tracks
+        self.stride_scheduler: Optional[AdaptiveStride] = None
+        adaptive_stride = self.detection_settings.adaptive_stride
+        if adaptive_stride or (adaptive_stride is None and self.is_webcam):
+            self.stride_scheduler = AdaptiveStride(
+                source_fps=self.fps,
+                target_latency=self.detection_settings.target_latency_ms / 1000,
+                max_stride=self.detection_settings.max_stride,
+            )
+        self._last_inferred: Optional[Tuple[int, FrameAnalysis]] = None
+        self.motion_gate: Optional[MotionGate] = None
+        if self.detection_settings.motion_gate:
+            self.motion_gate = MotionGate(
+                pixel_threshold=self.detection_settings.motion_pixel_threshold,
+                min_motion_ratio=self.detection_settings.motion_min_ratio,
+                max_staleness=self.detection_settings.motion_max_staleness,
+            )
+        self._last_person_result = None
+        # Person detection on the padded water bounding box only (None = full frame)
+        self.person_roi: Optional[Tuple[int, int, int, int]] = None
+        self._roi_source: Optional[np.ndarray] = None
+        self._roi_changes = 0
+        self._person_key = self.tracker_key
+        self._previous_inferred: Optional[Tuple[int, FrameAnalysis]] = None
+        self.river_cache = RiverMaskCache(
+            refresh_interval=self.detection_settings.river_refresh_interval,
+            scene_change_threshold=self.detection_settings.river_scene_change_threshold,
+        )
+        # River segmentation can run on a worker while person detection runs on the analyze thread
+        self.inference_latency = LatencyStats()
+        self._model_executor: Optional[ThreadPoolExecutor] = None
+        if self.detection_settings.parallel_models:
+            self._model_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"river-{self.camera_id}"
+            )
+        self.torch_threads = _size_torch_threads(
+            self.detection_settings.inference_threads_per_model,
+            2 if self._model_executor is not None else 1,
+        )
         
         self.warning_active = False
         self.last_detection_time = 0
         self.warning_start_time = 0
-        self.warning_duration = 15
-        self.detection_window = 30
+        self.warning_duration = self.WARNING_DURATION
+        self.detection_window = self.DETECTION_WINDOW
         self.info_message = ""
         self.last_print_time = 0
         self.print_interval = 5  # 每秒打印一次警告信息
@@ -80,121 +214,377 @@ class VideoProcessor:
         self.incident_vlm_dispatched = False
 
     def process_video(self):
+        """Run the capture → analyze → render → output pipeline until the source ends or stops."""
+        self._log_start()
+        self._frames_read = 0
+        self._frames_done = 0
+        self._pbar = tqdm(total=self.total_frames, desc="Processing video", unit="frames") if self.total_frames else None
+
+        queue_size = self.detection_settings.pipeline_queue_size
+        self.pipeline = FramePipeline(f"video-{self.camera_id}")
+        self.pipeline.add_stage("analyze", self._analyze_stage, queue_size, self._capture_policy())
+        self.pipeline.add_stage("render", self._render_stage, queue_size)
+        self.pipeline.add_stage("output", self._output_stage, queue_size)
+        # render 输出排队(queue_size) + 输出阶段在用 + 渲染阶段在写
+        self._render_buffers = [None] * (queue_size + 2)
+        self._renders = 0
+        # Live cameras: a grabber thread drains the device so we always analyze the newest frame
+        if self.is_webcam and self.detection_settings.latest_frame_grabber:
+            self.grabber = LatestFrameGrabber(self.cap, name=self.camera_id).start()
+        try:
+            self.pipeline.run(self._read_frame)
+        finally:
+            if self._pbar:
+                self._pbar.close()
+            self.cleanup()
+
+    def _source_fps(self):
+        return int(self.cap.get(cv2.CAP_PROP_FPS))
+
+    def _log_start(self):
         logger.info(f"开始处理视频 - 摄像头ID: {self.camera_id}, 输出路径: {self.output_path}")
         logger.info(f"视频参数 - FPS: {self.fps}, 分辨率: {self.width}x{self.height}, 总帧数: {self.total_frames}")
-        
-        frame_count = 0
-        pbar = tqdm(total=self.total_frames, desc="Processing video", unit="frames") if self.total_frames else None
-        
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                if self.is_webcam:
-                    logger.debug("摄像头读取失败，继续尝试...")
+
+    def _create_writer(self, start_index: int = 0) -> Optional[AsyncVideoWriter]:
+        settings = self.detection_settings
+        writer = create_frame_writer(
+            settings.video_writer,
+            self.output_path,
+            self.fps,
+            (self.width, self.height),
+            ffmpeg_preset=settings.ffmpeg_preset,
+            ffmpeg_crf=settings.ffmpeg_crf,
+            jpeg_quality=settings.jpeg_quality,
+            start_index=start_index,
+        )
+        if writer is None:
+            return None
+        # 摄像头: 编码跟不上时丢弃最旧帧, 不拖慢检测; 视频文件: 不丢帧
+        policy = "drop_oldest" if self.is_webcam else "block"
+        return AsyncVideoWriter(writer, queue_size=settings.writer_queue_size, policy=policy, name=self.camera_id)
+
+    def _capture_policy(self) -> str:
+        """Live cameras drop the oldest waiting frame; files never lose frames."""
+        policy = self.detection_settings.pipeline_capture_policy
+        if policy == "auto":
+            return "drop_oldest" if self.is_webcam else "block"
+        return policy
+
+    def _stop_requested(self) -> bool:
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _read_frame(self) -> Optional[FramePacket]:
+        """Pipeline source: the next captured frame, or ``None`` at end of stream / stop."""
+        while not self._stop_requested():
+            if self.grabber is not None:
+                grabbed = self.grabber.read(timeout=0.5)
+                if grabbed is None:
+                    if not self.grabber.running:
+                        logger.info(f"摄像头已关闭，共读取 {self._frames_read} 帧")
+                        return None
                     continue
-                else:
-                    logger.info(f"视频处理完成，共处理 {frame_count} 帧")
-                    break
+                frame, timestamp, index = grabbed
+                self._frames_read += 1
+                return FramePacket(index=index, frame=frame, timestamp=timestamp)
+            ret, frame = self.cap.read()
+            if ret:
+                packet = FramePacket(index=self._frames_read, frame=frame, timestamp=time.time())
+                self._frames_read += 1
+                return packet
+            if not self.is_webcam:
+                logger.info(f"视频处理完成，共读取 {self._frames_read} 帧")
+                return None
+            logger.debug("摄像头读取失败，继续尝试...")
+        logger.info(f"收到停止信号，终止视频处理。已处理 {self._frames_done} 帧")
+        return None
 
-            current_time = time.time()
+    def _analyze_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """Inference plus incident/warning bookkeeping; decides what to render for the frame."""
+        if self._stop_requested():
+            self.pipeline.cancel()
+            return None
+        current_time = packet.timestamp
+        analysis = self._analyze_packet(packet)
+        max_overlap_ratio, best_bbox = analysis.max_overlap()
 
-            results_river = self.model_loader.get_river_model().track(
-                source=frame, show=False, tracker="bytetrack.yaml", verbose=False
+        if max_overlap_ratio > 0.90:
+            self.last_detection_time = current_time
+            incident_id = self._ensure_incident(
+                packet.frame, analysis, best_bbox, max_overlap_ratio, current_time, packet.index
             )
-            results_person = self.model_loader.get_person_model().track(
-                source=frame, show=False, tracker="bytetrack.yaml", verbose=False
+            self._log_alert(packet.index, max_overlap_ratio, best_bbox, incident_id)
+            self._maybe_dispatch_vlm_task(
+                packet.frame, best_bbox, max_overlap_ratio, current_time, packet.index, incident_id
             )
+            if not self.warning_active:
+                self.warning_active = True
+                self.warning_start_time = current_time
+                self.info_message = f"Warning: Drowning danger detected! Overlap ratio: {max_overlap_ratio:.2f}"
+                self.print_warning(self.info_message)
 
-            annotated_frame = frame.copy()
-            
-            river_mask = draw_river_mask(annotated_frame, results_river[0].masks if results_river[0].masks is not None else None)
-            person_detected, person_masks, person_bboxes = draw_person_boxes(annotated_frame, 
-                                                              results_person[0].boxes if results_person[0].boxes is not None else None, 
-                                                              river_mask)
-
-            max_overlap_ratio = 0
-            best_bbox: Optional[Tuple[int, int, int, int]] = None
-            if person_detected and person_masks:
-                for person_mask, bbox in zip(person_masks, person_bboxes):
-                    overlap_ratio = calculate_overlap_ratio(person_mask, river_mask)
-                    if overlap_ratio > max_overlap_ratio:
-                        max_overlap_ratio = overlap_ratio
-                        best_bbox = bbox
-
-            if max_overlap_ratio > 0.90:
-                logger.warning(
-                    f"检测到溺水危险 - 帧ID: {frame_count}, 重叠比例: {max_overlap_ratio:.2f}, "
-                    f"边界框: {best_bbox}, 摄像头: {self.camera_id}"
-                )
-                self.last_detection_time = current_time
-                incident_id = self._ensure_incident(
-                    annotated_frame, best_bbox, max_overlap_ratio, current_time, frame_count
-                )
-                self._maybe_dispatch_vlm_task(
-                    frame,
-                    best_bbox,
-                    max_overlap_ratio,
-                    current_time,
-                    frame_count,
-                    incident_id,
+        packet.analysis = analysis
+        packet.show_warning = self._update_warning_state(current_time)
+        packet.warning_active = self.warning_active
+        packet.info_message = self.info_message
+        self._mark_outputs(packet)
+        return packet
+
+    def _analyze_packet(self, packet: FramePacket) -> FrameAnalysis:
+        """Infer the frame, or extrapolate the last tracks when the adaptive stride skips it."""
+        scheduler = self.stride_scheduler
+        if scheduler is not None and self._last_inferred is not None and not scheduler.should_infer(packet.index):
+            last_index, last_analysis = self._last_inferred
+            previous_index, previous_analysis = self._previous_inferred or (last_index, None)
+            return extrapolate_analysis(
+                previous_analysis,
+                last_analysis,
+                gap=last_index - previous_index,
+                steps=packet.index - last_index,
+                overlap_index=self.river_cache.overlap_index,
+            )
+
+        started_at = time.perf_counter()
+        analysis = self.analyze_frame(packet.frame)
+        if scheduler is not None:
+            scheduler.observe(packet.index, time.perf_counter() - started_at, time.time() - packet.timestamp)
+            self._previous_inferred = self._last_inferred
+            self._last_inferred = (packet.index, analysis)
+        return analysis
+
+    def _log_alert(self, frame_id: int, overlap_ratio: float, bbox, incident_id: Optional[str]):
+        logger.warning(
+            f"检测到溺水危险 - 帧ID: {frame_id}, 重叠比例: {overlap_ratio:.2f}, "
+            f"边界框: {bbox}, 摄像头: {self.camera_id}"
+        )
+
+    def _mark_outputs(self, packet: FramePacket):
+        """Decide whether the frame gets an annotated copy (runs in the analyze stage)."""
+        packet.render = self.should_render(packet.timestamp)
+
+    def _render_stage(self, packet: FramePacket) -> FramePacket:
+        # Skip annotation entirely when nobody records or watches this frame
+        if packet.render:
+            # round-robin by render count (frame indices have gaps when frames are dropped)
+            slot = self._renders % len(self._render_buffers)
+            self._renders += 1
+            buffer = self._render_buffers[slot]
+            if buffer is None or buffer.shape != packet.frame.shape:
+                buffer = self._render_buffers[slot] = np.empty_like(packet.frame)
+            packet.annotated = self.compositor.compose(
+                packet.frame, packet.analysis, packet.show_warning, packet.info_message, out=buffer
+            )
+        return packet
+
+    def _output_stage(self, packet: FramePacket) -> None:
+        """Encode/publish in frame order, then update the progress counters."""
+        if packet.annotated is not None:
+            if self.out is not None:
+                self.out.write(packet.annotated)
+            self._publish_frame(packet)
+        self._frames_done += 1
+        if self._pbar:
+            self._pbar.update(1)
+        self._frame_done(packet)
+
+    def _publish_frame(self, packet: FramePacket):
+        """Hook for subclasses that stream annotated frames."""
+
+    def _frame_done(self, packet: FramePacket):
+        """Hook called after each frame leaves the pipeline."""
+
+    def analyze_frame(self, frame) -> FrameAnalysis:
+        """Run both models on ``frame`` and reduce the results to a ``FrameAnalysis``.
+
+        The river segmentation is served from ``self.river_cache`` unless it is due
+        for a refresh or the scene changed. With ``parallel_models`` the two models
+        run concurrently and are joined before the overlap step. With the motion
+        gate, person detection is skipped while nothing moves in the water.
+        Inference and overlap run at ``inference_width``; the returned analysis
+        carries the scale back to frame pixels.
+        """
+        started_at = time.perf_counter()
+        # both models (and the motion gate) share one downscaled copy of the frame
+        frame, scale = self._inference_frame(frame)
+        river_imgsz = self.detection_settings.river_imgsz
+        refresh_river = self.river_cache.needs_refresh(frame)
+        river_future = None
+        results_river = None
+        if refresh_river:
+            if self._model_executor is not None:
+                river_future = self._model_executor.submit(
+                    self._timed, "river", self.inference.track_river, frame, imgsz=river_imgsz
                 )
-                if not self.warning_active:
-                    self.warning_active = True
-                    self.warning_start_time = current_time
-                    self.info_message = f"Warning: Drowning danger detected! Overlap ratio: {max_overlap_ratio:.2f}"
-                    self.print_warning(self.info_message)
-
-            if self.warning_active:
-                draw_warning(annotated_frame)
-
-                if current_time - self.last_print_time >= self.print_interval:
-                    self.print_warning(self.info_message)
-                    self.last_print_time = current_time
-
-                if current_time - self.last_detection_time > self.detection_window:
-                    self.warning_active = False
-                    self.info_message = "Warning cleared: Detection window time exceeded"
-                    self.print_warning_cleared(self.info_message)
-                    self._reset_incident_tracking()
-            
-            if self.warning_active and current_time - self.warning_start_time > self.warning_duration:
+            else:
+                results_river = self._timed("river", self.inference.track_river, frame, imgsz=river_imgsz)
+        # Motion gate: without motion in the water, reuse the last (boundedly stale) detections
+        if (
+            self.motion_gate is None
+            or self._last_person_result is None
+            or self.motion_gate.should_infer(frame, self.river_cache.river_mask, force=refresh_river)
+        ):
+            person_input, offset = self._person_input(frame)
+            results_person = self._timed(
+                "person",
+                self.inference.track_person,
+                person_input,
+                self._person_key,
+                imgsz=self.detection_settings.person_imgsz,
+            )
+            self._last_person_result = (results_person[0], offset)
+            if self.motion_gate is not None:
+                self.motion_gate.mark_inferred()
+        if river_future is not None:
+            results_river = river_future.result()
+        if refresh_river:
+            if self.detection_settings.river_mask_source == "native":
+                self.river_cache.store(*river_from_masks(frame.shape, results_river[0], scale))
+            else:
+                self.river_cache.store(*river_from_result(frame.shape, results_river[0], scale))
+        self.inference_latency.record("wall", time.perf_counter() - started_at)
+        person_result, offset = self._last_person_result
+        return analyze_with_river(
+            self.river_cache.polygons,
+            self.river_cache.river_mask,
+            person_result,
+            overlap_index=self.river_cache.overlap_index,
+            offset=offset,
+            scale=scale,
+            mask_scale=self.river_cache.mask_scale,
+        )
+
+    def _inference_frame(self, frame) -> Tuple[np.ndarray, float]:
+        """``frame`` downscaled to ``inference_width`` and the frame-pixels-per-analysis-pixel scale."""
+        target_width = self.detection_settings.inference_width
+        height, width = frame.shape[:2]
+        if target_width <= 0 or target_width >= width:
+            return frame, 1.0
+        size = (target_width, max(1, round(height * target_width / width)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA), width / target_width
+
+    def _person_input(self, frame) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """The part of ``frame`` person detection runs on (the padded water ROI) and its offset."""
+        if not self.detection_settings.person_roi:
+            return frame, (0, 0)
+        river_mask = self.river_cache.river_mask
+        if river_mask is not self._roi_source:
+            self._roi_source = river_mask
+            roi = water_roi(
+                river_mask,
+                padding=self.detection_settings.person_roi_padding,
+                max_fraction=self.detection_settings.person_roi_max_fraction,
+                mask_scale=self.river_cache.mask_scale,
+            )
+            if roi != self.person_roi:
+                # track coordinates are crop-relative: a moved crop starts a fresh tracker
+                old_key = self._person_key
+                self._roi_changes += 1
+                self._person_key = f"{self.tracker_key}/roi{self._roi_changes}"
+                if old_key != self.tracker_key:
+                    self.inference.release_trackers(old_key)
+                self.person_roi = roi
+        if self.person_roi is None:
+            return frame, (0, 0)
+        x1, y1, x2, y2 = self.person_roi
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def _timed(self, name: str, track, frame, key=None, imgsz: Optional[int] = None):
+        started_at = time.perf_counter()
+        results = track(frame, key or self.tracker_key, imgsz)
+        self.inference_latency.record(name, time.perf_counter() - started_at)
+        return results
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime counters for tuning, reported through the detection status."""
+        metrics = {
+            "river_cache": self.river_cache.stats(),
+            "inference": self.inference_latency.snapshot(),
+            "torch_threads": self.torch_threads,
+            "resolution": {
+                "capture": [self.width, self.height],
+                "inference_width": self.detection_settings.inference_width or self.width,
+                "river_imgsz": self.detection_settings.river_imgsz,
+                "person_imgsz": self.detection_settings.person_imgsz,
+            },
+        }
+        if self.pipeline is not None:
+            metrics["pipeline"] = self.pipeline.stats()
+        if self.stride_scheduler is not None:
+            metrics["stride"] = self.stride_scheduler.stats()
+        if self.grabber is not None:
+            metrics["grabber"] = self.grabber.stats()
+        if self.out is not None:
+            metrics["writer"] = self.out.stats()
+        elif self._writer_stats is not None:
+            metrics["writer"] = self._writer_stats
+        if self.motion_gate is not None:
+            metrics["motion_gate"] = self.motion_gate.stats()
+        if self.detection_settings.person_roi:
+            roi = self.person_roi
+            metrics["person_roi"] = {
+                "roi": list(roi) if roi else None,
+                "area_fraction": (roi[2] - roi[0]) * (roi[3] - roi[1]) / (self.width * self.height) if roi else 1.0,
+                "changes": self._roi_changes,
+            }
+        return metrics
+
+    def _update_warning_state(self, current_time: float) -> bool:
+        """Expire the active warning; returns whether this frame still shows the warning banner."""
+        show_warning = self.warning_active
+        if self.warning_active:
+            if current_time - self.last_print_time >= self.print_interval:
+                self.print_warning(self.info_message)
+                self.last_print_time = current_time
+
+            if current_time - self.last_detection_time > self.detection_window:
                 self.warning_active = False
-                self.info_message = "Warning cleared: Warning duration exceeded"
+                self.info_message = "Warning cleared: Detection window time exceeded"
                 self.print_warning_cleared(self.info_message)
                 self._reset_incident_tracking()
 
-            draw_info(annotated_frame, self.info_message)
+        if self.warning_active and current_time - self.warning_start_time > self.warning_duration:
+            self.warning_active = False
+            self.info_message = "Warning cleared: Warning duration exceeded"
+            self.print_warning_cleared(self.info_message)
+            self._reset_incident_tracking()
+        return show_warning
 
-            self.out.write(annotated_frame)
+    def should_render(self, current_time: float) -> bool:
+        """Whether this frame needs an annotated copy (recording or full render mode).
 
-            frame_count += 1
-            if pbar:
-                pbar.update(1)
+        ``current_time`` is the frame's timestamp; the base rule does not depend
+        on it, subclasses that render on a schedule (preview pushes) do.
+        """
+        return self.render_mode == "full" or self.out is not None
 
-        if pbar:
-            pbar.close()
-        self.cleanup()
+    def render_overlays(self, frame, analysis: FrameAnalysis):
+        """River/person overlays only, in a fresh array (used for incident screenshots)."""
+        return self.snapshot_compositor.compose(frame, analysis, out=np.empty_like(frame))
 
     def print_warning(self, message):
         # 打印多行警告信息，使其更加显眼
+        # 输出到 stderr: stdout 留给命令行的 JSON 汇总
         logger.warning(message)
-        print("\n" + "=" * 50)
+        print("\n" + "=" * 50, file=sys.stderr)
         for _ in range(1):
-            print(f"\033[91m{message}\033[0m")  # 红色文字输出警告信息
-        print("=" * 50 + "\n")
+            print(f"\033[91m{message}\033[0m", file=sys.stderr)  # 红色文字输出警告信息
+        print("=" * 50 + "\n", file=sys.stderr)
 
     def print_warning_cleared(self, message):
         # 打印多行警告解除信息，使其更加显眼
         logger.info(message)
-        print("\n" + "=" * 50)
+        print("\n" + "=" * 50, file=sys.stderr)
         for _ in range(1):
-            print(f"\033[93m{message}\033[0m")  # 黄色文字输出警告解除信息
-        print("=" * 50 + "\n")
+            print(f"\033[93m{message}\033[0m", file=sys.stderr)  # 黄色文字输出警告解除信息
+        print("=" * 50 + "\n", file=sys.stderr)
 
     def cleanup(self):
         logger.info("Cleaning up video processor resources...")
         import time
 
+        # Stop the grabber before releasing the capture it reads from
+        if self.grabber is not None:
+            self.grabber.stop()
+
         # Release video capture (may hang on webcam, use timeout protection)
         try:
             if self.cap is not None:
@@ -207,15 +597,27 @@ class VideoProcessor:
         except Exception as e:
             logger.error(f"Error releasing video capture: {e}")
 
-        # Release video writer
+        # Release video writer (drains the encoder queue)
         try:
             if self.out is not None:
                 self.out.release()
-                logger.debug("Video writer released")
+                self._writer_stats = self.out.stats()
+                logger.debug(f"Video writer released: {self._writer_stats}")
                 self.out = None
         except Exception as e:
             logger.error(f"Error releasing video writer: {e}")
 
+        try:
+            if self._model_executor is not None:
+                self._model_executor.shutdown(wait=True)
+            self.inference.release_trackers(self.tracker_key)
+            if self._person_key != self.tracker_key:
+                self.inference.release_trackers(self._person_key)
+            if self._owns_model_loader:
+                self.model_loader.close()
+        except Exception as e:
+            logger.debug(f"Error releasing tracker state: {e}")
+
         # Destroy all OpenCV windows
         try:
             import cv2
@@ -244,20 +646,16 @@ class VideoProcessor:
             return
         if self.incident_vlm_dispatched:
             return
-        x1, y1, x2, y2 = bbox
-        x1 = max(0, min(self.width - 1, x1))
-        x2 = max(0, min(self.width, x2))
-        y1 = max(0, min(self.height - 1, y1))
-        y2 = max(0, min(self.height, y2))
-        if x2 <= x1 or y2 <= y1:
+        cropped = self._crop_bbox(frame, bbox)
+        if cropped is None:
             return
-        crop = frame[y1:y2, x1:x2].copy()
+        crop, clipped_bbox = cropped
         task = VLMTask(
             frame_id=frame_id,
             timestamp=timestamp,
             camera_id=self.camera_id,
             overlap_ratio=overlap_ratio,
-            bbox=(x1, y1, x2, y2),
+            bbox=clipped_bbox,
             image_crop=crop,
             extra_metadata={
                 "is_webcam": self.is_webcam,
@@ -271,9 +669,21 @@ class VideoProcessor:
         else:
             self.incident_vlm_dispatched = True
 
+    def _crop_bbox(self, frame, bbox: Tuple[int, int, int, int]):
+        """Copy of ``frame`` inside ``bbox`` clipped to the frame, with the clipped box; ``None`` if empty."""
+        x1, y1, x2, y2 = bbox
+        x1 = max(0, min(self.width - 1, x1))
+        x2 = max(0, min(self.width, x2))
+        y1 = max(0, min(self.height - 1, y1))
+        y2 = max(0, min(self.height, y2))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2].copy(), (x1, y1, x2, y2)
+
     def _ensure_incident(
         self,
-        annotated_frame,
+        frame,
+        analysis: FrameAnalysis,
         bbox: Optional[Tuple[int, int, int, int]],
         overlap_ratio: float,
         timestamp: float,
@@ -289,7 +699,7 @@ class VideoProcessor:
             timestamp=timestamp,
             overlap_ratio=overlap_ratio,
             bbox=bbox,
-            annotated_frame=annotated_frame.copy(),
+            annotated_frame=self.render_overlays(frame, analysis),
             extra_metadata={"video_source": str(self.video_source)},
         )
         self.current_incident_id = record.incident_id
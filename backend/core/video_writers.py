@@ -0,0 +1,222 @@
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .pipeline import END, BoundedQueue
+
+# opencv: mp4v (cv2.VideoWriter); ffmpeg: H.264 子进程; jpeg: 逐帧 JPEG 图片目录; disabled: 不输出
+WRITER_BACKENDS = ("opencv", "ffmpeg", "jpeg", "disabled")
+
+
+class FrameWriter(ABC):
+    """Synchronous encoder backend; ``AsyncVideoWriter`` calls it from its own thread."""
+
+    name = "base"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @abstractmethod
+    def write(self, frame: np.ndarray) -> None:
+        """Encode one BGR frame."""
+
+    @abstractmethod
+    def release(self) -> None:
+        """Flush and close the output."""
+
+
+class OpenCVWriter(FrameWriter):
+    name = "opencv"
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], fourcc: str = "mp4v") -> None:
+        super().__init__(path)
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self._writer.isOpened():
+            logger.error(f"无法创建视频文件: {path}")
+
+    def write(self, frame: np.ndarray) -> None:
+        self._writer.write(frame)
+
+    def release(self) -> None:
+        self._writer.release()
+
+
+class FFmpegWriter(FrameWriter):
+    """Pipes raw BGR frames into an ``ffmpeg`` subprocess (H.264, yuv420p)."""
+
+    name = "ffmpeg"
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        size: Tuple[int, int],
+        preset: str = "veryfast",
+        crf: int = 23,
+        codec: str = "libx264",
+        executable: str = "ffmpeg",
+    ) -> None:
+        super().__init__(path)
+        width, height = size
+        # fmt: off
+        command = [
+            executable, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps}",
+            "-i", "-",
+            "-an", "-c:v", codec, "-preset", preset, "-crf", str(crf),
+            # yuv420p 需要偶数宽高
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p",
+            path,
+        ]
+        # fmt: on
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray) -> None:
+        self._process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self) -> None:
+        try:
+            # communicate() 关闭 stdin 后等待 ffmpeg 写完文件尾
+            _, stderr = self._process.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            _, stderr = self._process.communicate()
+        if self._process.returncode != 0:
+            message = stderr.decode(errors="replace").strip()
+            logger.error(f"ffmpeg 编码失败 ({self._process.returncode}): {message}")
+
+
+class JpegSequenceWriter(FrameWriter):
+    """One JPEG per frame in a directory, named by frame number from ``start_index``."""
+
+    name = "jpeg"
+
+    def __init__(self, path: str, quality: int = 90, start_index: int = 0) -> None:
+        super().__init__(path)
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self._index = start_index
+
+    def write(self, frame: np.ndarray) -> None:
+        cv2.imwrite(str(Path(self.path) / f"{self._index:06d}.jpg"), frame, self._params)
+        self._index += 1
+
+    def release(self) -> None:
+        # every frame is already a complete file
+        pass
+
+
+def create_frame_writer(
+    backend: str,
+    path: str,
+    fps: float,
+    size: Tuple[int, int],
+    ffmpeg_preset: str = "veryfast",
+    ffmpeg_crf: int = 23,
+    jpeg_quality: int = 90,
+    start_index: int = 0,
+) -> Optional[FrameWriter]:
+    """Encoder for ``backend``; ``None`` for ``disabled``.
+
+    ``jpeg`` writes to ``path`` without its suffix.
+    """
+    if backend not in WRITER_BACKENDS:
+        raise ValueError(f"Unknown video writer backend: {backend}")
+    if backend == "disabled":
+        return None
+    if backend == "jpeg":
+        return JpegSequenceWriter(
+            str(Path(path).with_suffix("")), quality=jpeg_quality, start_index=start_index
+        )
+    if backend == "ffmpeg":
+        executable = shutil.which("ffmpeg")
+        if executable:
+            return FFmpegWriter(
+                path, fps, size, preset=ffmpeg_preset, crf=ffmpeg_crf, executable=executable
+            )
+        logger.warning("未找到 ffmpeg, 改用 OpenCV mp4v 编码")
+    return OpenCVWriter(path, fps, size)
+
+
+class AsyncVideoWriter:
+    """Encodes frames on a background thread behind a bounded queue.
+
+    ``write`` copies the frame (callers reuse their render buffers). With
+    ``drop_oldest`` it never waits: when the encoder falls behind, the oldest
+    queued frame is dropped rather than stalling detection; ``block`` waits
+    for room instead, so no frame is lost. ``release`` drains the queue.
+    """
+
+    def __init__(
+        self,
+        writer: FrameWriter,
+        queue_size: int = 16,
+        policy: str = "drop_oldest",
+        name: str = "video",
+    ) -> None:
+        self.writer = writer
+        self.path = writer.path
+        self._queue = BoundedQueue(queue_size, policy)
+        self.submitted = 0
+        self.written = 0
+        self.errors = 0
+        self._encode_time = 0.0
+        self._lag_total = 0.0
+        self.last_lag = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"writer-{name}", daemon=True)
+        self._thread.start()
+
+    def write(self, frame: np.ndarray) -> None:
+        self.submitted += 1
+        self._queue.put((frame.copy(), time.perf_counter()))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is END:
+                break
+            frame, queued_at = item
+            started_at = time.perf_counter()
+            try:
+                self.writer.write(frame)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    logger.error(f"视频编码失败 ({self.writer.name}): {e}")
+                continue
+            finished_at = time.perf_counter()
+            self._encode_time += finished_at - started_at
+            self.last_lag = finished_at - queued_at
+            self._lag_total += self.last_lag
+            self.written += 1
+
+    def release(self) -> None:
+        """Encode what is still queued, then close the backend."""
+        self._queue.close()
+        self._thread.join()
+        self.writer.release()
+
+    def stats(self) -> Dict[str, Any]:
+        written = self.written or 1
+        return {
+            "backend": self.writer.name,
+            "path": self.path,
+            "queue_depth": len(self._queue),
+            "queue_size": self._queue.maxsize,
+            "queue_peak": self._queue.peak_depth,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self._queue.dropped,
+            "errors": self.errors,
+            "avg_encode_ms": self._encode_time / written * 1000,
+            "encoder_lag_ms": self.last_lag * 1000,
+            "avg_lag_ms": self._lag_total / written * 1000,
+        }
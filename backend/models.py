@@ -1,6 +1,6 @@
 """Pydantic models for API requests and responses"""
 from pydantic import BaseModel, Field
-from typing import Optional, List, Union, Dict, Any
+from typing import Optional, List, Union, Dict, Any, Literal
 from datetime import datetime
 
 
@@ -8,6 +8,18 @@ from datetime import datetime
 class DetectionStartRequest(BaseModel):
     video_source: Union[str, int] = Field(..., description="Video file path or camera index")
     is_webcam: bool = Field(default=False, description="Whether the source is a webcam")
+    camera_id: Optional[str] = Field(default=None, description="Camera identifier (defaults to webcam_<index> or the file path)")
+    record_output: bool = Field(default=True, description="Write the annotated video to the output MP4")
+    render_mode: Literal["full", "auto", "headless"] = Field(
+        default="auto",
+        description="full: annotate every frame; auto: only when recording or viewers are connected; "
+                    "headless: only for incident screenshots"
+    )
+    inference_width: Optional[int] = Field(
+        default=None, ge=0, description="Downscale frames to this width for inference (0 = capture resolution)"
+    )
+    river_imgsz: Optional[int] = Field(default=None, gt=0, description="River segmentation model input size")
+    person_imgsz: Optional[int] = Field(default=None, gt=0, description="Person detection model input size")
 
 
 class DetectionStartResponse(BaseModel):
@@ -22,12 +34,29 @@ class DetectionStopResponse(BaseModel):
 
 
 class DetectionStatusResponse(BaseModel):
-    status: str  # "running", "idle", "stopping"
+    status: str  # "starting", "running", "idle", "stopping", "stopped"
     session_id: Optional[str] = None
+    camera_id: Optional[str] = None
     current_frame: int = 0
     fps: float = 0.0
     elapsed_time: float = 0.0
     video_source: Optional[str] = None
+    output_path: Optional[str] = None
+    render_mode: Optional[str] = None
+    record_output: Optional[bool] = None
+    stride: Optional[int] = None  # current inference stride (adaptive scheduling only)
+    lag_ms: Optional[float] = None  # capture-to-analysis lag of the last inferred frame
+    metrics: Dict[str, Any] = Field(default_factory=dict)
+
+
+class DetectionSessionListResponse(BaseModel):
+    total: int
+    running: int
+    total_fps: float = 0.0
+    total_frames: int = 0
+    sessions: List[DetectionStatusResponse]
+    inference: Dict[str, Any] = Field(default_factory=dict)
+    websocket: Dict[str, Any] = Field(default_factory=dict)
 
 
 # Incident API Models
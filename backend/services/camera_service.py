@@ -6,12 +6,23 @@ import time
 from typing import Dict, List, Optional
 from loguru import logger
 
+from backend.core.frame_grabber import LatestFrameGrabber
+from backend.services.frame_encoder import StreamTier
+from backend.services.mjpeg_stream import FrameSlot
+
+# 轮询接口 (/preview/frame) 的 JPEG 参数: 原始分辨率, 质量 80
+PREVIEW_TIER = StreamTier("preview", None, 80)
+
 
 class CameraService:
     """Service for managing camera operations"""
 
     def __init__(self):
         self.preview_cameras: Dict[int, cv2.VideoCapture] = {}
+        # A grabber thread per previewed camera keeps its newest frame in a slot
+        # shared by the polling endpoint and MJPEG viewers
+        self.preview_grabbers: Dict[int, LatestFrameGrabber] = {}
+        self.preview_slots: Dict[int, FrameSlot] = {}
         self.preview_lock = threading.Lock()
 
     def list_cameras(self, max_cameras: int = 10) -> List[Dict]:
@@ -84,7 +95,13 @@ class CameraService:
                 cap.release()
                 return False
 
+            slot = FrameSlot()
+            slot.update(frame)
             self.preview_cameras[camera_index] = cap
+            self.preview_slots[camera_index] = slot
+            self.preview_grabbers[camera_index] = LatestFrameGrabber(
+                cap, name=f"preview-{camera_index}", on_frame=lambda frame, _: slot.update(frame)
+            ).start()
             logger.info(f"Successfully started preview for camera {camera_index}")
             return True
 
@@ -92,6 +109,13 @@ class CameraService:
         """Internal method to stop preview without lock (already locked)"""
         if camera_index in self.preview_cameras:
             try:
+                # Stop the grabber before releasing the capture it reads from
+                grabber = self.preview_grabbers.pop(camera_index, None)
+                if grabber is not None:
+                    grabber.stop()
+                slot = self.preview_slots.pop(camera_index, None)
+                if slot is not None:
+                    slot.close()
                 cap = self.preview_cameras[camera_index]
                 cap.release()
                 del self.preview_cameras[camera_index]
@@ -108,30 +132,31 @@ class CameraService:
                 return True
             return False
 
-    def get_preview_frame(self, camera_index: int) -> Optional[str]:
-        """Get preview frame as base64-encoded JPEG"""
+    def get_preview_slot(self, camera_index: int) -> Optional[FrameSlot]:
+        """Latest-frame slot of a running preview (for MJPEG streaming)"""
         with self.preview_lock:
-            if camera_index not in self.preview_cameras:
-                return None
-
-            cap = self.preview_cameras[camera_index]
-            ret, frame = cap.read()
+            return self.preview_slots.get(camera_index)
 
-            if not ret or frame is None:
-                logger.warning(f"Failed to read frame from camera {camera_index}")
-                return None
+    def get_preview_frame(self, camera_index: int) -> Optional[str]:
+        """Get preview frame as base64-encoded JPEG"""
+        slot = self.get_preview_slot(camera_index)
+        if slot is None:
+            return None
 
-            # Encode frame to JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Newest grabbed frame, encoded once however often it is polled
+        item = slot.jpeg(PREVIEW_TIER)
+        if item is None:
+            logger.warning(f"Failed to encode frame from camera {camera_index}")
+            return None
+        frame_base64 = base64.b64encode(item[1]).decode('utf-8')
 
-            return f"data:image/jpeg;base64,{frame_base64}"
+        return f"data:image/jpeg;base64,{frame_base64}"
 
     def cleanup(self):
         """Clean up all preview cameras"""
         with self.preview_lock:
             for camera_index in list(self.preview_cameras.keys()):
-                self.stop_preview(camera_index)
+                self._stop_preview_internal(camera_index)
         logger.info("Camera service cleanup complete")
 
 
@@ -1,19 +1,25 @@
 """Detection service for managing video detection sessions"""
 import asyncio
+import re
 import threading
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, List
 from pathlib import Path
 from loguru import logger
 
-from backend.core.video_processor import VideoProcessor
+from backend.core.video_processor import FramePacket, VideoProcessor
 from backend.core.incident_manager import IncidentManager
+from backend.core.inference_scheduler import BatchInferenceScheduler
+from backend.core.model_loader import ModelLoader
+from backend.core.model_registry import model_registry
 from backend.core.vlm_worker import VLMWorker
 from backend.core.vlm_client import VLMClient, VLMProvider
 from backend.core.email_notifier import EmailNotifier
-from backend.core.settings import load_settings
+from backend.core.settings import DetectionSettings, load_settings
+from backend.services.frame_encoder import FrameEncoder
+from backend.services.mjpeg_stream import MIN_MJPEG_FPS, FrameSlot
 from backend.services.websocket_manager import ws_manager
 from backend.core.logger import (
     log_detection_start,
@@ -34,37 +40,197 @@ class DetectionSession:
     video_source: Union[str, int]
     is_webcam: bool
     start_time: float
-    processor: VideoProcessor
-    thread: threading.Thread
-    status: str = "running"  # "running", "stopping", "stopped"
+    processor: Optional[VideoProcessor]
+    thread: Optional[threading.Thread]
+    camera_id: str = ""
+    output_path: Optional[str] = None
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    status: str = "running"  # "starting", "running", "stopping", "stopped"
     statistics: Dict[str, Any] = field(default_factory=dict)
     current_frame: int = 0
     fps: float = 0.0
     end_time: Optional[float] = None  # 停止时的时间戳
     camera_index: Optional[int] = None  # 摄像头索引，用于重启预览
+    render_mode: str = "auto"
+    record_output: bool = True
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("starting", "running")
+
+
+def default_camera_id(video_source: Union[str, int], is_webcam: bool) -> str:
+    """Camera id used when the caller does not name the camera (same as VideoProcessor)"""
+    return f"webcam_{video_source}" if is_webcam else str(video_source)
+
+
+def session_output_path(
+    output_dir: Path, video_source: Union[str, int], is_webcam: bool, session_id: str
+) -> Path:
+    """Per-session output file, e.g. ``output/webcam_0_1a2b3c4d.mp4``"""
+    stem = f"webcam_{video_source}" if is_webcam else Path(str(video_source)).stem
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", stem) or "session"
+    return output_dir / f"{stem}_{session_id[:8]}.mp4"
 
 
 class DetectionService:
-    """Manages video detection sessions"""
+    """Manages concurrent video detection sessions sharing one set of loaded models"""
 
-    def __init__(self):
-        self.current_session: Optional[DetectionSession] = None
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.sessions: Dict[str, DetectionSession] = {}
         self.session_lock = threading.Lock()
-        self._stop_event = threading.Event()
+        self.max_sessions = max_sessions
+        self._model_loader: Optional[ModelLoader] = None
+        self._scheduler: Optional[BatchInferenceScheduler] = None
+        self._model_loader_lock = threading.Lock()
+
+    @property
+    def current_session(self) -> Optional[DetectionSession]:
+        """Most recently started session (single-camera view used by the legacy endpoints)"""
+        with self.session_lock:
+            if not self.sessions:
+                return None
+            return max(self.sessions.values(), key=lambda s: s.start_time)
+
+    def get_model_loader(self) -> ModelLoader:
+        """Models are loaded once and shared by every session"""
+        with self._model_loader_lock:
+            if self._model_loader is None:
+                detection = load_settings().detection
+                self._model_loader = ModelLoader(
+                    river_backend=detection.river_backend,
+                    person_backend=detection.person_backend,
+                )
+            return self._model_loader
+
+    def preload_models(self, warmup: bool = True) -> bool:
+        """Load and warm up the shared models (blocking; run at server startup)"""
+        try:
+            model_loader = self.get_model_loader()
+        except Exception as e:
+            model_registry.preload_error = str(e)
+            logger.error(f"Failed to preload models: {e}")
+            return False
+        return model_registry.preload(
+            [model_loader.river_model_path, model_loader.person_model_path], warmup=warmup
+        )
+
+    def get_inference(self, settings):
+        """Inference backend for new sessions: the shared loader or the cross-camera batcher"""
+        model_loader = self.get_model_loader()
+        if settings.detection.inference_mode != "batched":
+            return model_loader
+        with self._model_loader_lock:
+            if self._scheduler is None:
+                self._scheduler = BatchInferenceScheduler(
+                    model_loader,
+                    max_batch_size=settings.detection.batch_max_size,
+                    max_wait=settings.detection.batch_max_wait_ms / 1000,
+                )
+            return self._scheduler
+
+    def stop_inference(self) -> None:
+        """Stop the cross-camera batcher threads (used on shutdown, after ``stop_all``)"""
+        with self._model_loader_lock:
+            scheduler, self._scheduler = self._scheduler, None
+        if scheduler is not None:
+            scheduler.stop()
+
+    def inference_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        if self._model_loader is not None:
+            stats["per_thread"] = self._model_loader.stats()
+        if self._scheduler is not None:
+            stats["batched"] = self._scheduler.stats()
+        return stats
+
+    def _build_incident_pipeline(self, settings):
+        email_notifier = EmailNotifier(settings.email) if settings.email.enabled else None
+        incident_manager = IncidentManager(
+            output_dir=settings.incident_output_dir,
+            email_notifier=email_notifier
+        )
+
+        # Setup VLM if enabled
+        vlm_worker = None
+        vlm_config = settings.vlm
+        if vlm_config.enabled:
+            try:
+                provider = VLMProvider(vlm_config.provider)
+                vlm_client = VLMClient(
+                    provider=provider,
+                    model=vlm_config.model,
+                    api_key=vlm_config.api_key,
+                    base_url=vlm_config.base_url,
+                    timeout=vlm_config.timeout,
+                    max_retries=vlm_config.max_retries,
+                )
+                vlm_worker = VLMWorker(
+                    vlm_client,
+                    vlm_config.prompt_template,
+                    worker_name=f"vlm_worker_{provider.value}",
+                )
+                vlm_worker.register_callback(incident_manager.handle_vlm_result)
+                # Register callback for WebSocket alerts
+                vlm_worker.register_callback(self._vlm_alert_callback)
+            except Exception as e:
+                logger.warning(f"Failed to initialize VLM: {e}")
+        return incident_manager, vlm_worker
 
     async def start_detection(
         self,
         video_source: Union[str, int],
-        is_webcam: bool = False
+        is_webcam: bool = False,
+        record_output: bool = True,
+        render_mode: str = "auto",
+        camera_id: Optional[str] = None,
+        detection_overrides: Optional[Dict[str, Any]] = None,
     ) -> str:
-        """Start a new detection session"""
+        """Start a new detection session for one camera or video file
+
+        ``detection_overrides`` replaces ``DetectionSettings`` fields for this
+        session only (e.g. ``inference_width``, ``river_imgsz``, ``person_imgsz``).
+        """
+        settings = load_settings()
+        # model_copy(update=...) would skip validation of the overrides
+        detection_settings = DetectionSettings.model_validate(
+            {**settings.detection.model_dump(), **(detection_overrides or {})}
+        )
+        camera_id = camera_id or default_camera_id(video_source, is_webcam)
+        max_sessions = self.max_sessions or settings.detection.max_sessions
+        session_id = uuid.uuid4().hex
+
+        # Reserve the camera slot; slow setup happens outside the lock
         with self.session_lock:
-            if self.current_session and self.current_session.status == "running":
-                raise RuntimeError("Detection session already in progress")
+            active = [s for s in self.sessions.values() if s.is_active]
+            if any(s.camera_id == camera_id for s in active):
+                raise RuntimeError(f"Detection session already in progress for camera {camera_id}")
+            if len(active) >= max_sessions:
+                raise RuntimeError(
+                    f"Maximum number of concurrent sessions reached ({max_sessions})"
+                )
+
+            # Forget stopped sessions of the same camera
+            for stale_id in [sid for sid, s in self.sessions.items() if s.camera_id == camera_id]:
+                del self.sessions[stale_id]
 
-            # Clear previous stopped session
-            self.current_session = None
+            session = DetectionSession(
+                session_id=session_id,
+                video_source=video_source,
+                is_webcam=is_webcam,
+                start_time=time.time(),
+                processor=None,  # Will be set below
+                thread=None,  # Will be set below
+                camera_id=camera_id,
+                status="starting",
+                camera_index=int(video_source) if is_webcam else None,
+                render_mode=render_mode,
+                record_output=record_output,
+            )
+            self.sessions[session_id] = session
 
+        model_loader: Optional[ModelLoader] = None
+        try:
             # If using webcam, stop any preview that might be using the camera
             if is_webcam:
                 try:
@@ -80,131 +246,150 @@ class DetectionService:
             if not is_webcam and not Path(video_source).exists():
                 raise FileNotFoundError(f"Video file not found: {video_source}")
 
-            # Setup notification pipeline
-            settings = load_settings()
-            email_notifier = EmailNotifier(settings.email) if settings.email.enabled else None
-            incident_manager = IncidentManager(
-                output_dir=settings.incident_output_dir,
-                email_notifier=email_notifier
-            )
+            # Load models off the event loop (instant once preloaded)
+            loader = await asyncio.to_thread(self.get_model_loader)
+            # one registry reference per session, released when the session ends
+            loader.retain()
+            model_loader = loader
+            inference = await asyncio.to_thread(self.get_inference, settings)
 
-            # Setup VLM if enabled
-            vlm_worker = None
-            vlm_client = None
-            vlm_config = settings.vlm
-            if vlm_config.enabled:
-                try:
-                    provider = VLMProvider(vlm_config.provider)
-                    vlm_client = VLMClient(
-                        provider=provider,
-                        model=vlm_config.model,
-                        api_key=vlm_config.api_key,
-                        base_url=vlm_config.base_url,
-                        timeout=vlm_config.timeout,
-                        max_retries=vlm_config.max_retries,
-                    )
-                    vlm_worker = VLMWorker(
-                        vlm_client,
-                        vlm_config.prompt_template,
-                        worker_name=f"vlm_worker_{provider.value}",
-                    )
-                    vlm_worker.register_callback(incident_manager.handle_vlm_result)
-                    # Register callback for WebSocket alerts
-                    vlm_worker.register_callback(self._vlm_alert_callback)
-                except Exception as e:
-                    logger.warning(f"Failed to initialize VLM: {e}")
+            # Setup notification pipeline
+            incident_manager, vlm_worker = self._build_incident_pipeline(settings)
 
             # Create output path
             output_dir = Path("output")
             output_dir.mkdir(exist_ok=True)
-            output_path = str(output_dir / ("webcam_output.mp4" if is_webcam else "output_video.mp4"))
-
-            # Create session first
-            session_id = uuid.uuid4().hex
-            self._stop_event.clear()
-
-            # Create session object
-            session = DetectionSession(
-                session_id=session_id,
-                video_source=video_source,
-                is_webcam=is_webcam,
-                start_time=time.time(),
-                processor=None,  # Will be set below
-                thread=None,  # Will be set below
-                camera_index=int(video_source) if is_webcam else None
-            )
+            output_path = str(session_output_path(output_dir, video_source, is_webcam, session_id))
+            recording = record_output and render_mode != "headless"
+            session.output_path = output_path if recording else None
 
             # Create video processor with WebSocket integration and session reference
             processor = WebSocketVideoProcessor(
                 video_source=video_source,
                 output_path=output_path,
                 is_webcam=is_webcam,
+                camera_id=camera_id,
                 incident_manager=incident_manager,
                 vlm_worker=vlm_worker,
                 ws_manager=ws_manager,
-                stop_event=self._stop_event,
-                session=session
-            )
-
-            # Start processing in background thread
-            thread = threading.Thread(
-                target=self._run_detection,
-                args=(processor, session_id),
-                daemon=True
+                stop_event=session.stop_event,
+                session=session,
+                record_output=record_output,
+                render_mode=render_mode,
+                detection_settings=detection_settings,
+                model_loader=model_loader,
+                inference=inference,
             )
-            thread.start()
-
-            # Update session with processor and thread
-            session.processor = processor
-            session.thread = thread
+            # the writer backend may disable recording or write elsewhere (jpeg directory)
+            session.output_path = processor.output_path if processor.out is not None else None
+        except Exception:
+            if model_loader is not None:
+                model_loader.release()
+            with self.session_lock:
+                self.sessions.pop(session_id, None)
+            raise
+
+        # Start processing in background thread
+        thread = threading.Thread(
+            target=self._run_detection,
+            args=(processor, model_loader, session_id),
+            name=f"detection-{camera_id}",
+            daemon=True
+        )
 
-            self.current_session = session
+        # stop_detection may have run while we were starting; only promote a live session
+        with self.session_lock:
+            cancelled = session.stop_event.is_set() or session.status != "starting"
+            if not cancelled:
+                # Update session with processor and thread
+                session.processor = processor
+                session.thread = thread
+                session.status = "running"
+                # started under the lock so stop_detection never joins an unstarted thread
+                thread.start()
+        if cancelled:
+            logger.info(f"Detection session {session_id} was stopped while starting")
+            await asyncio.to_thread(self._teardown_processor, processor)
+            model_loader.release()
+            with self.session_lock:
+                session.status = "stopped"
+                session.end_time = session.end_time or time.time()
+            return session_id
 
-            # 使用美化的日志
-            log_detection_start(session_id, str(video_source), is_webcam)
-            await ws_manager.send_status("running", f"Detection started for {video_source}")
+        # 使用美化的日志
+        log_detection_start(session_id, str(video_source), is_webcam)
+        await ws_manager.send_status("running", f"Detection started for {video_source}")
 
-            return session_id
+        return session_id
 
-    def _run_detection(self, processor: VideoProcessor, session_id: str):
+    def _run_detection(self, processor: VideoProcessor, model_loader: ModelLoader, session_id: str):
         """Run detection in background thread"""
         try:
             processor.process_video()
             logger.info(f"Detection completed: {session_id}")
         except Exception as e:
             logger.error(f"Detection error: {e}")
-            asyncio.run(ws_manager.send_error(str(e)))
+            ws_manager.publish_error(str(e))
         finally:
-            # Stop VLM worker if it exists
-            if processor.vlm_worker:
-                try:
-                    processor.vlm_worker.stop(timeout=1.0)
-                except Exception as e:
-                    logger.warning(f"Error stopping VLM worker: {e}")
+            self._stop_vlm_worker(processor)
+            model_loader.release()
 
             with self.session_lock:
-                if self.current_session:
-                    self.current_session.status = "stopped"
+                session = self.sessions.get(session_id)
+                if session and session.status != "stopped":
+                    session.status = "stopped"
+                    session.end_time = session.end_time or time.time()
+
+    @staticmethod
+    def _stop_vlm_worker(processor: VideoProcessor):
+        if processor.vlm_worker:
+            try:
+                processor.vlm_worker.stop(timeout=1.0)
+            except Exception as e:
+                logger.warning(f"Error stopping VLM worker: {e}")
+
+    def _teardown_processor(self, processor: VideoProcessor):
+        """Release a processor whose session was stopped before its thread started"""
+        try:
+            processor.cleanup()
+        except Exception as e:
+            logger.warning(f"Error cleaning up video processor: {e}")
+        self._stop_vlm_worker(processor)
 
-    async def stop_detection(self) -> Dict[str, Any]:
-        """Stop current detection session"""
+    def _resolve_session(self, session_id: Optional[str]) -> DetectionSession:
+        """Look up a session; without an id, fall back to the only active session"""
         with self.session_lock:
-            if not self.current_session:
-                raise RuntimeError("No active detection session")
-
-            session = self.current_session
+            if session_id is not None:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    raise LookupError(f"Detection session not found: {session_id}")
+                return session
+            active = [s for s in self.sessions.values() if s.is_active]
+        if not active:
+            raise RuntimeError("No active detection session")
+        if len(active) > 1:
+            raise RuntimeError("Multiple detection sessions are running; specify session_id")
+        return active[0]
+
+    async def stop_detection(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Stop a detection session (the only running one when no id is given)"""
+        session = self._resolve_session(session_id)
+        with self.session_lock:
+            if session.status == "stopped":
+                return {"status": "stopped", "statistics": session.statistics}
             session.status = "stopping"
 
         # Signal stop
-        self._stop_event.set()
+        session.stop_event.set()
 
-        # Wait for thread to finish (with timeout)
+        # Wait for thread to finish (with timeout) without blocking the event loop
         # Use shorter timeout to avoid hanging on Ctrl+C
-        session.thread.join(timeout=3.0)
+        if session.thread is not None:
+            await asyncio.to_thread(session.thread.join, 3.0)
 
-        # If thread is still alive, log warning but continue
-        if session.thread.is_alive():
-            logger.warning(f"Detection thread did not stop within timeout, forcing cleanup")
+            # If thread is still alive, log warning but continue
+            if session.thread.is_alive():
+                logger.warning(f"Detection thread did not stop within timeout, forcing cleanup")
 
         # Record end time
         session.end_time = time.time()
@@ -227,54 +412,114 @@ class DetectionService:
 
         # 使用美化的日志
         log_detection_stop(session.session_id, session.current_frame, elapsed_time)
-        await ws_manager.send_status("stopped", "Detection stopped")
+        await ws_manager.send_status("stopped", f"Detection stopped for {session.video_source}")
 
-        # Keep session for a short time so frontend can retrieve final stats
+        # Keep session so frontend can retrieve final stats
         # Frontend will see status="stopped" with final fps and elapsed_time
-        # Session will be cleared on next start
+        # Session will be cleared when the same camera starts again
 
         return {
             "status": "stopped",
             "statistics": statistics
         }
 
-    def get_status(self) -> Dict[str, Any]:
-        """Get current detection status"""
+    async def stop_all(self) -> List[Dict[str, Any]]:
+        """Stop every running session (used on shutdown)"""
         with self.session_lock:
-            if not self.current_session:
-                return {
-                    "status": "idle",
-                    "session_id": None,
-                    "current_frame": 0,
-                    "fps": 0.0,
-                    "elapsed_time": 0.0,
-                    "video_source": None
-                }
-
-            session = self.current_session
-
-            # 如果已停止，使用记录的end_time；否则实时计算
-            if session.end_time is not None:
-                elapsed_time = session.end_time - session.start_time
-            else:
-                elapsed_time = time.time() - session.start_time
+            active_ids = [sid for sid, s in self.sessions.items() if s.is_active]
+        results = await asyncio.gather(
+            *(self.stop_detection(sid) for sid in active_ids), return_exceptions=True
+        )
+        for sid, result in zip(active_ids, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error stopping detection session {sid}: {result}")
+        return [r for r in results if not isinstance(r, Exception)]
+
+    def _session_status(self, session: DetectionSession) -> Dict[str, Any]:
+        # 如果已停止，使用记录的end_time；否则实时计算
+        if session.end_time is not None:
+            elapsed_time = session.end_time - session.start_time
+        else:
+            elapsed_time = time.time() - session.start_time
+        metrics = session.processor.get_metrics() if session.processor else {}
+        stride = metrics.get("stride")
 
+        return {
+            "status": session.status,
+            "session_id": session.session_id,
+            "camera_id": session.camera_id,
+            "current_frame": session.current_frame,
+            "fps": session.fps,
+            "elapsed_time": elapsed_time,
+            "video_source": str(session.video_source),
+            "output_path": session.output_path,
+            "render_mode": session.render_mode,
+            "record_output": session.record_output,
+            "stride": stride["stride"] if stride else None,
+            "lag_ms": stride["lag_ms"] if stride else None,
+            "metrics": metrics
+        }
+
+    def get_stream_slot(self, session_id: str) -> FrameSlot:
+        """Latest annotated frame of a running session, for MJPEG streaming"""
+        with self.session_lock:
+            session = self.sessions.get(session_id)
+        slot = getattr(session.processor, "stream_slot", None) if session is not None else None
+        if slot is None or not session.is_active:
+            raise LookupError(f"No running detection session: {session_id}")
+        return slot
+
+    def get_status(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Status of one session (the most recent one when no id is given)"""
+        if session_id is not None:
+            with self.session_lock:
+                session = self.sessions.get(session_id)
+            if session is None:
+                raise LookupError(f"Detection session not found: {session_id}")
+            return self._session_status(session)
+
+        session = self.current_session
+        if not session:
             return {
-                "status": session.status,
-                "session_id": session.session_id,
-                "current_frame": session.current_frame,
-                "fps": session.fps,
-                "elapsed_time": elapsed_time,
-                "video_source": str(session.video_source)
+                "status": "idle",
+                "session_id": None,
+                "camera_id": None,
+                "current_frame": 0,
+                "fps": 0.0,
+                "elapsed_time": 0.0,
+                "video_source": None,
+                "output_path": None,
+                "render_mode": None,
+                "record_output": None,
+                "stride": None,
+                "lag_ms": None,
+                "metrics": {}
             }
+        return self._session_status(session)
+
+    def list_sessions(self) -> Dict[str, Any]:
+        """Aggregate status across all sessions"""
+        with self.session_lock:
+            sessions = sorted(self.sessions.values(), key=lambda s: s.start_time)
+        statuses = [self._session_status(s) for s in sessions]
+        running = [s for s in statuses if s["status"] in ("starting", "running")]
+        return {
+            "total": len(statuses),
+            "running": len(running),
+            "total_fps": sum(s["fps"] for s in running),
+            "total_frames": sum(s["current_frame"] for s in statuses),
+            "sessions": statuses,
+            "inference": self.inference_stats(),
+            "websocket": ws_manager.stats(),
+        }
 
-    async def _vlm_alert_callback(self, result):
-        """Callback for VLM results to send WebSocket alerts"""
+    def _vlm_alert_callback(self, result):
+        """Callback for VLM results to send WebSocket alerts (runs on the VLM worker thread)"""
         if result.error:
             return
 
         task = result.task
-        await ws_manager.send_alert({
+        ws_manager.publish_alert({
             "message": "Drowning danger detected!",
             "incident_id": task.incident_id or "",
             "overlap_ratio": task.overlap_ratio,
@@ -286,186 +531,126 @@ class DetectionService:
 class WebSocketVideoProcessor(VideoProcessor):
     """Extended VideoProcessor that sends updates via WebSocket"""
 
-    def __init__(self, *args, ws_manager=None, stop_event=None, session=None, **kwargs):
+    def __init__(self, *args, ws_manager=None, session=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.ws_manager = ws_manager
-        self.stop_event = stop_event
         self.session = session
+        # JPEG-encodes each pushed frame once per tier that has viewers, on its own thread
+        self.frame_encoder: Optional[FrameEncoder] = None
+        if ws_manager is not None:
+            self.frame_encoder = FrameEncoder(
+                ws_manager.subscribed_tiers, ws_manager.publish_frame_update, name=self.camera_id
+            )
         self.last_frame_send_time = 0
         self.frame_send_interval = 0.2  # Send frames every 0.2 seconds (5 FPS)
+        # Newest annotated frame for MJPEG viewers (/api/detection/sessions/{id}/stream)
+        self.stream_slot = FrameSlot()
+        self.last_stream_time = 0
+        self.stream_interval = 1.0 / max(self.detection_settings.mjpeg_fps, MIN_MJPEG_FPS)
         self.last_fps_update_time = 0
         self.fps_update_interval = 1.0  # Update FPS every 1 second
 
-    async def send_frame_update(self, annotated_frame, frame_id: int, detections: dict):
-        """Send frame update via WebSocket"""
-        if not self.ws_manager:
-            return
-
-        import cv2
-        import base64
-
-        try:
-            # Resize frame for transmission (reduce bandwidth)
-            height, width = annotated_frame.shape[:2]
-            max_width = 640
-            if width > max_width:
-                scale = max_width / width
-                new_width = max_width
-                new_height = int(height * scale)
-                frame_resized = cv2.resize(annotated_frame, (new_width, new_height))
-            else:
-                frame_resized = annotated_frame
-
-            # Encode frame to JPEG
-            _, buffer = cv2.imencode('.jpg', frame_resized, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-
-            # Send via WebSocket
-            await self.ws_manager.send_frame_update({
-                "frame_id": frame_id,
-                "timestamp": time.time(),
-                "image": f"data:image/jpeg;base64,{frame_base64}",
-                "detections": detections
-            })
-        except Exception as e:
-            logger.warning(f"Failed to send frame update: {e}")
-
-    def process_video(self):
-        """Override to send WebSocket updates with video frames"""
-        import cv2
-        from backend.core.detection_utils import (
-            calculate_overlap_ratio,
-            draw_info,
-            draw_person_boxes,
-            draw_river_mask,
-            draw_warning,
+    def _frame_push_due(self, current_time: float) -> bool:
+        """Whether a preview frame should go out to WebSocket viewers now"""
+        if current_time - self.last_frame_send_time < self.frame_send_interval:
+            return False
+        if self.render_mode == "headless":
+            return False
+        if self.render_mode == "auto":
+            return bool(self.ws_manager and self.ws_manager.clients)
+        return True
+
+    def _stream_due(self, current_time: float) -> bool:
+        """Whether the MJPEG slot should get a new annotated frame now"""
+        if self.render_mode == "headless" or not self.stream_slot.viewers:
+            return False
+        return current_time - self.last_stream_time >= self.stream_interval
+
+    def should_render(self, current_time: float) -> bool:
+        return (
+            super().should_render(current_time)
+            or self._frame_push_due(current_time)
+            or self._stream_due(current_time)
         )
-        from backend.core.vlm_worker import VLMTask
-        from tqdm import tqdm
 
+    def send_frame_update(self, annotated_frame, frame_id: int, detections: dict):
+        """Queue the frame for the preview encoder (encoding and sending happen off this thread)"""
+        if self.frame_encoder is None:
+            return
+        self.frame_encoder.submit(annotated_frame, {
+            "session_id": self.session.session_id if self.session else None,
+            "camera_id": self.camera_id,
+            "frame_id": frame_id,
+            "timestamp": time.time(),
+            "detections": detections
+        })
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = super().get_metrics()
+        if self.frame_encoder is not None:
+            metrics["preview"] = self.frame_encoder.stats()
+        return metrics
+
+    def cleanup(self):
+        super().cleanup()
+        if getattr(self, "frame_encoder", None) is not None:
+            self.frame_encoder.close()
+        if getattr(self, "stream_slot", None) is not None:
+            # ends the MJPEG responses of this session
+            self.stream_slot.close()
+
+    def _log_start(self):
         # 使用专业的日志
         log_section_header("Video Processing Started")
         logger.info(f"Camera ID     : {self.camera_id}")
-        logger.info(f"Output Path   : {self.output_path}")
+        logger.info(f"Output Path   : {self.output_path if self.out is not None else 'disabled'}")
+        logger.info(f"Render Mode   : {self.render_mode}")
         log_video_info(self.fps, self.width, self.height, self.total_frames)
 
-        frame_count = 0
-        pbar = tqdm(total=self.total_frames, desc="Processing video", unit="frames") if self.total_frames else None
-
-        while True:
-            # Check for stop signal
-            if self.stop_event and self.stop_event.is_set():
-                logger.info(f"Stop signal detected, terminating video processing. Processed {frame_count} frames")
-                break
-
-            ret, frame = self.cap.read()
-            if not ret:
-                if self.is_webcam:
-                    logger.debug("Webcam read failed, retrying...")
-                    continue
-                else:
-                    logger.info(f"Video processing completed. Total frames processed: {frame_count}")
-                    break
-
-            current_time = time.time()
-
-            # Run detection
-            results_river = self.model_loader.get_river_model().track(
-                source=frame, show=False, tracker="bytetrack.yaml", verbose=False
-            )
-            results_person = self.model_loader.get_person_model().track(
-                source=frame, show=False, tracker="bytetrack.yaml", verbose=False
-            )
-
-            annotated_frame = frame.copy()
-
-            river_mask = draw_river_mask(annotated_frame, results_river[0].masks if results_river[0].masks is not None else None)
-            person_detected, person_masks, person_bboxes = draw_person_boxes(
-                annotated_frame,
-                results_person[0].boxes if results_person[0].boxes is not None else None,
-                river_mask
-            )
+    def _log_alert(self, frame_id: int, overlap_ratio: float, bbox, incident_id: Optional[str]):
+        # 使用美化的警报日志
+        log_drowning_alert(frame_id, overlap_ratio, incident_id)
+
+    def _mark_outputs(self, packet: FramePacket):
+        super()._mark_outputs(packet)
+        # Send frames via WebSocket at reduced rate
+        if self._frame_push_due(packet.timestamp):
+            packet.push = True
+            self.last_frame_send_time = packet.timestamp
+        if self._stream_due(packet.timestamp):
+            packet.stream = True
+            self.last_stream_time = packet.timestamp
+
+    def _publish_frame(self, packet: FramePacket):
+        if packet.stream:
+            # render buffers are reused; the slot keeps its own copy
+            self.stream_slot.update(packet.annotated.copy())
+        if not packet.push:
+            return
+        max_overlap_ratio, _ = packet.analysis.max_overlap()
+        self.send_frame_update(
+            packet.annotated,
+            packet.index,
+            {
+                "person_detected": packet.analysis.person_detected,
+                "overlap_ratio": max_overlap_ratio,
+                "warning_active": packet.warning_active
+            }
+        )
 
-            max_overlap_ratio = 0
-            best_bbox = None
-            if person_detected and person_masks:
-                for person_mask, bbox in zip(person_masks, person_bboxes):
-                    overlap_ratio = calculate_overlap_ratio(person_mask, river_mask)
-                    if overlap_ratio > max_overlap_ratio:
-                        max_overlap_ratio = overlap_ratio
-                        best_bbox = bbox
-
-            # Handle warnings and incidents
-            if max_overlap_ratio > 0.90:
-                self.last_detection_time = current_time
-                incident_id = self._ensure_incident(
-                    annotated_frame, best_bbox, max_overlap_ratio, current_time, frame_count
-                )
-                # 使用美化的警报日志
-                log_drowning_alert(frame_count, max_overlap_ratio, incident_id)
-                self._maybe_dispatch_vlm_task(
-                    frame, best_bbox, max_overlap_ratio, current_time, frame_count, incident_id
-                )
-                if not self.warning_active:
-                    self.warning_active = True
-                    self.warning_start_time = current_time
-                    self.info_message = f"Warning: Drowning danger detected! Overlap ratio: {max_overlap_ratio:.2f}"
-                    self.print_warning(self.info_message)
-
-            if self.warning_active:
-                draw_warning(annotated_frame)
-
-                if current_time - self.last_print_time >= self.print_interval:
-                    self.print_warning(self.info_message)
-                    self.last_print_time = current_time
-
-                if current_time - self.last_detection_time > self.detection_window:
-                    self.warning_active = False
-                    self.info_message = "Warning cleared: Detection window time exceeded"
-                    self.print_warning_cleared(self.info_message)
-                    self._reset_incident_tracking()
-
-            if self.warning_active and current_time - self.warning_start_time > self.warning_duration:
-                self.warning_active = False
-                self.info_message = "Warning cleared: Warning duration exceeded"
-                self.print_warning_cleared(self.info_message)
-                self._reset_incident_tracking()
-
-            draw_info(annotated_frame, self.info_message)
-
-            # Send frame via WebSocket at reduced rate
-            if current_time - self.last_frame_send_time >= self.frame_send_interval:
-                asyncio.run(self.send_frame_update(
-                    annotated_frame,
-                    frame_count,
-                    {
-                        "person_detected": person_detected,
-                        "overlap_ratio": max_overlap_ratio,
-                        "warning_active": self.warning_active
-                    }
-                ))
-                self.last_frame_send_time = current_time
-
-            self.out.write(annotated_frame)
-
-            frame_count += 1
-            if pbar:
-                pbar.update(1)
-
-            # Update session statistics
-            if self.session:
-                self.session.current_frame = frame_count
-
-                # Update FPS every second
-                if current_time - self.last_fps_update_time >= self.fps_update_interval:
-                    elapsed = current_time - self.session.start_time
-                    if elapsed > 0:
-                        self.session.fps = frame_count / elapsed
-                    self.last_fps_update_time = current_time
-
-        if pbar:
-            pbar.close()
-        self.cleanup()
+    def _frame_done(self, packet: FramePacket):
+        # Update session statistics
+        if not self.session:
+            return
+        self.session.current_frame = self._frames_done
+
+        # Update FPS every second
+        current_time = time.time()
+        if current_time - self.last_fps_update_time >= self.fps_update_interval:
+            elapsed = current_time - self.session.start_time
+            if elapsed > 0:
+                self.session.fps = self._frames_done / elapsed
+            self.last_fps_update_time = current_time
 
 
 # Global detection service instance
@@ -0,0 +1,132 @@
+"""Per-tier JPEG encoding of preview frames for WebSocket viewers"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from backend.core.pipeline import END, BoundedQueue
+
+
+@dataclass(frozen=True)
+class StreamTier:
+    name: str
+    max_width: Optional[int]  # None = 原始分辨率
+    quality: int
+
+
+# 观看端订阅的画质档位 (standard 与原先固定的 640 px / 质量 70 相同)
+STREAM_TIERS: Dict[str, StreamTier] = {
+    tier.name: tier
+    for tier in (
+        StreamTier("thumbnail", 320, 60),
+        StreamTier("standard", 640, 70),
+        StreamTier("full", None, 85),
+    )
+}
+DEFAULT_TIER = "standard"
+
+
+def encode_tier(frame: np.ndarray, tier: StreamTier) -> Optional[bytes]:
+    """JPEG bytes of ``frame`` scaled down to the tier's width (never up)."""
+    height, width = frame.shape[:2]
+    if tier.max_width and width > tier.max_width:
+        size = (tier.max_width, int(height * tier.max_width / width))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+    return buffer.tobytes() if ok else None
+
+
+class FrameEncoder:
+    """Encodes preview frames on its own thread, once per subscribed tier.
+
+    ``submit`` copies the annotated frame (render buffers are reused) into a
+    one-slot latest-wins queue, so a slow encode never holds up detection;
+    frames that are superseded before they are encoded are skipped.
+    ``subscribed_tiers`` is asked per frame which tiers have viewers (before
+    the copy, and again before encoding), and ``publish(frame_data, {tier: jpeg})``
+    receives the result.
+    """
+
+    def __init__(
+        self,
+        subscribed_tiers: Callable[[], Iterable[str]],
+        publish: Callable[[Dict[str, Any], Dict[str, bytes]], Any],
+        name: str = "preview",
+    ) -> None:
+        self.subscribed_tiers = subscribed_tiers
+        self.publish = publish
+        self._queue = BoundedQueue(1, "drop_oldest")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.encoded = 0
+        self.no_viewers = 0
+        self._tier_stats: Dict[str, list] = {}
+        self._thread = threading.Thread(target=self._run, name=f"encoder-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, frame_data: Dict[str, Any]) -> None:
+        self.submitted += 1
+        # nobody watching: skip the full-frame copy
+        if not any(self.subscribed_tiers()):
+            self.no_viewers += 1
+            return
+        self._queue.put((frame.copy(), frame_data))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is END:
+                break
+            frame, frame_data = item
+            tiers = list(self.subscribed_tiers())
+            if not tiers:
+                continue
+            try:
+                jpegs = self._encode(frame, tiers)
+                self.publish(frame_data, jpegs)
+            except Exception as e:
+                logger.warning(f"Failed to encode preview frame: {e}")
+                continue
+            self.encoded += 1
+
+    def _encode(self, frame: np.ndarray, tiers) -> Dict[str, bytes]:
+        jpegs = {}
+        for name in tiers:
+            started_at = time.perf_counter()
+            jpeg = encode_tier(frame, STREAM_TIERS[name])
+            elapsed = time.perf_counter() - started_at
+            if jpeg is None:
+                continue
+            jpegs[name] = jpeg
+            with self._lock:
+                step = self._tier_stats.setdefault(name, [0, 0.0, 0])
+                step[0] += 1
+                step[1] += elapsed
+                step[2] += len(jpeg)
+        return jpegs
+
+    def close(self) -> None:
+        self._queue.close()
+        self._thread.join(5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {
+                name: {
+                    "frames": count,
+                    "avg_encode_ms": total / count * 1000,
+                    "avg_bytes": size / count,
+                }
+                for name, (count, total, size) in self._tier_stats.items()
+            }
+        return {
+            "submitted": self.submitted,
+            "encoded": self.encoded,
+            "skipped": self._queue.dropped,
+            "no_viewers": self.no_viewers,
+            "tiers": tiers,
+        }
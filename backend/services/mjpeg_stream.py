@@ -0,0 +1,106 @@
+"""MJPEG (multipart/x-mixed-replace) streaming of the latest frame of a camera or session"""
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+
+from backend.services.frame_encoder import StreamTier, encode_tier
+
+MJPEG_BOUNDARY = "frame"
+MJPEG_MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+MIN_MJPEG_FPS = 0.1  # 推流帧率下限 (非正数的 fps 按此处理, 避免除零)
+
+
+class FrameSlot:
+    """Newest frame of one source, shared by every viewer.
+
+    The producer calls ``update`` with a frame it will not modify afterwards
+    (copy reused buffers first); each frame is JPEG-encoded at most once per
+    tier, on the first ``jpeg`` call that asks for it. Encoding happens outside
+    the lock, so ``update`` never waits for an encode. ``viewers`` lets the
+    producer skip work while nobody watches; ``close`` ends the streams.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._cache: Dict[str, bytes] = {}
+        self.seq = 0
+        self.viewers = 0
+        self.closed = False
+        self.encoded = 0
+
+    def update(self, frame: np.ndarray) -> None:
+        with self._lock:
+            self._frame = frame
+            self._cache = {}
+            self.seq += 1
+
+    def jpeg(self, tier: StreamTier) -> Optional[Tuple[int, bytes]]:
+        """``(seq, jpeg)`` of the newest frame, or ``None`` before the first frame."""
+        with self._lock:
+            frame, seq, cache = self._frame, self.seq, self._cache
+            if frame is None:
+                return None
+            jpeg = cache.get(tier.name)
+        if jpeg is not None:
+            return seq, jpeg
+        jpeg = encode_tier(frame, tier)
+        if jpeg is None:
+            return None
+        with self._lock:
+            self.encoded += 1
+            # a newer frame may have arrived meanwhile: still serve this one, but don't cache it
+            if self.seq == seq:
+                cache.setdefault(tier.name, jpeg)
+        return seq, jpeg
+
+    def add_viewer(self) -> None:
+        with self._lock:
+            self.viewers += 1
+
+    def remove_viewer(self) -> None:
+        with self._lock:
+            self.viewers -= 1
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    headers = f"Content-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n"
+    return b"".join((f"--{MJPEG_BOUNDARY}\r\n{headers}".encode("ascii"), jpeg, b"\r\n"))
+
+
+async def mjpeg_stream(slot: FrameSlot, tier: StreamTier, fps: float) -> AsyncIterator[bytes]:
+    """Multipart body: the newest frame of ``slot`` at most ``fps`` times per second.
+
+    Ticks without a new frame send nothing; encoding runs in a worker thread.
+    The stream ends when the slot is closed or the client disconnects.
+    """
+    interval = 1.0 / max(fps, MIN_MJPEG_FPS)
+    loop = asyncio.get_running_loop()
+    last_seq = 0
+    slot.add_viewer()
+    try:
+        while not slot.closed:
+            started_at = loop.time()
+            if slot.seq != last_seq:
+                item = await asyncio.to_thread(slot.jpeg, tier)
+                if item is not None:
+                    last_seq, jpeg = item
+                    yield mjpeg_part(jpeg)
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started_at)))
+    finally:
+        slot.remove_viewer()
+
+
+def mjpeg_response(slot: FrameSlot, tier: StreamTier, fps: float) -> StreamingResponse:
+    """``StreamingResponse`` for ``<img src=...>`` tags and NVR tools."""
+    return StreamingResponse(
+        mjpeg_stream(slot, tier, fps),
+        media_type=MJPEG_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache, no-store, must-revalidate", "Pragma": "no-cache"},
+    )
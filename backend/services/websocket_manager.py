@@ -1,61 +1,412 @@
 """WebSocket connection manager for real-time communication"""
 import asyncio
-from typing import List, Dict, Any
+import base64
+import json
+import struct
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Union
 from fastapi import WebSocket
 from loguru import logger
 
+from backend.services.frame_encoder import DEFAULT_TIER, STREAM_TIERS
+
+# Binary frame packet (clients that announce ``binary_frames`` in their hello):
+#   magic(4s) version(B) flags(B) meta_len(H) frame_id(Q) timestamp(d) overlap_ratio(f)
+#   + meta_len bytes of UTF-8 JSON (session_id, camera_id, ...) + raw JPEG bytes
+# All little-endian; the header is FRAME_HEADER.size (28) bytes.
+FRAME_MAGIC = b"DDWF"
+FRAME_PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sBBHQdf")
+FLAG_PERSON_DETECTED = 0x01
+FLAG_WARNING_ACTIVE = 0x02
+
+
+def encode_frame_packet(frame_data: Dict[str, Any], jpeg: bytes) -> bytes:
+    """Binary packet for ``frame_data`` (frame_id, timestamp, detections, ...) and its JPEG"""
+    detections = frame_data.get("detections") or {}
+    flags = 0
+    if detections.get("person_detected"):
+        flags |= FLAG_PERSON_DETECTED
+    if detections.get("warning_active"):
+        flags |= FLAG_WARNING_ACTIVE
+    meta = {k: v for k, v in frame_data.items() if k not in ("frame_id", "timestamp", "detections")}
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        FRAME_PROTOCOL_VERSION,
+        flags,
+        len(meta_bytes),
+        int(frame_data.get("frame_id", 0)),
+        float(frame_data.get("timestamp", 0.0)),
+        float(detections.get("overlap_ratio", 0.0)),
+    )
+    return b"".join((header, meta_bytes, jpeg))
+
+
+def decode_frame_packet(packet: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """Inverse of ``encode_frame_packet``: (frame_data, jpeg bytes)"""
+    magic, version, flags, meta_len, frame_id, timestamp, overlap_ratio = FRAME_HEADER.unpack_from(packet)
+    if magic != FRAME_MAGIC or version != FRAME_PROTOCOL_VERSION:
+        raise ValueError(f"Not a frame packet (magic={magic!r}, version={version})")
+    meta_end = FRAME_HEADER.size + meta_len
+    frame_data = json.loads(packet[FRAME_HEADER.size:meta_end].decode("utf-8"))
+    frame_data.update(
+        frame_id=frame_id,
+        timestamp=timestamp,
+        detections={
+            "person_detected": bool(flags & FLAG_PERSON_DETECTED),
+            "overlap_ratio": overlap_ratio,
+            "warning_active": bool(flags & FLAG_WARNING_ACTIVE),
+        },
+    )
+    return frame_data, bytes(packet[meta_end:])
+
+
+class FrameMessage:
+    """One preview frame, JPEG-encoded once per tier.
+
+    Each wire format of each tier is built at most once, however many
+    clients receive it.
+    """
+
+    def __init__(self, frame_data: Dict[str, Any], jpegs: Dict[str, bytes]):
+        self.frame_data = frame_data
+        self.jpegs = jpegs
+        self._binary: Dict[str, bytes] = {}
+        self._text: Dict[str, str] = {}
+
+    def binary(self, tier: str) -> bytes:
+        packet = self._binary.get(tier)
+        if packet is None:
+            packet = self._binary[tier] = encode_frame_packet(self.frame_data, self.jpegs[tier])
+        return packet
+
+    def text(self, tier: str) -> str:
+        """Legacy JSON message with the JPEG as a base64 data URL"""
+        text = self._text.get(tier)
+        if text is None:
+            image = base64.b64encode(self.jpegs[tier]).decode("ascii")
+            text = self._text[tier] = json.dumps({
+                "type": "frame",
+                **self.frame_data,
+                "image": f"data:image/jpeg;base64,{image}",
+            })
+        return text
+
+
+Message = Union[Dict[str, Any], FrameMessage]
+
+
+class ClientChannel:
+    """Outbound queue of one client, drained by its own task.
+
+    Alerts, status and replies wait in order in ``messages``; frames (of the
+    client's ``tier``) are coalesced into one latest-wins slot and only sent
+    once ``messages`` is empty. A send that exceeds ``send_timeout`` (or fails) closes the
+    channel, as does a backlog of more than ``max_pending`` messages.
+    """
+
+    def __init__(
+        self,
+        manager: "WebSocketManager",
+        websocket: WebSocket,
+        send_timeout: float = 5.0,
+        max_pending: int = 256,
+    ):
+        self.manager = manager
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.max_pending = max_pending
+        self.binary = False
+        self.tier = DEFAULT_TIER
+        self.messages: deque = deque()
+        self.frame: Optional[FrameMessage] = None
+        self._wakeup = asyncio.Event()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.messages_sent = 0
+        self._send_time = 0.0
+        self.last_send = 0.0
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def name(self) -> str:
+        client = getattr(self.websocket, "client", None)
+        return f"{client.host}:{client.port}" if client else f"{id(self.websocket):x}"
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.messages) + (self.frame is not None)
+
+    def offer(self, message: Message) -> None:
+        """Queue ``message`` (runs on the loop, never waits)"""
+        if isinstance(message, FrameMessage):
+            if self.tier not in message.jpegs:
+                # subscribed after this frame was encoded
+                return
+            if self.frame is not None:
+                self.frames_dropped += 1
+            self.frame = message
+        else:
+            if len(self.messages) >= self.max_pending:
+                self.manager.evict(self, f"{len(self.messages)} messages pending")
+                return
+            self.messages.append(message)
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.messages or self.frame is not None:
+                if self.messages:
+                    message = self.messages.popleft()
+                else:
+                    message, self.frame = self.frame, None
+                started_at = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._send(message), self.send_timeout)
+                except asyncio.TimeoutError:
+                    self.manager.evict(self, f"send timed out after {self.send_timeout:.1f}s")
+                    return
+                except Exception as e:
+                    self.manager.evict(self, f"send failed: {e}")
+                    return
+                self.last_send = time.perf_counter() - started_at
+                self._send_time += self.last_send
+                if isinstance(message, FrameMessage):
+                    self.frames_sent += 1
+                else:
+                    self.messages_sent += 1
+
+    async def _send(self, message: Message) -> None:
+        if isinstance(message, FrameMessage):
+            if self.binary:
+                await self.websocket.send_bytes(message.binary(self.tier))
+            else:
+                await self.websocket.send_text(message.text(self.tier))
+        else:
+            await self.websocket.send_json(message)
+
+    def stats(self) -> Dict[str, Any]:
+        sent = (self.frames_sent + self.messages_sent) or 1
+        return {
+            "client": self.name,
+            "binary_frames": self.binary,
+            "tier": self.tier,
+            "queue_depth": self.queue_depth,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "messages_sent": self.messages_sent,
+            "avg_send_ms": self._send_time / sent * 1000,
+            "last_send_ms": self.last_send * 1000,
+        }
+
 
 class WebSocketManager:
-    """Manages WebSocket connections and broadcasts messages to all connected clients"""
+    """Manages WebSocket connections and broadcasts messages to all connected clients
+
+    Every client gets a ``ClientChannel``: its own outbound queue and sender
+    task, so a slow client only delays itself. ``broadcast`` (and the
+    ``send_*`` coroutines) only hand the message to each channel and never
+    wait on a socket. Detection and VLM threads use ``publish`` (and the
+    ``publish_*`` helpers) instead: it schedules the broadcast on the server
+    loop with ``call_soon_threadsafe`` and returns immediately.
 
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    Frames go to clients that sent ``{"type": "hello", "binary_frames": true}``
+    as binary packets (``encode_frame_packet``); other clients keep receiving
+    the JSON message with a base64 data URL. Each client watches one quality
+    tier (``STREAM_TIERS``, chosen with ``"tier"`` in the hello or a
+    ``subscribe`` message); ``subscribed_tiers`` tells the frame encoders
+    which tiers to encode.
+    """
+
+    def __init__(self, send_timeout: float = 5.0, max_pending_messages: int = 256):
+        self.clients: Dict[WebSocket, ClientChannel] = {}
+        self.send_timeout = send_timeout
+        self.max_pending_messages = max_pending_messages
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 各画质档位的订阅数 (编码线程读取)
+        self._tier_counts: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._publish_time = 0.0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Attach to the server loop (call from inside that loop)"""
+        self._loop = loop or asyncio.get_running_loop()
+
+    async def close(self) -> None:
+        """Stop every client channel; later ``publish`` calls are dropped"""
+        self._loop = None
+        for channel in list(self.clients.values()):
+            self._remove(channel)
+            channel.task.cancel()
+            await asyncio.gather(channel.task, return_exceptions=True)
 
     async def connect(self, websocket: WebSocket):
         """Accept a new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        if self._loop is None:
+            self.bind_loop()
+        channel = ClientChannel(self, websocket, send_timeout=self.send_timeout, max_pending=self.max_pending_messages)
+        self.clients[websocket] = channel
+        self._count_tier(channel.tier, 1)
+        logger.info(f"WebSocket connected. Total connections: {len(self.clients)}")
 
     async def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        channel = self.clients.get(websocket)
+        if channel is not None:
+            self._remove(channel)
+            if channel.task is not asyncio.current_task():
+                channel.task.cancel()
+
+    def _remove(self, channel: ClientChannel) -> None:
+        if self.clients.get(channel.websocket) is channel:
+            del self.clients[channel.websocket]
+            self._count_tier(channel.tier, -1)
+            logger.info(f"WebSocket disconnected. Total connections: {len(self.clients)}")
+
+    def _count_tier(self, tier: str, delta: int) -> None:
+        with self._stats_lock:
+            self._tier_counts[tier] = self._tier_counts.get(tier, 0) + delta
+
+    def _subscribe(self, channel: ClientChannel, tier: str) -> None:
+        if tier in STREAM_TIERS and tier != channel.tier:
+            self._count_tier(channel.tier, -1)
+            channel.tier = tier
+            self._count_tier(tier, 1)
+
+    def subscribed_tiers(self) -> List[str]:
+        """Tiers with at least one viewer (thread-safe)"""
+        with self._stats_lock:
+            return [tier for tier, count in self._tier_counts.items() if count > 0]
 
-    async def broadcast(self, message: dict):
-        """Send message to all connected clients"""
-        if not self.active_connections:
+    def evict(self, channel: ClientChannel, reason: str) -> None:
+        """Drop a client that cannot keep up (runs on the loop)"""
+        if self.clients.get(channel.websocket) is not channel:
             return
+        logger.warning(f"Evicting WebSocket client {channel.name}: {reason}")
+        with self._stats_lock:
+            self.evicted += 1
+        self._remove(channel)
+        if channel.task is not asyncio.current_task():
+            channel.task.cancel()
+        asyncio.get_running_loop().create_task(self._close_socket(channel.websocket))
 
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.warning(f"Failed to send message to client: {e}")
-                disconnected.append(connection)
+    async def _close_socket(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1011), self.send_timeout)
+        except Exception:
+            pass
 
-        # Remove disconnected clients
-        for connection in disconnected:
-            await self.disconnect(connection)
+    def handle_client_message(self, websocket: WebSocket, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Handle a JSON control message from a client; returns the reply, if any"""
+        channel = self.clients.get(websocket)
+        message_type = message.get("type")
+        if message_type in ("hello", "subscribe"):
+            # capability handshake: binary frame packets and/or quality tier
+            if channel is not None:
+                if message_type == "hello":
+                    channel.binary = bool(message.get("binary_frames"))
+                if "tier" in message:
+                    self._subscribe(channel, message["tier"])
+            return {
+                "type": message_type,
+                "protocol": FRAME_PROTOCOL_VERSION,
+                "binary_frames": channel is not None and channel.binary,
+                "tier": channel.tier if channel is not None else DEFAULT_TIER,
+                "tiers": list(STREAM_TIERS),
+            }
+        if message_type == "ping":
+            return {"type": "pong"}
+        return None
 
-    async def send_frame_update(self, frame_data: Dict[str, Any]):
-        """Broadcast frame update to all clients"""
-        message = {
-            "type": "frame",
-            **frame_data
-        }
-        await self.broadcast(message)
+    async def send_to(self, websocket: WebSocket, message: Dict[str, Any]):
+        """Queue a message for one client (behind what is already queued for it)"""
+        channel = self.clients.get(websocket)
+        if channel is not None:
+            channel.offer(message)
 
-    async def send_alert(self, alert_data: Dict[str, Any]):
-        """Broadcast alert to all clients"""
-        message = {
+    def _fan_out(self, message: Message) -> None:
+        # runs on the loop; O(1) per client, no socket I/O
+        for channel in list(self.clients.values()):
+            channel.offer(message)
+
+    async def broadcast(self, message: Message):
+        """Queue message for all connected clients"""
+        self._fan_out(message)
+
+    def publish(self, message: Message) -> bool:
+        """Queue ``message`` for broadcast from any thread; never blocks.
+
+        Returns False when no server loop is bound (or it has closed).
+        """
+        started_at = time.perf_counter()
+        with self._stats_lock:
+            self.published += 1
+        loop = self._loop
+        queued = False
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._fan_out, message)
+                queued = True
+            except RuntimeError:
+                # loop closed (server shutting down)
+                pass
+        with self._stats_lock:
+            if not queued:
+                self.dropped += 1
+            self._publish_time += time.perf_counter() - started_at
+        return queued
+
+    def stats(self) -> Dict[str, Any]:
+        clients = [channel.stats() for channel in list(self.clients.values())]
+        with self._stats_lock:
+            published = self.published or 1
+            return {
+                "connections": len(clients),
+                "binary_clients": sum(c["binary_frames"] for c in clients),
+                "tiers": {tier: count for tier, count in self._tier_counts.items() if count > 0},
+                "published": self.published,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+                "avg_publish_us": self._publish_time / published * 1e6,
+                "clients": clients,
+            }
+
+    @staticmethod
+    def _alert_message(alert_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "type": "alert",
             "severity": "warning",
             **alert_data
         }
-        await self.broadcast(message)
+
+    @staticmethod
+    def _error_message(error: str, details: str = None) -> Dict[str, Any]:
+        return {
+            "type": "error",
+            "error": error,
+            "details": details
+        }
+
+    async def send_frame_update(self, frame_data: Dict[str, Any], jpegs: Dict[str, bytes]):
+        """Broadcast frame update ({tier: jpeg}) to all clients"""
+        await self.broadcast(FrameMessage(frame_data, jpegs))
+
+    async def send_alert(self, alert_data: Dict[str, Any]):
+        """Broadcast alert to all clients"""
+        await self.broadcast(self._alert_message(alert_data))
 
     async def send_status(self, status: str, message_text: str):
         """Broadcast status update to all clients"""
@@ -68,12 +419,18 @@ class WebSocketManager:
 
     async def send_error(self, error: str, details: str = None):
         """Broadcast error to all clients"""
-        message = {
-            "type": "error",
-            "error": error,
-            "details": details
-        }
-        await self.broadcast(message)
+        await self.broadcast(self._error_message(error, details))
+
+    # Thread-safe counterparts of the send_* coroutines (detection / VLM threads)
+
+    def publish_frame_update(self, frame_data: Dict[str, Any], jpegs: Dict[str, bytes]) -> bool:
+        return self.publish(FrameMessage(frame_data, jpegs))
+
+    def publish_alert(self, alert_data: Dict[str, Any]) -> bool:
+        return self.publish(self._alert_message(alert_data))
+
+    def publish_error(self, error: str, details: str = None) -> bool:
+        return self.publish(self._error_message(error, details))
 
 
 # Global WebSocket manager instance
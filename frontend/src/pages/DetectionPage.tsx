@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
   Box,
   Paper,
@@ -57,7 +57,6 @@ const DetectionPage: React.FC = () => {
   const [loadingCameras, setLoadingCameras] = useState(false);
   const [previewImage, setPreviewImage] = useState<string | null>(null);
   const [previewActive, setPreviewActive] = useState(false);
-  const previewIntervalRef = useRef<NodeJS.Timeout | null>(null);
 
   const [status, setStatus] = useState<DetectionStatus | null>(null);
   const [loading, setLoading] = useState(false);
@@ -175,18 +174,8 @@ const DetectionPage: React.FC = () => {
 
       setPreviewActive(true);
 
-      // Start polling for preview frames
-      previewIntervalRef.current = setInterval(async () => {
-        try {
-          const response = await fetch(`${BACKEND_URL}/api/camera/preview/frame/${cameraIndex}`);
-          const data = await response.json();
-          if (data.image) {
-            setPreviewImage(data.image);
-          }
-        } catch (err) {
-          console.error('Failed to get preview frame:', err);
-        }
-      }, 100); // 10 FPS preview
+      // MJPEG stream: the server pushes frames at its own rate, the <img> just displays them
+      setPreviewImage(`${BACKEND_URL}/api/camera/preview/stream/${cameraIndex}?t=${Date.now()}`);
     } catch (err) {
       console.error('Failed to start preview:', err);
       setError('Failed to start camera preview');
@@ -194,11 +183,6 @@ const DetectionPage: React.FC = () => {
   };
 
   const stopCameraPreview = async () => {
-    if (previewIntervalRef.current) {
-      clearInterval(previewIntervalRef.current);
-      previewIntervalRef.current = null;
-    }
-
     if (previewActive && selectedCamera !== null) {
       try {
         await fetch(`${BACKEND_URL}/api/camera/preview/stop/${selectedCamera}`, {
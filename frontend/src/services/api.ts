@@ -5,10 +5,45 @@ import axios, { AxiosInstance } from 'axios';
 
 export const BACKEND_URL = 'http://127.0.0.1:8001';
 
+// Binary frame packet, see backend/services/websocket_manager.py:
+// magic(4) version(u8) flags(u8) meta_len(u16) frame_id(u64) timestamp(f64) overlap_ratio(f32),
+// then meta_len bytes of JSON metadata, then the JPEG. Little-endian.
+const FRAME_MAGIC = 'DDWF';
+const FRAME_PROTOCOL_VERSION = 1;
+const FRAME_HEADER_SIZE = 28;
+const FLAG_PERSON_DETECTED = 0x01;
+const FLAG_WARNING_ACTIVE = 0x02;
+
+function decodeFramePacket(buffer: ArrayBuffer) {
+  const view = new DataView(buffer);
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+  if (magic !== FRAME_MAGIC || view.getUint8(4) !== FRAME_PROTOCOL_VERSION) {
+    return null;
+  }
+  const flags = view.getUint8(5);
+  const metaLength = view.getUint16(6, true);
+  const metaEnd = FRAME_HEADER_SIZE + metaLength;
+  const meta = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, FRAME_HEADER_SIZE, metaLength)));
+  return {
+    ...meta,
+    type: 'frame',
+    frame_id: Number(view.getBigUint64(8, true)),
+    timestamp: view.getFloat64(16, true),
+    detections: {
+      person_detected: (flags & FLAG_PERSON_DETECTED) !== 0,
+      overlap_ratio: view.getFloat32(24, true),
+      warning_active: (flags & FLAG_WARNING_ACTIVE) !== 0,
+    },
+    jpeg: new Blob([buffer.slice(metaEnd)], { type: 'image/jpeg' }),
+  };
+}
+
 class APIClient {
   private client: AxiosInstance;
   private ws: WebSocket | null = null;
   private wsCallbacks: Map<string, Function[]> = new Map();
+  private frameUrl: string | null = null;
+  private streamTier = 'standard';
 
   constructor() {
     this.client = axios.create({
@@ -81,13 +116,28 @@ class APIClient {
     }
 
     this.ws = new WebSocket(`${BACKEND_URL.replace('http', 'ws')}/ws`);
+    this.ws.binaryType = 'arraybuffer';
 
     this.ws.onopen = () => {
       console.log('WebSocket connected');
+      // Ask for frames as binary packets instead of base64 JSON
+      this.ws?.send(JSON.stringify({ type: 'hello', binary_frames: true, tier: this.streamTier }));
       this.triggerCallbacks('connect', {});
     };
 
     this.ws.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        const frame = decodeFramePacket(event.data);
+        if (frame) {
+          // Frame handlers read data.image, as with JSON frames; keep only the latest object URL alive
+          if (this.frameUrl) {
+            URL.revokeObjectURL(this.frameUrl);
+          }
+          this.frameUrl = URL.createObjectURL(frame.jpeg);
+          this.triggerCallbacks('frame', { ...frame, image: this.frameUrl });
+        }
+        return;
+      }
       const data = JSON.parse(event.data);
       console.log('WebSocket message:', data);
       this.triggerCallbacks(data.type, data);
@@ -116,6 +166,14 @@ class APIClient {
     }
   }
 
+  // Preview quality: 'thumbnail' | 'standard' | 'full'
+  setStreamTier(tier: string) {
+    this.streamTier = tier;
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify({ type: 'subscribe', tier }));
+    }
+  }
+
   onWebSocketMessage(type: string, callback: Function) {
     if (!this.wsCallbacks.has(type)) {
       this.wsCallbacks.set(type, []);
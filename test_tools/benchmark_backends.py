@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+推理后端吞吐量对比 - PyTorch / ONNX Runtime / OpenVINO / TorchScript
+
+使用方法:
+    uv run test_tools/benchmark_backends.py [--frames 50] [--backends pytorch onnx]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.model_backends import BACKEND_FORMATS, resolve_model_path
+from test_model_backends import WEIGHTS, fixed_frame
+
+
+def benchmark(weights: Path, backend: str, frames: int):
+    from ultralytics import YOLO
+
+    path = resolve_model_path(weights, backend)
+    if backend != "pytorch" and path == weights:
+        return None  # export failed, resolve fell back to PyTorch
+    model = YOLO(str(path))
+    frame = fixed_frame()
+    model.predict(source=frame, verbose=False)  # warm-up
+    started_at = time.perf_counter()
+    for _ in range(frames):
+        model.predict(source=frame, verbose=False)
+    return frames / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--backends", nargs="+", default=list(BACKEND_FORMATS), choices=list(BACKEND_FORMATS))
+    args = parser.parse_args()
+
+    print(f"{'model':<14}{'backend':<14}{'FPS':>8}{'speedup':>10}")
+    for weights in WEIGHTS:
+        if not weights.exists():
+            print(f"   ❌ 未找到模型: {weights}")
+            continue
+        baseline = None
+        for backend in args.backends:
+            fps = benchmark(weights, backend, args.frames)
+            if fps is None:
+                print(f"{weights.stem:<14}{backend:<14}{'n/a':>8}")
+                continue
+            baseline = baseline or (fps if backend == "pytorch" else None)
+            speedup = f"{fps / baseline:.2f}x" if baseline else "-"
+            print(f"{weights.stem:<14}{backend:<14}{fps:>8.1f}{speedup:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+推理分辨率 精度/速度 对比 - 不同 inference_width / imgsz 相对全分辨率的结果
+
+使用方法:
+    uv run test_tools/benchmark_resolution.py video.mp4 [--frames 100]
+    uv run test_tools/benchmark_resolution.py video.mp4 --configs 0:640:640 960:640:640 640:480:480
+
+每个配置格式为 inference_width:river_imgsz:person_imgsz, 第一个配置作为精度基准。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.model_loader import ModelLoader
+from backend.core.settings import DetectionSettings
+from backend.core.video_processor import VideoProcessor
+
+
+def read_frames(path: str, limit: int):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_config(video: str, frames, model_loader, inference_width: int, river_imgsz: int, person_imgsz: int):
+    settings = DetectionSettings(
+        inference_width=inference_width,
+        river_imgsz=river_imgsz,
+        person_imgsz=person_imgsz,
+        river_refresh_interval=1,  # segment every frame so both models are measured
+    )
+    processor = VideoProcessor(
+        video, None, record_output=False, render_mode="headless",
+        detection_settings=settings, model_loader=model_loader,
+    )
+    processor.analyze_frame(frames[0])  # warm-up at this input size
+    analyses = []
+    started_at = time.perf_counter()
+    for frame in frames:
+        analyses.append(processor.analyze_frame(frame))
+    elapsed = time.perf_counter() - started_at
+    processor.cleanup()
+    return analyses, len(frames) / elapsed
+
+
+def river_iou(analysis, reference) -> float:
+    size = (reference.width, reference.height)
+    mask = cv2.resize(analysis.river_mask, size, interpolation=cv2.INTER_NEAREST) > 0
+    ref = reference.river_mask > 0
+    union = np.logical_or(mask, ref).sum()
+    return float(np.logical_and(mask, ref).sum() / union) if union else 1.0
+
+
+def box_recall(analysis, reference, threshold: float = 0.5) -> float:
+    """Share of reference person boxes matched by a box with IoU >= ``threshold``."""
+    ref_boxes = reference.frame_boxes()[reference.person_indices]
+    boxes = analysis.frame_boxes()[analysis.person_indices]
+    if len(ref_boxes) == 0:
+        return 1.0
+    if len(boxes) == 0:
+        return 0.0
+    x1 = np.maximum(ref_boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(ref_boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(ref_boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(ref_boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = lambda b: (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = inter / (area(ref_boxes)[:, None] + area(boxes)[None, :] - inter + 1e-9)
+    return float((iou.max(axis=1) >= threshold).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--configs", nargs="+", default=["0:640:640", "960:640:640", "640:640:640", "640:480:480", "480:320:320"])
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    if not frames:
+        print(f"   ❌ 无法读取视频: {args.video}")
+        return
+    model_loader = ModelLoader()
+
+    print(f"{'width:river:person':<20}{'FPS':>8}{'river IoU':>11}{'box recall':>12}{'overlap Δ':>11}")
+    reference = None
+    for config in args.configs:
+        inference_width, river_imgsz, person_imgsz = (int(v) for v in config.split(":"))
+        analyses, fps = run_config(args.video, frames, model_loader, inference_width, river_imgsz, person_imgsz)
+        if reference is None:
+            reference = analyses
+        iou = np.mean([river_iou(a, r) for a, r in zip(analyses, reference)])
+        recall = np.mean([box_recall(a, r) for a, r in zip(analyses, reference)])
+        overlap_delta = np.mean([abs(a.max_overlap()[0] - r.max_overlap()[0]) for a, r in zip(analyses, reference)])
+        print(f"{config:<20}{fps:>8.1f}{iou:>11.3f}{recall:>12.3f}{overlap_delta:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""离线分段处理: 关键帧切分、分段边界轨迹 ID 对齐与告警状态回放范围测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.chunked_processor import (
+    ChunkAnalysis,
+    FrameDetections,
+    VideoChunk,
+    plan_chunks,
+    reconcile_track_ids,
+    replay_range,
+)
+
+
+def _frame(index, boxes, track_ids):
+    return FrameDetections(
+        index=index,
+        boxes=np.array(boxes, dtype=np.int64).reshape(-1, 4),
+        track_ids=np.array(track_ids, dtype=np.int64),
+        classes=np.zeros(len(track_ids), dtype=np.int64),
+        overlap_ratios=np.zeros(len(track_ids)),
+    )
+
+
+def test_chunks_start_on_keyframes_with_preroll():
+    keyframes = list(range(0, 1000, 50))
+    chunks = plan_chunks(1000, keyframes, 4, overlap_frames=20)
+    assert [(c.start, c.end) for c in chunks] == [(0, 250), (250, 500), (500, 750), (750, 1000)]
+    assert [c.preroll_start for c in chunks] == [0, 200, 450, 700]
+
+    # without keyframes the split is even and the preroll is exact
+    chunks = plan_chunks(100, [], 3, overlap_frames=5)
+    assert [(c.start, c.end, c.preroll_start) for c in chunks] == [(0, 33, 0), (33, 67, 28), (67, 100, 62)]
+
+
+def test_track_ids_reconciled_across_chunk_boundary():
+    first = ChunkAnalysis(
+        chunk=VideoChunk(0, 0, 4, 0),
+        frames=[_frame(i, [[10 + i, 10, 50 + i, 90], [200, 10, 240, 90]], [3, 7]) for i in range(4)],
+        elapsed=0.0,
+        metrics={},
+    )
+    # the second chunk re-detects both persons on its preroll (frames 2-3) under its own ids
+    second = ChunkAnalysis(
+        chunk=VideoChunk(1, 4, 6, 2),
+        frames=[_frame(i, [[201, 10, 241, 90], [10 + i, 10, 50 + i, 90], [400, 10, 440, 90]], [1, 2, 5]) for i in range(2, 6)],
+        elapsed=0.0,
+        metrics={},
+    )
+    merged = reconcile_track_ids([first, second])
+    assert [f.index for f in merged] == [0, 1, 2, 3, 4, 5]
+    assert merged[0].track_ids.tolist() == [1, 2]
+    # same persons keep their ids, the new one gets a fresh id
+    assert merged[4].track_ids.tolist() == [2, 1, 3]
+
+
+def test_replay_range_covers_the_last_alert_burst():
+    fps, window = 10.0, 30
+    assert replay_range([], 1000, fps, window) == (1000, 1000)
+    # burst 500..700 (gaps <= 30 s); its warning clears 300 frames after the last alert
+    alerts = [100, 500, 600, 700]
+    assert replay_range(alerts, 800, fps, window) == (500, 800)
+    assert replay_range(alerts, 5000, fps, window) == (500, 1002)
+    # alerts at or after the chunk start are not replayed
+    assert replay_range(alerts, 600, fps, window) == (500, 600)
+
+
+def test_chunk_workers_use_the_parents_float_fps(tmp_path):
+    import cv2
+
+    from backend.core.chunked_processor import _ChunkAnalyzer, _ChunkRenderer
+
+    video = str(tmp_path / "ntsc.avi")
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 29.97, (64, 48))
+    for _ in range(40):
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    writer.release()
+
+    fps = cv2.VideoCapture(video).get(cv2.CAP_PROP_FPS)
+    assert abs(fps - 29.97) < 1e-3
+    chunk = VideoChunk(index=1, start=30, end=40, preroll_start=25)
+    analyzer = _ChunkAnalyzer(video, chunk, fps, None, model_loader=object())
+    renderer = _ChunkRenderer(video, None, chunk, fps, (0, 0), [], None, model_loader=object())
+    try:
+        for processor in (analyzer, renderer):
+            assert processor.fps == fps
+            processor._frames_read = 0  # normally reset by process_video
+            packet = processor._read_frame()
+            assert packet.timestamp == packet.index / fps
+    finally:
+        analyzer.cap.release()
+        renderer.cap.release()
@@ -0,0 +1,72 @@
+"""批处理命令行: 输入文件收集与汇总测试"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.cli import _output_names, build_parser, build_summary, collect_videos
+
+
+def test_collect_videos_from_files_and_directories(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "nested").mkdir()
+    for name in ("a/one.mp4", "a/nested/two.MOV", "a/notes.txt", "three.avi"):
+        (tmp_path / name).write_bytes(b"")
+
+    videos = collect_videos([str(tmp_path / "a"), str(tmp_path / "three.avi"), str(tmp_path / "a" / "one.mp4")])
+    assert [v.name for v in videos] == ["two.MOV", "one.mp4", "three.avi"]
+    assert [v.name for v in collect_videos([str(tmp_path / "a")], recursive=False)] == ["one.mp4"]
+    assert collect_videos([str(tmp_path / "missing")]) == []
+
+
+def test_same_named_files_get_distinct_outputs():
+    videos = [Path("x/cam.mp4"), Path("y/cam.mp4"), Path("y/other.mp4")]
+    assert list(_output_names(videos).values()) == ["cam", "cam_1", "other"]
+
+
+def test_summary_totals_and_run_arguments():
+    results = [
+        {"path": "a.mp4", "status": "ok", "frames": 100, "fps": 50.0, "incidents": [{}]},
+        {"path": "b.mp4", "status": "error", "error": "Failed to open"},
+    ]
+    summary = build_summary(results, elapsed=4.0, workers=2, mode="files")
+    assert summary["totals"] == {"files": 2, "failed": 1, "frames": 100, "incidents": 1, "fps": 25.0}
+
+    args = build_parser().parse_args(["run", "videos", "--workers", "3", "--no-record"])
+    assert args.paths == ["videos"] and args.workers == 3 and not args.record and not args.chunked
+
+
+def test_stdout_is_only_the_json_summary(tmp_path):
+    """No weights in the working directory: the load error is reported per file."""
+    import json
+    import os
+    import subprocess
+
+    import cv2
+    import numpy as np
+
+    fourcc = cv2.VideoWriter_fourcc(*"MJPG")
+    writer = cv2.VideoWriter(str(tmp_path / "clip.avi"), fourcc, 10, (64, 48))
+    for _ in range(5):
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    writer.release()
+
+    config = str(tmp_path / "none.yaml")
+    env = dict(os.environ, PYTHONPATH=str(project_root), APP_CONFIG_PATH=config)
+    command = [sys.executable, "-m", "backend.cli", "run", str(tmp_path)]
+    completed = subprocess.run(
+        command + ["--workers", "1", "--no-record"],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    summary = json.loads(completed.stdout)
+    assert completed.returncode == 1
+    assert summary["totals"]["failed"] == 1
+    error = summary["files"][0]["error"]
+    assert "模型加载失败" in error and "best_seg.pt" in error
+    assert "pygame" not in completed.stdout + completed.stderr
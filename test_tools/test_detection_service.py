@@ -0,0 +1,170 @@
+"""检测服务测试: 每路摄像头单会话、并发上限、按会话输出路径、按 id 停止、汇总状态、启动中途停止、按会话引用计数"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.model_loader import ModelLoader
+from backend.core.model_registry import ModelRegistry
+from backend.services import detection_service as detection_module
+
+
+class _FakeProcessor:
+    """Stands in for WebSocketVideoProcessor: runs until its session is stopped."""
+
+    instances = []
+
+    def __init__(self, video_source, output_path, stop_event, vlm_worker=None, **kwargs):
+        self.video_source = video_source
+        self.output_path = output_path
+        self.out = object() if kwargs["record_output"] else None
+        self.stop_event = stop_event
+        self.vlm_worker = vlm_worker
+        self.cleaned_up = False
+        self.started = threading.Event()
+        _FakeProcessor.instances.append(self)
+
+    def process_video(self):
+        self.started.set()
+        self.stop_event.wait(5)
+        self.cleanup()
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+    def get_metrics(self):
+        return {}
+
+
+class _DummyModel:
+    def predict(self, source, verbose=False):
+        return []
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(loader=lambda path: _DummyModel())
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch, registry):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("APP_CONFIG_PATH", raising=False)
+    monkeypatch.setattr(detection_module, "WebSocketVideoProcessor", _FakeProcessor)
+    _FakeProcessor.instances = []
+    service = detection_module.DetectionService(max_sessions=2)
+    loader = ModelLoader(registry=registry)
+    monkeypatch.setattr(service, "get_model_loader", lambda: loader)
+    monkeypatch.setattr(service, "get_inference", lambda settings: loader)
+    monkeypatch.setattr(service, "_build_incident_pipeline", lambda settings: (None, None))
+    return service
+
+
+def _videos(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(b"")
+        paths.append(str(path))
+    return paths
+
+
+def test_sessions_per_camera_and_limit(service, tmp_path):
+    a, b, c = _videos(tmp_path, "a.mp4", "b.mp4", "c.mp4")
+
+    async def scenario():
+        first = await service.start_detection(a, camera_id="cam-a")
+        with pytest.raises(RuntimeError, match="already in progress for camera cam-a"):
+            await service.start_detection(b, camera_id="cam-a")
+        second = await service.start_detection(b, camera_id="cam-b")
+        with pytest.raises(RuntimeError, match=r"concurrent sessions reached \(2\)"):
+            await service.start_detection(c, camera_id="cam-c")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    status_a, status_b = service.get_status(first), service.get_status(second)
+    assert (status_a["status"], status_b["status"]) == ("running", "running")
+    # 每个会话写自己的输出文件
+    assert status_a["output_path"] == str(Path("output") / f"a_{first[:8]}.mp4")
+    assert status_b["output_path"] == str(Path("output") / f"b_{second[:8]}.mp4")
+
+    listing = service.list_sessions()
+    assert (listing["total"], listing["running"]) == (2, 2)
+    assert [s["session_id"] for s in listing["sessions"]] == [first, second]
+    # 无 id 时返回最近启动的会话
+    assert service.get_status()["session_id"] == second
+    with pytest.raises(RuntimeError, match="specify session_id"):
+        asyncio.run(service.stop_detection())
+
+    result = asyncio.run(service.stop_detection(first))
+    assert result["status"] == "stopped"
+    assert service.get_status(first)["status"] == "stopped"
+    assert service.get_status(second)["status"] == "running"
+    listing = service.list_sessions()
+    assert (listing["total"], listing["running"]) == (2, 1)
+
+    # 停止后同一摄像头可以重新启动, 旧会话被替换
+    third = asyncio.run(service.start_detection(c, camera_id="cam-a"))
+    assert first not in service.sessions and third in service.sessions
+    asyncio.run(service.stop_all())
+    assert service.list_sessions()["running"] == 0
+    assert all(p.cleaned_up for p in _FakeProcessor.instances)
+    with pytest.raises(LookupError):
+        service.get_status("missing")
+
+
+def test_stop_while_starting_tears_down(service, tmp_path, monkeypatch, registry):
+    (video,) = _videos(tmp_path, "a.mp4")
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_inference(settings):
+        entered.set()
+        release.wait(5)
+        return service.get_model_loader()
+
+    monkeypatch.setattr(service, "get_inference", slow_inference)
+
+    async def scenario():
+        start = asyncio.create_task(service.start_detection(video, camera_id="cam-a"))
+        await asyncio.to_thread(entered.wait, 5)
+        (session,) = service.sessions.values()
+        assert session.status == "starting"
+        stopped = await service.stop_detection(session.session_id)
+        release.set()
+        return stopped, await start
+
+    stopped, session_id = asyncio.run(scenario())
+    assert stopped["status"] == "stopped"
+    session = service.sessions[session_id]
+    assert session.status == "stopped" and session.thread is None
+    (processor,) = _FakeProcessor.instances
+    assert processor.cleaned_up and not processor.started.is_set()
+    assert service.list_sessions()["running"] == 0
+    # the session's model reference was given back
+    assert [m["refcount"] for m in registry.status()["models"].values()] == [1, 1]
+
+
+def test_each_session_holds_a_model_reference(service, tmp_path, registry):
+    a, b = _videos(tmp_path, "a.mp4", "b.mp4")
+
+    def refcounts():
+        return sorted(m["refcount"] for m in registry.status()["models"].values())
+
+    # the service's shared loader holds one reference per model
+    assert refcounts() == [1, 1]
+    first = asyncio.run(service.start_detection(a, camera_id="cam-a"))
+    second = asyncio.run(service.start_detection(b, camera_id="cam-b"))
+    assert refcounts() == [3, 3]
+
+    asyncio.run(service.stop_detection(first))
+    service.sessions[first].thread.join(5)
+    assert refcounts() == [2, 2]
+    asyncio.run(service.stop_detection(second))
+    service.sessions[second].thread.join(5)
+    assert refcounts() == [1, 1]
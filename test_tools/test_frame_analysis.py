@@ -0,0 +1,80 @@
+"""帧分析测试: analyze_results 与重构前逐人掩码计算 (draw_river_mask + draw_person_boxes) 的结果一致"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics.engine.results import Results
+
+from backend.core.detection_utils import calculate_overlap_ratio, draw_person_boxes, draw_river_mask
+from backend.core.frame_analysis import analyze_results, extract_boxes
+
+HEIGHT, WIDTH = 240, 320
+
+
+def _river_result():
+    masks = torch.zeros(1, HEIGHT, WIDTH)
+    masks[0, 120:, :] = 1  # lower half of the frame is water
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return Results(image, path="frame", names={0: "river"}, masks=masks)
+
+
+def _person_result(tracked=True):
+    # x1, y1, x2, y2, [track id,] conf, cls
+    rows = [
+        [20.0, 150.0, 60.0, 220.0, 4, 0.9, 0],  # in the water
+        [100.0, 100.0, 140.0, 180.0, 7, 0.8, 0],  # half in
+        [200.0, 10.0, 240.0, 60.0, 9, 0.7, 0],  # on the bank
+        [250.0, 130.0, 300.0, 200.0, 11, 0.6, 2],  # not a person
+    ]
+    data = torch.tensor(rows if tracked else [r[:4] + r[5:] for r in rows])
+    names = {0: "person", 2: "boat"}
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return Results(image, path="frame", names=names, boxes=data)
+
+
+def _reference(river_result, person_result):
+    """The per-frame computation before the analysis/render split."""
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    river_mask = draw_river_mask(frame, river_result.masks)
+    boxes = person_result.boxes
+    detected, person_masks, person_bboxes = draw_person_boxes(frame, boxes, river_mask)
+    ratios = [calculate_overlap_ratio(mask, river_mask) for mask in person_masks]
+    max_overlap, best_bbox = 0, None
+    if detected:
+        for ratio, bbox in zip(ratios, person_bboxes):
+            if ratio > max_overlap:
+                max_overlap, best_bbox = ratio, bbox
+    return river_mask, person_bboxes, ratios, detected, max_overlap, best_bbox
+
+
+def test_analysis_matches_pre_refactor_computation():
+    river_result, person_result = _river_result(), _person_result()
+    expected = _reference(river_result, person_result)
+    river_mask, bboxes, ratios, detected, max_overlap, best_bbox = expected
+
+    analysis = analyze_results((HEIGHT, WIDTH, 3), river_result, person_result)
+    assert np.array_equal(analysis.river_mask, river_mask)
+    persons = analysis.person_indices
+    assert [tuple(int(v) for v in b) for b in analysis.boxes[persons]] == bboxes
+    assert analysis.track_ids.tolist() == [4, 7, 9, 11]
+    assert analysis.classes.tolist() == [0, 0, 0, 2]
+    np.testing.assert_allclose(analysis.overlap_ratios[persons], ratios)
+    assert analysis.person_detected == detected is True
+    assert analysis.max_overlap() == (max_overlap, best_bbox)
+    assert analysis.person_labels() == ["Person 4", "Person 7", "Person 9"]
+
+
+def test_untracked_boxes_and_empty_results():
+    xyxy, track_ids, classes = extract_boxes(_person_result(tracked=False).boxes)
+    assert xyxy.shape == (4, 4) and track_ids.tolist() == [-1] * 4
+    assert classes.tolist() == [0, 0, 0, 2]
+
+    analysis = analyze_results((HEIGHT, WIDTH, 3), None, None)
+    assert analysis.boxes.shape == (0, 4) and not analysis.river_mask.any()
+    assert analysis.max_overlap() == (0, None)
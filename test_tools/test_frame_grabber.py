@@ -0,0 +1,125 @@
+"""最新帧采集线程测试: 只交付最新一帧、覆盖的帧计入 dropped、采集结束与 stop() 时消费端不挂起"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.frame_grabber import LatestFrameGrabber
+from backend.core.video_processor import VideoProcessor
+
+
+class _FakeCapture:
+    """cv2.VideoCapture stand-in: yields one numbered frame per ``feed``, fails reads otherwise."""
+
+    def __init__(self):
+        self._available = threading.Semaphore(0)
+        self._count = 0
+        self._opened = True
+
+    def feed(self, frames=1):
+        for _ in range(frames):
+            self._available.release()
+
+    def close(self):
+        self._opened = False
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened or not self._available.acquire(timeout=0.01):
+            return False, None
+        frame = np.full((4, 4, 3), self._count, dtype=np.uint8)
+        self._count += 1
+        return True, frame
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_only_the_newest_frame_is_delivered():
+    cap = _FakeCapture()
+    grabber = LatestFrameGrabber(cap, name="fake").start()
+    try:
+        cap.feed(5)
+        _wait_until(lambda: grabber.grabbed == 5)
+        frame, _, number = grabber.read(timeout=1.0)
+        assert number == 4 and frame[0, 0, 0] == 4
+        assert grabber.dropped == 4
+
+        # nothing new since the last read
+        assert grabber.read(timeout=0.05) is None
+
+        cap.feed(3)
+        _wait_until(lambda: grabber.grabbed == 8)
+        frame, _, number = grabber.read(timeout=1.0)
+        assert number == 7 and frame[0, 0, 0] == 7
+        assert grabber.stats() == {
+            "grabbed": 8,
+            "delivered": 2,
+            "dropped": 6,
+            "read_failures": grabber.read_failures,
+        }
+    finally:
+        grabber.stop()
+
+
+def test_closed_capture_ends_the_grabber_and_the_consumer():
+    cap = _FakeCapture()
+    grabber = LatestFrameGrabber(cap, name="fake").start()
+    cap.feed(2)
+    _wait_until(lambda: grabber.grabbed == 2)
+    cap.close()
+    _wait_until(lambda: not grabber.running)
+
+    # the last frame is still handed out, then reads return at once
+    assert grabber.read(timeout=1.0)[2] == 1
+    started_at = time.monotonic()
+    assert grabber.read(timeout=5.0) is None
+    assert time.monotonic() - started_at < 1.0
+
+    processor = VideoProcessor.__new__(VideoProcessor)
+    processor.grabber = grabber
+    processor.stop_event = None
+    processor._frames_read = 0
+    processor._frames_done = 0
+    assert processor._read_frame() is None
+
+
+def test_stop_releases_a_waiting_consumer():
+    cap = _FakeCapture()
+    grabber = LatestFrameGrabber(cap, name="fake").start()
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(grabber.read(timeout=5.0)))
+    consumer.start()
+    time.sleep(0.05)
+
+    started_at = time.monotonic()
+    grabber.stop()
+    consumer.join(2.0)
+    assert not consumer.is_alive() and results == [None]
+    assert time.monotonic() - started_at < 1.0
+
+    # the processor's read loop ends on its stop event even while the grabber is alive
+    grabber = LatestFrameGrabber(_FakeCapture(), name="fake").start()
+    try:
+        processor = VideoProcessor.__new__(VideoProcessor)
+        processor.grabber = grabber
+        processor.stop_event = threading.Event()
+        processor._frames_read = 0
+        processor._frames_done = 0
+        threading.Timer(0.1, processor.stop_event.set).start()
+        assert processor._read_frame() is None
+    finally:
+        grabber.stop()
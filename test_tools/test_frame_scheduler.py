@@ -0,0 +1,64 @@
+"""AdaptiveStride 步长调节与跳帧外推测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.frame_analysis import FrameAnalysis, extrapolate_analysis
+from backend.core.frame_scheduler import AdaptiveStride
+
+
+def test_stride_follows_cost_and_lag():
+    scheduler = AdaptiveStride(source_fps=30, target_latency=0.2, max_stride=6)
+    # 50 ms per inference at 30 fps needs every second frame
+    scheduler.observe(0, cost=0.05, lag=0.05)
+    assert scheduler.stride == 2
+
+    # lag above target grows the stride, capped at max_stride
+    for index in range(1, 20):
+        scheduler.observe(index, cost=0.05, lag=0.5)
+    assert scheduler.stride == 6
+
+    # lag well under target shrinks it back to what the cost requires
+    for index in range(20, 40):
+        scheduler.observe(index, cost=0.05, lag=0.01)
+    assert scheduler.stride == 2
+
+
+def test_should_infer_skips_between_strides():
+    scheduler = AdaptiveStride(source_fps=30, target_latency=0.2)
+    scheduler.observe(0, cost=0.09, lag=0.1)
+    assert scheduler.stride == 3
+    assert [scheduler.should_infer(i) for i in range(1, 5)] == [False, False, True, True]
+    assert scheduler.stats()["skipped"] == 2
+
+
+def _analysis(boxes, track_ids, river_mask):
+    boxes = np.array(boxes, dtype=np.int64).reshape(-1, 4)
+    return FrameAnalysis(
+        height=river_mask.shape[0],
+        width=river_mask.shape[1],
+        river_mask=river_mask,
+        boxes=boxes,
+        track_ids=np.array(track_ids, dtype=np.int64),
+        classes=np.zeros(len(boxes), dtype=np.int64),
+        overlap_ratios=np.zeros(len(boxes)),
+    )
+
+
+def test_extrapolation_moves_tracks_and_recomputes_overlap():
+    river_mask = np.zeros((100, 200), dtype=np.uint8)
+    river_mask[:, 100:] = 255
+    previous = _analysis([[40, 10, 59, 29], [0, 0, 9, 9]], [1, -1], river_mask)
+    latest = _analysis([[60, 10, 79, 29], [0, 0, 9, 9]], [1, -1], river_mask)
+
+    predicted = extrapolate_analysis(previous, latest, gap=2, steps=4)
+
+    # track 1 moves 10 px per frame; the untracked box stays put
+    assert predicted.boxes.tolist() == [[100, 10, 119, 29], [0, 0, 9, 9]]
+    assert predicted.overlap_ratios[0] == 1.0
+    assert predicted.person_detected
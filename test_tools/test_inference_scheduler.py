@@ -0,0 +1,111 @@
+"""跨摄像头合批推理测试: 批次只等待即将提交的摄像头, 不因刷新间隔长或已切换的键而空等; 停止后不挂起; 合批模型不带跟踪回调"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics.engine.results import Results
+
+from backend.core.inference_scheduler import _ModelBatcher, _untracked_model
+
+
+class _FakeModel:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def predict(self, source, **kwargs):
+        time.sleep(self.delay)
+        self.batches.append(len(source))
+        empty = torch.zeros((0, 6))
+        return [Results(frame, path="frame", names={0: "person"}, boxes=empty) for frame in source]
+
+
+def _frame():
+    return np.zeros((32, 32, 3), dtype=np.uint8)
+
+
+def test_batch_does_not_wait_for_keys_that_are_not_due():
+    model = _FakeModel()
+    batcher = _ModelBatcher("river", model, "bytetrack.yaml", max_batch_size=16, max_wait=0.5)
+    try:
+        # cam-b refreshes rarely (like the river cache); cam-a/roi1 has been replaced by cam-a/roi2
+        for key in ("cam-b", "cam-b", "cam-a/roi1", "cam-a/roi1"):
+            batcher.submit(_frame(), key)
+        batcher.release("cam-a/roi1")
+        batcher.submit(_frame(), "cam-a/roi2")
+
+        started_at = time.perf_counter()
+        batcher.submit(_frame(), "cam-a/roi2")
+        assert time.perf_counter() - started_at < 0.25
+        assert sorted(batcher.active_keys) == ["cam-a/roi2", "cam-b"]
+    finally:
+        batcher.stop()
+
+
+def test_batch_waits_for_camera_due_within_the_window():
+    model = _FakeModel()
+    batcher = _ModelBatcher("person", model, "bytetrack.yaml", max_batch_size=16, max_wait=0.5)
+    try:
+        for _ in range(3):
+            threads = [
+                threading.Thread(target=batcher.submit, args=(_frame(), key)) for key in ("a", "b")
+            ]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.05)
+            for thread in threads:
+                thread.join(5)
+        # once both cameras have a cadence, their frames share one batch
+        assert model.batches[-1] == 2
+    finally:
+        batcher.stop()
+
+
+def test_submit_during_and_after_stop_does_not_hang():
+    batcher = _ModelBatcher("person", _FakeModel(delay=0.2), "bytetrack.yaml", 1, max_wait=0.0)
+    outcomes = []
+
+    def submit(key):
+        try:
+            outcomes.append(batcher.submit(_frame(), key))
+        except RuntimeError as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=submit, args=(f"cam-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    batcher.stop(timeout=0.1)  # returns while the first batch is still running
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(outcomes) == 4
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        batcher.submit(_frame(), "cam-0")
+    batcher.stop()
+
+
+def test_batched_model_has_no_tracking_callbacks():
+    from ultralytics import YOLO
+
+    model = YOLO("yolov8n.yaml")  # built from the config, no weights needed
+    model.track(source=_frame(), persist=True, verbose=False, imgsz=32)
+    assert len(model.callbacks["on_predict_start"]) > 1
+
+    untracked = _untracked_model(model)
+    assert untracked.model is model.model
+    assert len(untracked.callbacks["on_predict_start"]) == 1
+    untracked.predict(source=[_frame(), _frame()], conf=0.1, verbose=False, imgsz=32)
+    assert not hasattr(untracked.predictor, "trackers")
+    # the tracked model keeps its own predictor and tracker state
+    assert untracked.predictor is not model.predictor and model.predictor.trackers
@@ -0,0 +1,103 @@
+"""MJPEG 推流测试: 最新帧槽位按档位只编码一次、multipart 分块格式、服务端限速与结束条件"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services import mjpeg_stream as mjpeg_module
+from backend.services.frame_encoder import STREAM_TIERS
+from backend.services.mjpeg_stream import FrameSlot, mjpeg_stream
+
+
+def _frame(value):
+    return np.full((480, 640, 3), value, dtype=np.uint8)
+
+
+def _parse_part(part):
+    header, _, rest = part.partition(b"\r\n\r\n")
+    lines = header.decode("ascii").split("\r\n")
+    assert lines[0] == "--frame"
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    assert headers["Content-Type"] == "image/jpeg"
+    jpeg = rest[: int(headers["Content-Length"])]
+    assert rest[len(jpeg):] == b"\r\n"
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_slot_encodes_each_frame_once_per_tier():
+    slot = FrameSlot()
+    assert slot.jpeg(STREAM_TIERS["standard"]) is None
+    slot.update(_frame(10))
+    first = [slot.jpeg(STREAM_TIERS["thumbnail"]) for _ in range(5)]
+    slot.jpeg(STREAM_TIERS["full"])
+    assert slot.encoded == 2
+    assert all(item == first[0] for item in first)
+    slot.update(_frame(20))
+    seq, _ = slot.jpeg(STREAM_TIERS["thumbnail"])
+    assert seq == first[0][0] + 1 and slot.encoded == 3
+
+
+def test_update_does_not_wait_for_an_encode(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    encode = mjpeg_module.encode_tier
+
+    def slow_encode(frame, tier):
+        started.set()
+        release.wait(5)
+        return encode(frame, tier)
+
+    monkeypatch.setattr(mjpeg_module, "encode_tier", slow_encode)
+    slot = FrameSlot()
+    slot.update(_frame(10))
+    results = []
+    viewer = threading.Thread(target=lambda: results.append(slot.jpeg(STREAM_TIERS["full"])))
+    viewer.start()
+    assert started.wait(5)
+
+    # 生产者在编码进行中更新槽位, 不被阻塞
+    started_at = time.perf_counter()
+    slot.update(_frame(20))
+    assert time.perf_counter() - started_at < 0.1
+    release.set()
+    viewer.join(5)
+
+    # 旧帧的编码结果照常返回, 但不会作为新帧的缓存
+    assert results[0][0] == 1
+    monkeypatch.setattr(mjpeg_module, "encode_tier", encode)
+    seq, jpeg = slot.jpeg(STREAM_TIERS["full"])
+    assert seq == 2 and jpeg != results[0][1] and slot.encoded == 2
+
+
+def test_stream_sends_new_frames_at_server_rate_until_closed():
+    slot = FrameSlot()
+    slot.update(_frame(50))
+
+    async def consume():
+        parts = []
+        started_at = time.perf_counter()
+        async for part in mjpeg_stream(slot, STREAM_TIERS["thumbnail"], fps=20.0):
+            assert slot.viewers == 1
+            parts.append(part)
+            if len(parts) == 1:
+                # 生产者远快于推流帧率: 只推送最新帧
+                for value in range(60, 200, 10):
+                    slot.update(_frame(value))
+            else:
+                slot.close()
+        return parts, time.perf_counter() - started_at
+
+    parts, elapsed = asyncio.run(consume())
+    assert len(parts) == 2
+    assert elapsed >= 0.05  # 两帧之间至少间隔 1/20 秒
+    first, latest = (_parse_part(part) for part in parts)
+    assert first.shape == (240, 320, 3)
+    assert abs(int(first.mean()) - 50) <= 2 and abs(int(latest.mean()) - 190) <= 2
+    assert slot.viewers == 0
@@ -0,0 +1,83 @@
+"""导出后端 (ONNX Runtime) 与 PyTorch 推理结果一致性测试, 以及静态输入后端的配置校验
+
+一致性测试需要 model/best_seg.pt、model/best_detect.pt 和 onnxruntime, 缺失时跳过。
+"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.frame_analysis import extract_boxes, extract_river_polygons, rasterize_river
+from backend.core.model_backends import export_path, resolve_model_path
+from backend.core.settings import TORCHSCRIPT_IMGSZ, DetectionSettings
+
+WEIGHTS = [project_root / "model" / "best_seg.pt", project_root / "model" / "best_detect.pt"]
+
+
+def fixed_frame(height=480, width=640):
+    """Deterministic test frame: textured background, a water-like band and two figures."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(90, 160, (height, width, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (0, height // 2), (width, height), (140, 90, 40), -1)
+    cv2.rectangle(frame, (200, 180), (240, 300), (60, 60, 200), -1)
+    cv2.rectangle(frame, (420, 260), (450, 340), (30, 160, 220), -1)
+    return frame
+
+
+def _predict(weights: Path, frame):
+    from ultralytics import YOLO
+
+    return YOLO(str(weights)).predict(source=frame, conf=0.1, verbose=False)[0]
+
+
+@pytest.mark.parametrize("weights", WEIGHTS, ids=lambda p: p.stem)
+def test_onnx_matches_pytorch(weights):
+    pytest.importorskip("onnxruntime")
+    if not weights.exists():
+        pytest.skip(f"{weights} not found")
+
+    onnx_path = resolve_model_path(weights, "onnx")
+    assert onnx_path == export_path(weights, "onnx") and onnx_path.exists()
+
+    frame = fixed_frame()
+    reference = _predict(weights, frame)
+    exported = _predict(onnx_path, frame)
+
+    # same Results layout as consumed by FrameAnalysis / draw_person_boxes
+    ref_boxes, _, ref_classes = extract_boxes(reference.boxes)
+    exp_boxes, _, exp_classes = extract_boxes(exported.boxes)
+    assert exp_boxes.shape == ref_boxes.shape
+    np.testing.assert_array_equal(exp_classes, ref_classes)
+    np.testing.assert_allclose(exp_boxes, ref_boxes, atol=2)
+
+    assert (exported.masks is None) == (reference.masks is None)
+    if reference.masks is not None:
+        h, w = frame.shape[:2]
+        ref_mask = rasterize_river(h, w, extract_river_polygons(reference.masks)) > 0
+        exp_mask = rasterize_river(h, w, extract_river_polygons(exported.masks)) > 0
+        union = np.logical_or(ref_mask, exp_mask).sum()
+        if union:
+            assert np.logical_and(ref_mask, exp_mask).sum() / union > 0.98
+
+
+@pytest.mark.parametrize("model", ["river", "person"])
+def test_torchscript_rejects_batched_and_other_sizes(model):
+    backend = {f"{model}_backend": "torchscript"}
+    with pytest.raises(ValidationError, match="batch size 1"):
+        DetectionSettings(**backend, inference_mode="batched")
+    with pytest.raises(ValidationError, match=f"{model}_imgsz=320"):
+        DetectionSettings(**backend, **{f"{model}_imgsz": 320})
+
+    settings = DetectionSettings(**backend, **{f"{model}_imgsz": TORCHSCRIPT_IMGSZ})
+    assert settings.inference_mode == "per_thread"
+    # the other model may use any size; dynamic backends may be batched
+    other = "person" if model == "river" else "river"
+    DetectionSettings(**backend, **{f"{other}_imgsz": 320})
+    DetectionSettings(river_backend="onnx", person_backend="openvino", inference_mode="batched")
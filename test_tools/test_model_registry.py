@@ -0,0 +1,135 @@
+"""ModelRegistry 单次加载、引用计数与就绪状态测试 (含 /health/ready 探针)"""
+import importlib.util
+import sys
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.model_registry import ModelRegistry
+
+
+class _DummyModel:
+    def __init__(self, path):
+        self.path = path
+        self.predict_calls = 0
+
+    def predict(self, source, verbose=False):
+        self.predict_calls += 1
+        return []
+
+
+class _CountingLoader:
+    def __init__(self):
+        self.loads = []
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        with self._lock:
+            self.loads.append(path)
+        return _DummyModel(path)
+
+
+def test_each_weight_file_is_loaded_once():
+    loader = _CountingLoader()
+    registry = ModelRegistry(loader=loader)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.acquire("a.pt"))) for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loader.loads) == 1
+    assert all(model is results[0] for model in results)
+    key = next(iter(registry.status()["models"]))
+    assert registry.status()["models"][key]["refcount"] == 8
+
+
+def test_release_and_unload_unused():
+    registry = ModelRegistry(loader=_CountingLoader())
+    registry.acquire("a.pt")
+    registry.acquire("b.pt")
+    registry.release("a.pt")
+    registry.release("a.pt")  # never drops below zero
+
+    assert registry.unload_unused() == 1
+    refcounts = [m["refcount"] for m in registry.status()["models"].values()]
+    assert refcounts == [1]
+
+
+def test_preload_warms_up_and_sets_ready():
+    registry = ModelRegistry(loader=_CountingLoader())
+    assert not registry.ready
+
+    assert registry.preload(["a.pt", "b.pt"])
+    assert registry.ready
+    models = registry.status()["models"]
+    assert all(m["warmed_up"] and m["refcount"] == 0 for m in models.values())
+    assert registry.acquire("a.pt").predict_calls == 1
+    registry.warmup("a.pt")
+    assert registry.acquire("a.pt").predict_calls == 1
+
+
+def test_ready_without_preload_and_after_unload():
+    registry = ModelRegistry(loader=_CountingLoader())
+    registry.expect([])  # preloading disabled: models load with the first session
+    assert registry.ready
+
+    registry.preload(["a.pt"])
+    registry.acquire("b.pt")
+    registry.release("b.pt")
+    # only models outside the expected set are dropped, so readiness is kept
+    assert registry.unload_unused() == 1
+    assert registry.ready and registry.status()["ready"]
+
+
+def test_readiness_probe_with_preload_off(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # settings defaults; logs go to the temp dir
+    spec = importlib.util.spec_from_file_location("api_server", project_root / "backend" / "api.py")
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    registry = ModelRegistry(loader=_CountingLoader())
+    monkeypatch.setattr(api, "model_registry", registry)
+    detection = api.settings.detection.model_copy(update={"preload_models": False})
+    monkeypatch.setattr(api, "settings", api.settings.model_copy(update={"detection": detection}))
+
+    assert not registry.ready  # nothing declared before startup
+    with TestClient(api.app) as client:
+        response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert registry.status()["models"] == {}
+
+
+def test_preload_failure_reports_error():
+    def failing_loader(path):
+        raise FileNotFoundError(path)
+
+    registry = ModelRegistry(loader=failing_loader)
+    assert not registry.preload(["missing.pt"])
+    status = registry.status()
+    assert not status["ready"]
+    assert "missing.pt" in status["error"]
+
+
+def test_warmup_waits_for_inference_on_the_same_model():
+    registry = ModelRegistry(loader=_CountingLoader())
+    lock = registry.inference_lock("a.pt")
+    assert lock is registry.inference_lock("a.pt")
+
+    # a session is tracking on the model: warm-up must not call predict concurrently
+    lock.acquire()
+    warmup = threading.Thread(target=registry.warmup, args=("a.pt",))
+    warmup.start()
+    warmup.join(0.2)
+    assert warmup.is_alive() and registry.acquire("a.pt").predict_calls == 0
+    lock.release()
+    warmup.join(5)
+    assert registry.acquire("a.pt").predict_calls == 1
@@ -0,0 +1,53 @@
+"""MotionGate 水域运动检测与过期强制检测测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.motion_gate import MotionGate
+
+
+def _step(gate, frame, river_mask):
+    infer = gate.should_infer(frame, river_mask)
+    if infer:
+        gate.mark_inferred()
+    return infer
+
+
+def test_skips_static_water_until_stale():
+    gate = MotionGate(max_staleness=4)
+    frame = np.full((120, 160, 3), 100, dtype=np.uint8)
+    river_mask = np.zeros((120, 160), dtype=np.uint8)
+    river_mask[60:, :] = 255
+
+    decisions = [_step(gate, frame, river_mask) for _ in range(9)]
+    assert decisions == [True, False, False, False, True, False, False, False, True]
+    assert gate.stats()["skipped"] == 6
+
+
+def test_motion_only_counts_inside_water():
+    gate = MotionGate(max_staleness=100)
+    river_mask = np.zeros((120, 160), dtype=np.uint8)
+    river_mask[60:, :] = 255
+    frame = np.full((120, 160, 3), 100, dtype=np.uint8)
+    assert _step(gate, frame, river_mask)
+
+    on_bank = frame.copy()
+    on_bank[10:40, 20:60] = 255
+    assert not _step(gate, on_bank, river_mask)
+
+    in_water = frame.copy()
+    in_water[80:100, 20:40] = 255
+    assert _step(gate, in_water, river_mask)
+
+
+def test_always_infers_without_water_region():
+    gate = MotionGate()
+    frame = np.zeros((60, 80, 3), dtype=np.uint8)
+    empty = np.zeros((60, 80), dtype=np.uint8)
+    assert all(_step(gate, frame, empty) for _ in range(3))
+    assert all(_step(gate, frame, None) for _ in range(3))
@@ -0,0 +1,129 @@
+"""RiverOverlapIndex 与逐人掩码计算的重叠比例一致性测试"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.detection_utils import RiverOverlapIndex, calculate_overlap_ratio
+
+
+def _reference_ratios(river_mask, bboxes):
+    height, width = river_mask.shape[:2]
+    ratios = []
+    for x1, y1, x2, y2 in bboxes:
+        person_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.rectangle(person_mask, (x1, y1), (x2, y2), 255, -1)
+        ratios.append(calculate_overlap_ratio(person_mask, river_mask))
+    return np.array(ratios, dtype=np.float64)
+
+
+def _random_river_mask(rng, height, width):
+    river_mask = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(3):
+        points = rng.integers(0, [width, height], size=(8, 2)).astype(np.int32)
+        cv2.fillPoly(river_mask, [cv2.convexHull(points)], 255)
+    return river_mask
+
+
+def test_overlap_ratios_match_full_frame_masks():
+    rng = np.random.default_rng(0)
+    height, width = 360, 640
+    for _ in range(20):
+        river_mask = _random_river_mask(rng, height, width)
+        corners = rng.integers(-50, [width + 50, height + 50], size=(40, 2, 2))
+        bboxes = [
+            (int(min(a[0], b[0])), int(min(a[1], b[1])), int(max(a[0], b[0])), int(max(a[1], b[1])))
+            for a, b in corners
+        ]
+        expected = _reference_ratios(river_mask, bboxes)
+        actual = RiverOverlapIndex(river_mask).overlap_ratios(bboxes)
+        assert np.array_equal(actual, expected)
+
+
+def test_degenerate_and_out_of_frame_boxes():
+    river_mask = np.zeros((100, 200), dtype=np.uint8)
+    river_mask[50:, :] = 255
+    bboxes = [
+        (10, 10, 10, 10),      # 单像素
+        (0, 60, 199, 99),      # 完全在水中
+        (-30, -30, -5, -5),    # 完全在画面外
+        (190, 90, 260, 140),   # 部分越界
+        (150, 40, 120, 70),    # 角点顺序颠倒
+    ]
+    expected = _reference_ratios(river_mask, bboxes)
+    actual = RiverOverlapIndex(river_mask).overlap_ratios(bboxes)
+    assert np.array_equal(actual, expected)
+    assert actual[1] == 1.0
+    assert actual[2] == 0.0
+
+
+def test_empty_boxes():
+    river_mask = np.zeros((10, 10), dtype=np.uint8)
+    assert RiverOverlapIndex(river_mask).overlap_ratios([]).shape == (0,)
+
+
+def test_water_roi_crop_and_full_frame_fallback():
+    from backend.core.frame_analysis import water_roi
+
+    river_mask = np.zeros((480, 640), dtype=np.uint8)
+    river_mask[300:400, 100:260] = 255
+    # padded by 32 and aligned to 32-pixel edges
+    assert water_roi(river_mask, padding=32) == (64, 256, 320, 448)
+    assert water_roi(np.zeros_like(river_mask)) is None
+    river_mask[:] = 255
+    assert water_roi(river_mask) is None
+
+
+def test_native_mask_matches_rasterized_polygons():
+    import torch
+    from ultralytics.engine.results import Results
+
+    from backend.core.frame_analysis import river_from_masks, river_from_result, water_roi
+
+    # 720x1280 frame letterboxed into a 384x640 mask: 12 rows of padding top and bottom
+    data = torch.zeros(1, 384, 640)
+    data[0, 192:372, :] = 1
+    result = Results(np.zeros((720, 1280, 3), dtype=np.uint8), path="frame", names={0: "river"}, masks=data)
+
+    polygons, native_mask, mask_scale = river_from_masks((720, 1280), result)
+    _, full_mask = river_from_result((720, 1280), result)
+    assert native_mask.shape == (360, 640) and mask_scale == (0.5, 0.5)
+    # polygons are traced lazily, in frame coordinates
+    assert len(polygons) == 1 and polygons[0][:, 1].min() == 360
+
+    bboxes = np.array([[100, 300, 200, 500], [100, 100, 200, 200], [0, 350, 50, 370]])
+    native = RiverOverlapIndex(native_mask, mask_scale).overlap_ratios(bboxes)
+    np.testing.assert_allclose(native, RiverOverlapIndex(full_mask).overlap_ratios(bboxes), atol=0.05)
+    assert water_roi(native_mask, mask_scale=mask_scale) == water_roi(full_mask)
+
+
+def test_draw_person_boxes_keeps_mask_contract():
+    import torch
+    from ultralytics.engine.results import Results
+
+    from backend.core.detection_utils import draw_person_boxes, draw_person_boxes_with_overlap
+
+    river_mask = np.zeros((120, 160), dtype=np.uint8)
+    river_mask[60:, :] = 255
+    # xyxy, track id, conf, cls: one person in the water, one on the bank, one non-person
+    data = torch.tensor([
+        [10.0, 70.0, 40.0, 110.0, 1, 0.9, 0],
+        [80.0, 5.0, 110.0, 40.0, 2, 0.9, 0],
+        [0.0, 0.0, 20.0, 20.0, 3, 0.9, 1],
+    ])
+    names = {0: "person", 1: "x"}
+    result = Results(np.zeros((120, 160, 3), dtype=np.uint8), path="frame", names=names, boxes=data)
+
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    detected, masks, bboxes = draw_person_boxes(frame, result.boxes, river_mask)
+    assert detected and bboxes == [(10, 70, 40, 110), (80, 5, 110, 40)]
+    assert len(masks) == 2 and masks[0].shape == river_mask.shape and masks[0][70, 10] == 255
+    expected = [calculate_overlap_ratio(mask, river_mask) for mask in masks]
+
+    _, ratios, _ = draw_person_boxes_with_overlap(frame.copy(), result.boxes, river_mask)
+    np.testing.assert_array_equal(ratios, expected)
@@ -0,0 +1,69 @@
+"""叠加渲染测试: OverlayCompositor 与 draw_river_mask + draw_person_boxes (+ 报警/信息栏) 逐像素一致"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics.engine.results import Results
+
+from backend.core.detection_utils import (
+    draw_info,
+    draw_person_boxes,
+    draw_river_mask,
+    draw_warning,
+)
+from backend.core.frame_analysis import analyze_results
+from backend.core.overlay_renderer import OverlayCompositor
+
+HEIGHT, WIDTH = 360, 640
+INFO = "Warning: Drowning danger detected! Overlap ratio: 0.75"
+
+
+def _river_result():
+    # two separate (non-overlapping) stretches of water
+    masks = torch.zeros(2, HEIGHT, WIDTH)
+    masks[0, 200:, :300] = 1
+    masks[1, 220:, 360:] = 1
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return Results(image, path="frame", names={0: "river"}, masks=masks)
+
+
+def _person_result():
+    rows = [
+        [40.0, 230.0, 100.0, 330.0, 3, 0.9, 0],
+        [420.0, 120.0, 480.0, 260.0, 8, 0.8, 0],
+        [520.0, 60.0, 580.0, 140.0, 12, 0.7, 2],
+    ]
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return Results(image, path="frame", names={0: "person", 2: "boat"}, boxes=torch.tensor(rows))
+
+
+def _frame():
+    return np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("show_warning", [False, True])
+def test_compose_matches_draw_helpers(show_warning):
+    river_result, person_result = _river_result(), _person_result()
+    frame = _frame()
+
+    expected = frame.copy()
+    river_mask = draw_river_mask(expected, river_result.masks)
+    draw_person_boxes(expected, person_result.boxes, river_mask)
+    if show_warning:
+        draw_warning(expected)
+    draw_info(expected, INFO)
+
+    analysis = analyze_results(frame.shape, river_result, person_result)
+    compositor = OverlayCompositor()
+    # second call exercises the cached river / banner layers
+    for _ in range(2):
+        actual = compositor.compose(frame, analysis, show_warning=show_warning, info_message=INFO)
+        assert np.array_equal(actual, expected)
+    assert np.array_equal(frame, _frame())
@@ -0,0 +1,79 @@
+"""FramePipeline 阶段并行、顺序保持、队列策略与异常传播测试"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.pipeline import END, BoundedQueue, FramePipeline
+
+
+def _counter_source(n):
+    items = iter(range(n))
+    return lambda: next(items, None)
+
+
+def test_order_is_preserved_and_stages_overlap():
+    seen = []
+    pipeline = FramePipeline("test")
+    pipeline.add_stage("a", lambda x: (time.sleep(0.01), x)[1], queue_size=2)
+    pipeline.add_stage("b", lambda x: (time.sleep(0.01), x * 10)[1], queue_size=2)
+    pipeline.add_stage("c", lambda x: (time.sleep(0.01), seen.append(x))[1], queue_size=2)
+
+    started_at = time.perf_counter()
+    pipeline.run(_counter_source(30))
+    elapsed = time.perf_counter() - started_at
+
+    assert seen == [i * 10 for i in range(30)]
+    # sequential would take ~0.9s; overlapping stages take roughly one stage's time
+    assert elapsed < 0.75
+    stats = pipeline.stats()
+    assert stats["source_reads"] == 30
+    assert all(stage["processed"] == 30 for stage in stats["stages"].values())
+
+
+def test_drop_oldest_keeps_newest_in_order():
+    queue = BoundedQueue(3, policy="drop_oldest")
+    for i in range(6):
+        assert queue.put(i)
+    queue.close()
+    items = []
+    while (item := queue.get()) is not END:
+        items.append(item)
+    assert items == [3, 4, 5]
+    assert queue.dropped == 3
+
+
+def test_block_policy_waits_for_consumer():
+    queue = BoundedQueue(1, policy="block")
+    queue.put(0)
+    done = threading.Event()
+
+    def producer():
+        queue.put(1)
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(0.05)
+    assert queue.get() == 0
+    assert done.wait(1.0)
+    thread.join()
+
+
+def test_stage_error_aborts_pipeline_and_is_raised():
+    def explode(x):
+        if x == 5:
+            raise ValueError("boom")
+        return x
+
+    pipeline = FramePipeline("test")
+    pipeline.add_stage("a", explode)
+    pipeline.add_stage("b", lambda x: None)
+    with pytest.raises(ValueError, match="boom"):
+        pipeline.run(_counter_source(1000))
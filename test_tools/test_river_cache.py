@@ -0,0 +1,40 @@
+"""RiverMaskCache 刷新间隔与场景变化检测测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.river_cache import RiverMaskCache
+
+
+def _run(cache, frames):
+    refreshed = []
+    for frame in frames:
+        if cache.needs_refresh(frame):
+            cache.store([], np.zeros(frame.shape[:2], dtype=np.uint8))
+            refreshed.append(True)
+        else:
+            refreshed.append(False)
+    return refreshed
+
+
+def test_refreshes_every_interval_on_static_scene():
+    cache = RiverMaskCache(refresh_interval=4)
+    frame = np.full((72, 128, 3), 100, dtype=np.uint8)
+    refreshed = _run(cache, [frame] * 9)
+    assert refreshed == [True, False, False, False, True, False, False, False, True]
+    assert cache.stats()["hits"] == 6
+    assert cache.stats()["resegmentations"] == 3
+
+
+def test_scene_change_forces_refresh():
+    cache = RiverMaskCache(refresh_interval=100, scene_change_threshold=10.0)
+    dark = np.full((72, 128, 3), 20, dtype=np.uint8)
+    bright = np.full((72, 128, 3), 200, dtype=np.uint8)
+    refreshed = _run(cache, [dark, dark, bright, bright])
+    assert refreshed == [True, False, True, False]
+    assert cache.stats()["scene_changes"] == 1
@@ -0,0 +1,43 @@
+"""检测配置校验测试: 枚举型选项拼写错误与非法数值在加载配置时即报错"""
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.settings import AppSettings, DetectionSettings
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("river_mask_source", "natve"),
+        ("inference_mode", "batch"),
+        ("pipeline_capture_policy", "drop-oldest"),
+        ("video_writer", "h264"),
+        ("river_backend", "tensorrt"),
+        ("person_backend", "ONNX"),
+    ],
+)
+def test_unknown_option_is_rejected(field, value):
+    with pytest.raises(ValidationError, match=field):
+        AppSettings(detection={field: value})
+
+
+@pytest.mark.parametrize(
+    "field",
+    ["mjpeg_fps", "batch_max_size", "river_refresh_interval", "motion_max_staleness", "writer_queue_size"],
+)
+def test_non_positive_value_is_rejected(field):
+    with pytest.raises(ValidationError, match=field):
+        DetectionSettings(**{field: 0})
+
+
+def test_defaults_and_valid_options():
+    settings = DetectionSettings(video_writer="ffmpeg", inference_mode="batched", river_backend="onnx")
+    assert settings.video_writer == "ffmpeg" and settings.inference_mode == "batched"
+    assert DetectionSettings().mjpeg_fps == 10.0
@@ -0,0 +1,107 @@
+"""VideoProcessor 推理测试: 两个模型并行执行与顺序执行得到相同的 FrameAnalysis, torch 线程按模型平分"""
+import sys
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ultralytics.engine.results import Results
+
+from backend.core import video_processor as video_module
+from backend.core.settings import DetectionSettings
+from backend.core.video_processor import VideoProcessor
+
+HEIGHT, WIDTH = 240, 320
+
+
+class _FakeInference:
+    """Fixed river/person results; records the thread each model ran on."""
+
+    def __init__(self):
+        self.threads = {}
+
+    def track_river(self, frame, key, imgsz=None):
+        self.threads["river"] = threading.current_thread().name
+        masks = torch.zeros(1, *frame.shape[:2])
+        masks[0, frame.shape[0] // 2:, :] = 1
+        return [Results(frame, path="frame", names={0: "river"}, masks=masks)]
+
+    def track_person(self, frame, key, imgsz=None):
+        self.threads["person"] = threading.current_thread().name
+        rows = [
+            [20.0, 150.0, 60.0, 220.0, 4, 0.9, 0],
+            [100.0, 100.0, 140.0, 180.0, 7, 0.8, 0],
+            [200.0, 10.0, 240.0, 60.0, 9, 0.7, 0],
+        ]
+        names = {0: "person"}
+        return [Results(frame, path="frame", names=names, boxes=torch.tensor(rows))]
+
+    def release_trackers(self, key):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def restore_torch_threads():
+    previous = torch.get_num_threads()
+    yield
+    torch.set_num_threads(previous)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (WIDTH, HEIGHT))
+    for _ in range(3):
+        writer.write(np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _analyze(video, parallel):
+    inference = _FakeInference()
+    processor = VideoProcessor(
+        video,
+        None,
+        record_output=False,
+        render_mode="headless",
+        detection_settings=DetectionSettings(parallel_models=parallel),
+        model_loader=object(),
+        inference=inference,
+    )
+    try:
+        frame = np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+        return processor.analyze_frame(frame), inference.threads
+    finally:
+        processor.cleanup()
+
+
+def test_parallel_models_match_sequential(video):
+    sequential, seq_threads = _analyze(video, parallel=False)
+    parallel, par_threads = _analyze(video, parallel=True)
+
+    assert seq_threads["river"] == seq_threads["person"]
+    assert par_threads["river"].startswith("river-")
+    assert par_threads["person"] != par_threads["river"]
+    assert np.array_equal(parallel.river_mask, sequential.river_mask)
+    assert len(parallel.river_polygons) == len(sequential.river_polygons)
+    for a, b in zip(parallel.river_polygons, sequential.river_polygons):
+        assert np.array_equal(a, b)
+    assert np.array_equal(parallel.frame_boxes(), sequential.frame_boxes())
+    assert parallel.track_ids.tolist() == sequential.track_ids.tolist() == [4, 7, 9]
+    np.testing.assert_array_equal(parallel.overlap_ratios, sequential.overlap_ratios)
+    assert parallel.max_overlap() == sequential.max_overlap()
+
+
+def test_parallel_models_split_the_process_thread_budget(monkeypatch):
+    monkeypatch.setattr(video_module, "_torch_thread_budget", 8)
+    assert video_module._size_torch_threads(0, 2) == 4
+    assert video_module._size_torch_threads(3, 2) == 3
+    # sequential with no explicit count leaves torch's setting alone
+    assert video_module._size_torch_threads(0, 1) == 3
@@ -0,0 +1,75 @@
+"""视频写入后端测试: 后台编码线程、队列满时丢弃最旧帧、JPEG 序列输出与写入后端接口"""
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.video_writers import AsyncVideoWriter, FrameWriter, create_frame_writer
+
+
+class _BlockingWriter(FrameWriter):
+    name = "blocking"
+
+    def __init__(self) -> None:
+        super().__init__("memory")
+        self.started = threading.Event()
+        self.resume = threading.Event()
+        self.frames = []
+
+    def write(self, frame):
+        self.started.set()
+        self.resume.wait(5)
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        pass
+
+
+def test_jpeg_sequence_written_in_background(tmp_path):
+    writer = create_frame_writer("jpeg", str(tmp_path / "out.mp4"), 10.0, (32, 24), start_index=100)
+    async_writer = AsyncVideoWriter(writer, queue_size=8)
+    frame = np.zeros((24, 32, 3), dtype=np.uint8)
+    for value in range(5):
+        frame[:] = value
+        async_writer.write(frame)  # 调用方复用同一缓冲区
+    async_writer.release()
+
+    names = sorted(p.name for p in (tmp_path / "out").iterdir())
+    assert names == [f"{i:06d}.jpg" for i in range(100, 105)]
+    stats = async_writer.stats()
+    assert stats["backend"] == "jpeg"
+    assert (stats["submitted"], stats["written"], stats["dropped"]) == (5, 5, 0)
+    assert create_frame_writer("disabled", str(tmp_path / "x.mp4"), 10.0, (32, 24)) is None
+
+
+def test_slow_encoder_drops_oldest_frames():
+    backend = _BlockingWriter()
+    async_writer = AsyncVideoWriter(backend, queue_size=2)
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    async_writer.write(frame)
+    assert backend.started.wait(5)  # 第 0 帧正在编码
+    for value in range(1, 6):
+        frame[:] = value
+        async_writer.write(frame)
+    backend.resume.set()
+    async_writer.release()
+
+    assert backend.frames == [0, 4, 5]
+    assert async_writer.stats()["dropped"] == 3
+
+
+def test_writer_backends_must_implement_write_and_release():
+    class _NoRelease(FrameWriter):
+        def write(self, frame):
+            pass
+
+    with pytest.raises(TypeError, match="release"):
+        _NoRelease("memory")
+    with pytest.raises(TypeError):
+        FrameWriter("memory")
@@ -0,0 +1,248 @@
+"""WebSocket 推送测试: 检测线程 -> 事件循环的单次推送开销、VLM 告警送达、二进制帧协议与握手、慢客户端隔离、分档编码、无观看端时不复制帧"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.core.vlm_worker import VLMTask, VLMTaskResult
+from backend.services import detection_service as detection_module
+from backend.services.frame_encoder import FrameEncoder
+from backend.services.websocket_manager import FRAME_HEADER, WebSocketManager, decode_frame_packet
+
+
+class _FakeSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = []
+        self.received = threading.Condition()
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        self.closed = True
+
+    async def send_json(self, message):
+        await self._record(message)
+
+    async def send_text(self, text):
+        await self._record(json.loads(text))
+
+    async def send_bytes(self, data):
+        await self._record(data)
+
+    async def _record(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        with self.received:
+            self.messages.append(message)
+            self.received.notify_all()
+
+    def wait_for(self, count, timeout=5.0):
+        return self.wait_until(lambda messages: len(messages) >= count, timeout)
+
+    def wait_until(self, predicate, timeout=5.0):
+        with self.received:
+            return self.received.wait_for(lambda: predicate(self.messages), timeout)
+
+
+@pytest.fixture
+def server_loop():
+    """Event loop running in its own thread, like uvicorn's."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+
+    async def cancel_tasks():
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(cancel_tasks(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def _connect(manager, loop, **kwargs):
+    socket = _FakeSocket(**kwargs)
+    asyncio.run_coroutine_threadsafe(manager.connect(socket), loop).result(5)
+    return socket
+
+
+def _bound_manager(loop, **kwargs):
+    manager = WebSocketManager(**kwargs)
+    return manager, _connect(manager, loop)
+
+
+def test_publish_overhead_and_order(server_loop):
+    manager, socket = _bound_manager(server_loop, max_pending_messages=1000)
+    count = 500
+    started_at = time.perf_counter()
+    for i in range(count):
+        manager.publish_alert({"seq": i})
+    per_push = (time.perf_counter() - started_at) / count
+
+    # the old path: one event loop per message
+    started_at = time.perf_counter()
+    for i in range(20):
+        asyncio.run(asyncio.sleep(0))
+    per_loop = (time.perf_counter() - started_at) / 20
+
+    assert socket.wait_for(count)
+    assert [m["seq"] for m in socket.messages] == list(range(count))
+    print(f"publish: {per_push * 1e6:.1f} us/push, asyncio.run: {per_loop * 1e6:.1f} us/push")
+    assert per_push < per_loop
+    assert manager.stats()["dropped"] == 0
+
+
+def test_vlm_alert_delivered_from_worker_thread(server_loop, monkeypatch):
+    manager, socket = _bound_manager(server_loop)
+    monkeypatch.setattr(detection_module, "ws_manager", manager)
+    task = VLMTask(
+        frame_id=7,
+        timestamp=123.0,
+        camera_id="cam-1",
+        overlap_ratio=0.8,
+        bbox=(0, 0, 10, 10),
+        image_crop=np.zeros((10, 10, 3), dtype=np.uint8),
+        incident_id="inc-1",
+    )
+    service = detection_module.DetectionService()
+    # VLMWorker 在自己的线程中同步调用回调
+    worker = threading.Thread(target=service._vlm_alert_callback, args=(VLMTaskResult(task=task),))
+    worker.start()
+    worker.join(5)
+
+    assert socket.wait_for(1)
+    alert = socket.messages[0]
+    assert alert["type"] == "alert"
+    assert (alert["incident_id"], alert["camera_id"]) == ("inc-1", "cam-1")
+
+
+def test_binary_frames_after_handshake(server_loop):
+    manager, legacy = _bound_manager(server_loop)
+    binary = _connect(manager, server_loop)
+    reply = manager.handle_client_message(binary, {"type": "hello", "binary_frames": True})
+    assert reply["binary_frames"] is True and reply["tier"] == "standard"
+
+    jpeg = bytes(range(256)) * 40
+    frame_data = {
+        "session_id": "s1",
+        "camera_id": "cam-1",
+        "frame_id": 42,
+        "timestamp": 1700000000.5,
+        "detections": {"person_detected": True, "overlap_ratio": 0.5, "warning_active": True},
+    }
+    manager.publish_frame_update(frame_data, {"standard": jpeg})
+    assert legacy.wait_for(1) and binary.wait_for(1)
+
+    # 未握手的客户端仍收到 base64 JSON
+    assert legacy.messages[0]["image"].startswith("data:image/jpeg;base64,")
+    packet = binary.messages[0]
+    decoded, payload = decode_frame_packet(packet)
+    assert payload == jpeg
+    assert decoded == frame_data
+    assert len(packet) < FRAME_HEADER.size + 64 + len(jpeg)
+    assert len(packet) < len(json.dumps(legacy.messages[0])) * 0.8
+
+
+def test_slow_client_does_not_delay_others(server_loop):
+    manager, fast = _bound_manager(server_loop, send_timeout=0.5)
+    slow = _connect(manager, server_loop, delay=0.2)
+    stuck = _connect(manager, server_loop, delay=10.0)
+
+    started_at = time.perf_counter()
+    for i in range(20):
+        manager.publish_frame_update({"frame_id": i}, {"standard": b"jpeg"})
+    manager.publish_alert({"message": "danger"})
+    manager.publish_frame_update({"frame_id": 20}, {"standard": b"jpeg"})
+    assert fast.wait_until(lambda m: m and m[-1].get("frame_id") == 20, timeout=2.0)
+    assert time.perf_counter() - started_at < 1.0
+    assert any(m["type"] == "alert" for m in fast.messages)
+
+    # 慢客户端: 帧只保留最新一帧, 告警不丢
+    assert slow.wait_until(lambda m: m and m[-1].get("frame_id") == 20, timeout=2.0)
+    assert sum(m["type"] == "alert" for m in slow.messages) == 1
+    assert len(slow.messages) <= 3
+
+    # 卡住的客户端发送超时后被移除
+    time.sleep(0.5)
+    stats = manager.stats()
+    assert stats["evicted"] == 1 and stuck.closed
+    assert stuck not in manager.clients
+    by_client = {c["client"]: c for c in stats["clients"]}
+    assert by_client[f"{id(slow):x}"]["frames_dropped"] >= 19
+
+
+def test_each_tier_encoded_once_and_shared(server_loop):
+    manager = WebSocketManager()
+    thumbnails = [_connect(manager, server_loop) for _ in range(16)]
+    full = [_connect(manager, server_loop) for _ in range(16)]
+    for tier, sockets in (("thumbnail", thumbnails), ("full", full)):
+        for socket in sockets:
+            hello = {"type": "hello", "binary_frames": True, "tier": tier}
+            manager.handle_client_message(socket, hello)
+    assert sorted(manager.subscribed_tiers()) == ["full", "thumbnail"]
+
+    encoder = FrameEncoder(manager.subscribed_tiers, manager.publish_frame_update)
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    encoder.submit(frame, {"frame_id": 1, "timestamp": 0.0, "detections": {}})
+    frame[:] = 0  # 调用方复用缓冲区
+    for socket in thumbnails + full:
+        assert socket.wait_for(1)
+    encoder.close()
+
+    stats = encoder.stats()["tiers"]
+    assert {tier: s["frames"] for tier, s in stats.items()} == {"thumbnail": 1, "full": 1}
+    assert "standard" not in stats
+    # 同档位的客户端共用同一份编码结果
+    assert all(s.messages[0] is thumbnails[0].messages[0] for s in thumbnails)
+    assert all(s.messages[0] is full[0].messages[0] for s in full)
+    _, thumb_jpeg = decode_frame_packet(thumbnails[0].messages[0])
+    _, full_jpeg = decode_frame_packet(full[0].messages[0])
+    decode = lambda jpeg: cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    assert decode(full_jpeg).shape == (720, 1280, 3)
+    assert decode(thumb_jpeg).shape == (180, 320, 3)
+    # 16 路缩略图的编码与带宽只是 16 路全分辨率的一小部分
+    assert 16 * len(thumb_jpeg) < 0.25 * 16 * len(full_jpeg)
+    assert stats["thumbnail"]["avg_encode_ms"] < 0.5 * stats["full"]["avg_encode_ms"]
+
+
+def test_publish_without_loop_is_dropped():
+    manager = WebSocketManager()
+    assert manager.publish_alert({"message": "x"}) is False
+    assert manager.stats()["dropped"] == 1
+
+
+class _NoCopyFrame(np.ndarray):
+    def copy(self, *args, **kwargs):
+        raise AssertionError("frame copied without viewers")
+
+
+def test_no_copy_without_subscribers():
+    tiers = []
+    published = []
+    encoder = FrameEncoder(lambda: tiers, lambda data, jpegs: published.append(jpegs))
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    encoder.submit(frame.view(_NoCopyFrame), {"frame_id": 1})
+
+    tiers.append("thumbnail")
+    encoder.submit(frame, {"frame_id": 2})
+    encoder.close()
+    stats = encoder.stats()
+    assert (stats["submitted"], stats["no_viewers"], stats["encoded"]) == (2, 1, 1)
+    assert [list(jpegs) for jpegs in published] == [["thumbnail"]]